@@ -9,19 +9,27 @@ Complete Algorithmic Trading System
 import os
 import sys
 from datetime import datetime, timedelta
-from fyers_apiv3 import fyersModel
-from fyers_apiv3.FyersWebsocket import data_ws
 import pandas as pd
 import time
 import threading
 
 # Import Fyers connection utilities
-from fyers_connection import (
-    APP_ID,
-    APP_TYPE,
-    get_stored_token,
-    is_token_valid
-)
+from fyers_client_manager import get_client, get_access_token
+from fyers_bulk_fetch import fetch_bulk, fetch_quotes_bulk, fetch_history_chunked, call_with_retry
+from candle_store import fetch_history_cached
+from nse_calendar import previous_session
+from tick_queue import TickQueue, TickWorker
+from top_k import TopKSelector
+from tick_ring_buffer import TickRingBuffer
+from symbol_registry import SymbolRegistry, SymbolState
+from dashboard import Dashboard
+from tick_clock import TICK_CLOCK
+from tick_recorder import TickRecorder
+from sharded_socket import ShardedDataSocket, shards_needed
+from universe_filter import prefilter_universe, print_prefilter_summary
+from selection_gate import SelectionGate, GATE_MESSAGE_TYPE, DEADLINE_MESSAGE_TYPE
+from latency_stats import LatencyTracker, print_latency_summary
+from order_fanout import OrderFanout
 
 # ============================================================================
 # CONFIGURATION
@@ -30,16 +38,42 @@ from fyers_connection import (
 # Execution Mode: "FYERS" or "ZERODHA"
 EXECUTION_MODE = os.getenv("EXECUTION_MODE", "FYERS")
 
+# Previous close source: "SNAPSHOT" (batched quotes) or "HISTORY" (per-symbol candles)
+PREV_CLOSE_SOURCE = os.getenv("PREV_CLOSE_SOURCE", "SNAPSHOT")
+PREV_CLOSE_LOOKBACK_DAYS = 7
+
+# Full-session tick capture to recordings/ ("0" to disable)
+RECORD_TICKS = os.getenv("RECORD_TICKS", "1") != "0"
+
 # Stock Selection Parameters
 MAX_FILTERED_STOCKS = 2
 GAP_UP_MIN = 1.8
 GAP_UP_MAX = 8.4
 MIN_STOCK_PRICE = 100
 
+# Selection window: connect and subscribe CONNECT_LEAD_MINUTES early, evaluate gaps from 9:10
+SELECTION_START_HOUR = 9
+SELECTION_START_MINUTE = 10
+CONNECT_LEAD_MINUTES = 2
+
+# NSE pre-open collects orders until 9:08, so opens seen before then are only indicative.
+# The lead above keeps the connect at 9:08; opens received before it are ignored anyway
+PRICE_DISCOVERY_HOUR = 9
+PRICE_DISCOVERY_MINUTE = 8
+
+# Selection is final this long after it opens; symbols that never ticked are filled from /quotes
+SELECTION_DEADLINE_SECONDS = 30
+SELECTION_FALLBACK_GRACE_SECONDS = 15
+# Retries per quotes batch in that fallback, so it finishes well inside the grace period
+SELECTION_FALLBACK_RETRIES = 1
+
 # Order Execution Time
 ORDER_EXECUTION_HOUR = 9
 ORDER_EXECUTION_MINUTE = 15
 
+# Open the parallel order connections this many seconds before execution
+ORDER_PREWARM_SECONDS = 3
+
 # NSE Stocks List
 NSE_STOCKS = [
     "NSE:OBEROIRLTY-EQ", "NSE:AXISBANK-EQ", "NSE:KAYNES-EQ", "NSE:TMPV-EQ", "NSE:360ONE-EQ",
@@ -90,15 +124,22 @@ NSE_STOCKS = [
 # ============================================================================
 
 # WebSocket state
-live_data_buffer = []
+symbol_registry = SymbolRegistry(NSE_STOCKS)
+live_data_buffer = TickRingBuffer(capacity=1000, registry=symbol_registry)
 message_count = 0
 websocket_start_time = None
 fyers_ws_instance = None
+tick_queue = TickQueue()
+tick_worker = None
+dashboard = None
+tick_recorder = None
+latency_tracker = LatencyTracker()
 
 # Stock selection state
-historical_close_prices = {}
-filtered_stocks = {}
-gap_up_checked = set()
+symbol_state = SymbolState(symbol_registry)
+filtered_stocks = TopKSelector(MAX_FILTERED_STOCKS)
+subscribed_symbols = list(NSE_STOCKS)
+selection_gate = SelectionGate()
 
 # FINAL PAYLOAD - STORED IN LOCAL VARIABLE (NOT RAM/DISK)
 selected_stocks_payload = []
@@ -128,35 +169,12 @@ def authenticate_fyers():
     print("\n🔑 Authenticating with Fyers API...")
     
     try:
-        # Get stored token
-        token = get_stored_token()
-        
-        if not token:
-            raise Exception(
-                "❌ No Fyers token found!\n"
-                "   Please run: python fyers_connection.py"
-            )
-        
-        # Validate token
-        if not is_token_valid(token):
-            raise Exception(
-                "❌ Fyers token expired!\n"
-                "   Please run: python fyers_connection.py"
-            )
-        
-        # Create Fyers client
-        client_id = f"{APP_ID}-{APP_TYPE}"
-        
-        fyers_client = fyersModel.FyersModel(
-            client_id=client_id,
-            token=token,
-            is_async=False,
-            log_path=""
-        )
+        # Shared client: token is validated once and cached for the TTL
+        fyers_client = get_client()
         
         print(f"✅ Fyers authentication successful!")
-        print(f"   Client ID: {client_id}")
-        print(f"   Token: {token[:20]}...")
+        print(f"   Client ID: {fyers_client.client_id}")
+        print(f"   Token: {fyers_client.token[:20]}...")
         
         return fyers_client
         
@@ -209,18 +227,8 @@ def wait_for_market_time(target_hour=9, target_minute=10):
 
 
 def get_last_trading_day():
-    """Calculate the last trading day."""
-    today = datetime.now()
-    weekday = today.weekday()
-    
-    if weekday == 0:  # Monday
-        last_trading_day = today - timedelta(days=3)
-    elif weekday == 6:  # Sunday
-        last_trading_day = today - timedelta(days=2)
-    else:
-        last_trading_day = today - timedelta(days=1)
-    
-    return last_trading_day
+    """Calculate the last trading day from the NSE calendar (holidays and special sessions included)."""
+    return datetime.combine(previous_session(), datetime.min.time())
 
 
 def fetch_historical_data(symbol, resolution="D", range_from=None, range_to=None):
@@ -237,17 +245,22 @@ def fetch_historical_data(symbol, resolution="D", range_from=None, range_to=None
     if isinstance(range_to, datetime):
         range_to = int(range_to.timestamp())
     
-    data = {
-        "symbol": symbol,
-        "resolution": resolution,
-        "date_format": "0",
-        "range_from": str(range_from),
-        "range_to": str(range_to),
-        "cont_flag": "1"
-    }
+    def request_chunk(chunk_from, chunk_to):
+        data = {
+            "symbol": symbol,
+            "resolution": resolution,
+            "date_format": "0",
+            "range_from": str(chunk_from),
+            "range_to": str(chunk_to),
+            "cont_flag": "1"
+        }
+        return call_with_retry(lambda: fyers_client.history(data=data))
     
-    response = fyers_client.history(data=data)
-    return response
+    def request_range(range_from, range_to):
+        return fetch_history_chunked(request_chunk, range_from, range_to, resolution)
+    
+    # Stored candles come from local disk; only missing ranges hit the API
+    return fetch_history_cached(request_range, symbol, resolution, range_from, range_to)
 
 
 def fetch_last_trading_day_all_stocks():
@@ -257,59 +270,59 @@ def fetch_last_trading_day_all_stocks():
     print("=" * 80)
     
     last_trading_day = get_last_trading_day()
-    last_trading_day_start = last_trading_day.replace(hour=0, minute=0, second=0, microsecond=0)
     last_trading_day_end = last_trading_day.replace(hour=23, minute=59, second=59, microsecond=999999)
+    # Look back a few sessions so a missed holiday still yields each symbol's latest close
+    lookback_start = last_trading_day - timedelta(days=PREV_CLOSE_LOOKBACK_DAYS)
     
     print(f"\n📅 Last Trading Day: {last_trading_day.strftime('%Y-%m-%d (%A)')}")
     print(f"📊 Total Stocks: {len(NSE_STOCKS)}")
     print("\n" + "=" * 80)
     
     all_data = []
-    successful_count = 0
-    failed_count = 0
     
-    for idx, symbol in enumerate(NSE_STOCKS, 1):
-        try:
-            print(f"\r[{idx}/{len(NSE_STOCKS)}] Fetching {symbol}...", end="", flush=True)
-            
-            response = fetch_historical_data(
-                symbol=symbol,
-                resolution="D",
-                range_from=last_trading_day_start,
-                range_to=last_trading_day_end
-            )
-            
-            if response.get("s") == "ok" and response.get("candles"):
-                candles = response.get("candles", [])
-                
-                if candles:
-                    last_candle = candles[-1]
-                    
-                    all_data.append({
-                        "Symbol": symbol,
-                        "Date": datetime.fromtimestamp(last_candle[0]).strftime('%Y-%m-%d'),
-                        "Timestamp": last_candle[0],
-                        "Open": last_candle[1],
-                        "High": last_candle[2],
-                        "Low": last_candle[3],
-                        "Close": last_candle[4],
-                        "Volume": last_candle[5]
-                    })
-                    successful_count += 1
-                else:
-                    failed_count += 1
-            else:
-                failed_count += 1
-            
-            time.sleep(0.1)
-            
-        except Exception:
-            failed_count += 1
+    def fetch_symbol(symbol):
+        return fetch_historical_data(
+            symbol=symbol,
+            resolution="D",
+            range_from=lookback_start,
+            range_to=last_trading_day_end
+        )
     
-    print(f"\n\n✅ Success: {successful_count} | ❌ Failed: {failed_count}")
+    def show_progress(done, total, symbol, ok):
+        print(f"\r[{done}/{total}] Fetched {symbol}...", end="", flush=True)
+    
+    # Parallel fetch; fetch_historical_data rate-limits and retries its own API calls
+    responses, failures = fetch_bulk(NSE_STOCKS, fetch_symbol, limiter=None, max_retries=0,
+                                     on_result=show_progress)
+    
+    for symbol in NSE_STOCKS:
+        response = responses.get(symbol)
+        candles = response.get("candles") if response else None
+        
+        if not candles:
+            failures.setdefault(symbol, "No candles returned")
+            continue
+        
+        last_candle = candles[-1]
+        
+        all_data.append({
+            "Symbol": symbol,
+            "Date": datetime.fromtimestamp(last_candle[0]).strftime('%Y-%m-%d'),
+            "Timestamp": last_candle[0],
+            "Open": last_candle[1],
+            "High": last_candle[2],
+            "Low": last_candle[3],
+            "Close": last_candle[4],
+            "Volume": last_candle[5]
+        })
+    
+    print(f"\n\n✅ Success: {len(all_data)} | ❌ Failed: {len(failures)}")
+    for symbol, reason in failures.items():
+        print(f"   • {symbol}: {reason}")
     print("=" * 80 + "\n")
     
     df = pd.DataFrame(all_data)
+    df.attrs['failed_symbols'] = failures
     
     if not df.empty:
         df = df.sort_values('Symbol').reset_index(drop=True)
@@ -317,6 +330,60 @@ def fetch_last_trading_day_all_stocks():
     return df
 
 
+def fetch_prev_close_snapshot():
+    """Fetch previous close for all NSE stocks via batched quotes (50 symbols per call)."""
+    print("\n" + "=" * 80)
+    print("📊 Fetching Previous Close Snapshot (Quotes)")
+    print("=" * 80)
+    
+    quotes, failures = fetch_quotes_bulk(NSE_STOCKS, fyers_client.quotes)
+    
+    all_data = []
+    for symbol in NSE_STOCKS:
+        quote = quotes.get(symbol)
+        if not quote or not quote.get("prev_close_price"):
+            failures.setdefault(symbol, "No previous close in quote")
+            continue
+        
+        all_data.append({
+            "Symbol": symbol,
+            "Close": quote["prev_close_price"],
+            "LTP": quote.get("lp")
+        })
+    
+    print(f"\n✅ Success: {len(all_data)} | ❌ Failed: {len(failures)}")
+    for symbol, reason in failures.items():
+        print(f"   • {symbol}: {reason}")
+    print("=" * 80 + "\n")
+    
+    df = pd.DataFrame(all_data)
+    df.attrs['failed_symbols'] = failures
+    
+    if not df.empty:
+        df = df.sort_values('Symbol').reset_index(drop=True)
+    
+    return df
+
+
+def load_prev_close_table():
+    """Load previous closes from PREV_CLOSE_SOURCE, falling back to the other source if it is empty."""
+    sources = [fetch_prev_close_snapshot, fetch_last_trading_day_all_stocks]
+    if PREV_CLOSE_SOURCE != "SNAPSHOT":
+        sources.reverse()
+    
+    for source in sources:
+        try:
+            df = source()
+        except Exception as e:
+            print(f"\n⚠️ {source.__name__} failed: {str(e)}")
+            continue
+        if not df.empty:
+            return df
+        print(f"\n⚠️ {source.__name__} returned no data, trying the other source...")
+    
+    return pd.DataFrame()
+
+
 def convert_fyers_to_zerodha_symbol(fyers_symbol):
     """Convert Fyers symbol to Zerodha format."""
     symbol = fyers_symbol.replace("NSE:", "").replace("-EQ", "")
@@ -324,73 +391,172 @@ def convert_fyers_to_zerodha_symbol(fyers_symbol):
 
 
 def onmessage(message):
-    """Handle incoming WebSocket messages and filter stocks."""
-    global message_count, live_data_buffer, historical_close_prices, filtered_stocks, gap_up_checked
+    """Stamp and enqueue WebSocket messages (socket thread - no filtering here)."""
+    message['recv_ns'] = time.monotonic_ns()
+    tick_queue.put(message)
+
+
+def process_message(message):
+    """Filter stocks from a queued WebSocket message (tick worker thread)."""
+    global message_count, live_data_buffer, filtered_stocks
     
-    message_count += 1
-    message['received_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    if message.get('type') == GATE_MESSAGE_TYPE:
+        if selection_gate.check(message['recv_ns']):
+            open_selection_window()
+        return
     
-    live_data_buffer.append(message)
-    if len(live_data_buffer) > 1000:
-        live_data_buffer.pop(0)
+    if message.get('type') == DEADLINE_MESSAGE_TYPE:
+        if selection_gate.check_deadline(message['recv_ns']):
+            expire_selection()
+        return
+    
+    message_count += 1
     
     if 'symbol' in message:
         symbol = message.get('symbol', 'N/A')
         open_price = message.get('open_price')
         ltp = message.get('ltp', 'N/A')
-        volume = message.get('vol_traded_today', 'N/A')
+        symbol_id = symbol_registry.intern(symbol)
         
-        if symbol in historical_close_prices and symbol not in gap_up_checked and open_price:
-            prev_close = historical_close_prices[symbol]
-            gap_up_pct = ((open_price - prev_close) / prev_close) * 100
+        live_data_buffer.append_message(message, symbol_id)
+        if tick_recorder:
+            tick_recorder.record(message, symbol_id)
+        
+        if selection_gate.is_finished():
+            return
+        
+        # Before the window opens only remember the latest tick per symbol
+        if not selection_gate.is_open():
+            symbol_state.observe(symbol_id, open_price, ltp, message['recv_ns'])
+            if selection_gate.check(message['recv_ns']):
+                open_selection_window()
+            return
+        
+        if selection_gate.check_deadline(message['recv_ns']):
+            expire_selection()
+            return
+        
+        gap_up_pct = symbol_state.check_gap(symbol_id, open_price) if open_price else None
+        
+        if gap_up_pct is not None:
+            prev_close = float(symbol_state.prev_close[symbol_id])
             
             if (GAP_UP_MIN <= gap_up_pct < GAP_UP_MAX and prev_close >= MIN_STOCK_PRICE):
-                filtered_stocks[symbol] = {
+                filtered_stocks.offer(symbol, gap_up_pct, {
                     'prev_close': prev_close,
                     'open_price': open_price,
                     'gap_up_pct': gap_up_pct,
                     'ltp': ltp,
-                    'timestamp': message['received_at']
-                }
-                
-                if len(filtered_stocks) > MAX_FILTERED_STOCKS:
-                    sorted_stocks = sorted(
-                        filtered_stocks.items(),
-                        key=lambda x: x[1]['gap_up_pct'],
-                        reverse=True
-                    )
-                    filtered_stocks.clear()
-                    for sym, data in sorted_stocks[:MAX_FILTERED_STOCKS]:
-                        filtered_stocks[sym] = data
+                    'recv_ns': message['recv_ns']
+                })
                 
-                print(f"\n🟢 CANDIDATE: {symbol} | Gap: {gap_up_pct:.2f}% | Open: {open_price}")
-                
-                if filtered_stocks:
-                    print(f"\n🏆 TOP {MAX_FILTERED_STOCKS}:")
-                    sorted_current = sorted(
-                        filtered_stocks.items(),
-                        key=lambda x: x[1]['gap_up_pct'],
-                        reverse=True
-                    )
-                    for rank, (sym, data) in enumerate(sorted_current, 1):
-                        print(f"   {rank}. {sym:20s} | Gap: {data['gap_up_pct']:.2f}%")
-                print("-" * 80)
-            
-            gap_up_checked.add(symbol)
+                post_event(f"🟢 CANDIDATE: {symbol} | Gap: {gap_up_pct:.2f}% | Open: {open_price}")
             
-            if len(gap_up_checked) >= len(historical_close_prices):
-                print("\n" + "=" * 80)
-                print("✅ ALL STOCKS EVALUATED - SELECTION COMPLETE")
-                print("=" * 80)
-                
-                if fyers_ws_instance:
-                    try:
-                        fyers_ws_instance.unsubscribe(symbols=NSE_STOCKS, data_type="SymbolUpdate")
-                    except Exception:
-                        pass
+            if symbol_state.all_checked():
+                finish_selection()
+
+
+def price_discovery_ns():
+    """Monotonic instant pre-open price discovery ends; opens received earlier are only indicative."""
+    if selection_gate.gate_ns is None:
+        return None
+    lead_minutes = (SELECTION_START_HOUR - PRICE_DISCOVERY_HOUR) * 60 + SELECTION_START_MINUTE - PRICE_DISCOVERY_MINUTE
+    return selection_gate.gate_ns - lead_minutes * 60 * 1_000_000_000
+
+
+def open_selection_window():
+    """Evaluate every symbol buffered before the gate in one pass (tick worker thread)."""
+    evaluated = symbol_state.evaluate_pending(price_discovery_ns())
+    offer_evaluated(evaluated)
+    
+    late_ms = TICK_CLOCK.elapsed_ms(selection_gate.gate_ns, selection_gate.opened_ns)
+    post_event(f"🔔 Selection window open: {len(evaluated)} buffered symbols evaluated "
+               f"{late_ms:.1f} ms after {SELECTION_START_HOUR:02d}:{SELECTION_START_MINUTE:02d}")
+    
+    if symbol_state.all_checked():
+        finish_selection()
+
+
+def offer_evaluated(symbol_ids):
+    """Offer the qualifying symbols of a batch evaluation, using each one's last observed tick."""
+    for symbol_id in symbol_state.qualifying(GAP_UP_MIN, GAP_UP_MAX, MIN_STOCK_PRICE, ids=symbol_ids).tolist():
+        symbol = symbol_registry.name(symbol_id)
+        gap_up_pct = float(symbol_state.gap_pct[symbol_id])
+        open_price = float(symbol_state.open_price[symbol_id])
+        filtered_stocks.offer(symbol, gap_up_pct, {
+            'prev_close': float(symbol_state.prev_close[symbol_id]),
+            'open_price': open_price,
+            'gap_up_pct': gap_up_pct,
+            'ltp': float(symbol_state.last_ltp[symbol_id]),
+            'recv_ns': int(symbol_state.last_recv_ns[symbol_id])
+        })
+        post_event(f"🟢 CANDIDATE: {symbol} | Gap: {gap_up_pct:.2f}% | Open: {open_price}")
+
+
+def expire_selection():
+    """Deadline reached: evaluate symbols that never ticked from one batched quotes call, then finalize."""
+    stragglers = symbol_state.unchecked()
+    post_event(f"⏱️ Selection deadline: {len(stragglers)} symbols not evaluated yet")
+    
+    if len(stragglers) and fyers_client:
+        names = symbol_registry.names(stragglers).tolist()
+        try:
+            quotes, failures = fetch_quotes_bulk(names, fyers_client.quotes, max_retries=SELECTION_FALLBACK_RETRIES)
+        except Exception as e:
+            quotes, failures = {}, {symbol: str(e) for symbol in names}
+        fetched_ns = time.monotonic_ns()
         
-        print(f"\r[{message_count:6d}] {symbol:20s} | LTP: {ltp:>8} | Vol: {volume:>10}", 
-              end='', flush=True)
+        for symbol_id, symbol in zip(stragglers.tolist(), names):
+            quote = quotes.get(symbol)
+            if quote:
+                symbol_state.observe(symbol_id, quote.get('open_price'), quote.get('lp'), fetched_ns)
+        offer_evaluated(symbol_state.evaluate_pending(price_discovery_ns()))
+        
+        post_event(f"   📡 Quotes fallback: {len(quotes)} fetched | {len(failures)} failed "
+                   f"({TICK_CLOCK.elapsed_ms(selection_gate.expired_ns, fetched_ns):.0f} ms)")
+    elif len(stragglers):
+        post_event("   ⚠️ No Fyers client for the quotes fallback - finalizing without them")
+    
+    finish_selection("DEADLINE REACHED")
+
+
+def finish_selection(reason="ALL STOCKS EVALUATED"):
+    """Mark the selection final, announce it and stop streaming."""
+    if not selection_gate.finish():
+        return
+    
+    post_event("=" * 80 + f"\n✅ {reason} - SELECTION COMPLETE\n" + "=" * 80)
+    
+    if fyers_ws_instance:
+        try:
+            fyers_ws_instance.unsubscribe(symbols=subscribed_symbols, data_type="SymbolUpdate")
+        except Exception:
+            pass
+
+
+def post_event(text):
+    """Print above the dashboard status line (directly if no dashboard is running)."""
+    if dashboard:
+        dashboard.post(text)
+    else:
+        print(text)
+
+
+def render_dashboard(rate):
+    """Dashboard status line: message rate, pending symbols and current leaders."""
+    pending = symbol_state.tracked - symbol_state.checked_count
+    if selection_gate.is_finished():
+        status = "✅ Final"
+    elif not selection_gate.is_open():
+        status = f"⏳ Selection in {selection_gate.seconds_until_open():5.1f}s"
+    else:
+        status = f"Pending: {pending:4d}"
+    leaders = " | ".join(
+        f"{rank}. {sym} {data['gap_up_pct']:.2f}%"
+        for rank, (sym, data) in enumerate(filtered_stocks.snapshot(), 1)
+    )
+    return (f"[{message_count:7d} msgs | {rate:6.0f}/s | queue {tick_queue.depth():5d}] "
+            f"{status} | 🏆 {leaders or '-'}")
 
 
 def onerror(message):
@@ -404,24 +570,43 @@ def onclose(message):
     
     print(f"\n🔌 WebSocket Closed: {message}")
     
+    # Drain ticks already queued before building the payload
+    if tick_worker:
+        tick_worker.stop()
+    if dashboard:
+        dashboard.stop()
+    if tick_recorder:
+        tick_recorder.close()
+    
     if websocket_start_time:
         duration = (datetime.now() - websocket_start_time).total_seconds()
+        queue_stats = tick_queue.stats()
         print(f"\n📊 Session: {duration:.2f}s | Messages: {message_count:,}")
+        print(f"📥 Tick Queue: max depth {queue_stats['max_depth']:,} | dropped {queue_stats['dropped']:,}")
+        if tick_recorder:
+            print(f"💾 Recorded {tick_recorder.records_written:,} ticks → {tick_recorder.base_path}.ticks")
+        if fyers_ws_instance:
+            for shard in fyers_ws_instance.stats():
+                print(f"🔀 Shard {shard['shard']}: {shard['symbols']} symbols | {shard['messages']:,} msgs | "
+                      f"{shard['connects'] - 1} reconnects")
+        print_latency_summary(latency_tracker)
     
     print("\n" + "=" * 80)
     print(f"🎯 FINAL SELECTION - TOP {MAX_FILTERED_STOCKS} STOCKS")
     print("=" * 80)
     
+    if tick_worker and tick_worker.is_alive():
+        # Still inside the quotes fallback: the heap could change under the snapshot
+        print("\n❌ Tick worker still running - selection not final, no stocks selected.")
+        selected_stocks_payload = []
+        return
+    
     if not filtered_stocks:
         print("\n⚠️ No stocks selected.")
         selected_stocks_payload = []
         return
     
-    sorted_final = sorted(
-        filtered_stocks.items(),
-        key=lambda x: x[1]['gap_up_pct'],
-        reverse=True
-    )
+    sorted_final = filtered_stocks.snapshot()
     
     # BUILD PAYLOAD AND STORE IN LOCAL VARIABLE (NOT DISK/RAM STORAGE)
     selected_stocks_payload = []
@@ -444,7 +629,7 @@ def onclose(message):
             "open_price": data["open_price"],
             "gap_up_pct": data["gap_up_pct"],
             "ltp": data["ltp"],
-            "timestamp": data["timestamp"],
+            "timestamp": TICK_CLOCK.format(data["recv_ns"]),
             "execution_mode": EXECUTION_MODE
         }
         
@@ -467,13 +652,13 @@ def onopen(fyers_ws):
     websocket_start_time = datetime.now()
     message_count = 0
     
-    print(f"\n📡 Subscribing to {len(NSE_STOCKS)} stocks...")
+    print(f"\n📡 Subscribing to {len(subscribed_symbols)} stocks...")
     print(f"📅 Start: {websocket_start_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("\n" + "=" * 80)
     
     try:
-        fyers_ws.subscribe(symbols=NSE_STOCKS, data_type="SymbolUpdate")
-        print(f"\n✅ Subscribed to {len(NSE_STOCKS)} stocks!")
+        fyers_ws.subscribe(symbols=subscribed_symbols, data_type="SymbolUpdate")
+        print(f"\n✅ Subscribed to {len(subscribed_symbols)} stocks!")
         print("\n📊 Streaming live data...\n")
         print("-" * 80)
         
@@ -485,36 +670,44 @@ def onopen(fyers_ws):
 
 def run_stock_selection(historical_data):
     """Start live data streaming and stock selection."""
-    global live_data_buffer, message_count, historical_close_prices, filtered_stocks, gap_up_checked
+    global live_data_buffer, message_count, filtered_stocks, tick_worker, dashboard, tick_recorder, subscribed_symbols
     
     print("\n" + "=" * 80)
     print("STEP 2: STOCK SELECTION (Fyers WebSocket)")
     print("=" * 80)
     
     filtered_stocks.clear()
-    gap_up_checked.clear()
+    symbol_state.reset()
     
+    subscribed_symbols = list(NSE_STOCKS)
     if historical_data is not None and not historical_data.empty:
-        for _, row in historical_data.iterrows():
-            historical_close_prices[row['Symbol']] = row['Close']
+        prev_closes = dict(zip(historical_data['Symbol'], historical_data['Close']))
+        subscribed_symbols, rejected = prefilter_universe(NSE_STOCKS, prev_closes, MIN_STOCK_PRICE)
+        print_prefilter_summary(NSE_STOCKS, subscribed_symbols, rejected)
+        symbol_state.load_prev_close({symbol: prev_closes[symbol] for symbol in subscribed_symbols})
         
-        print(f"\n✅ Loaded {len(historical_close_prices)} historical prices")
+        print(f"\n✅ Loaded {symbol_state.tracked} historical prices")
         print(f"🎯 Filters: Gap {GAP_UP_MIN}%-{GAP_UP_MAX}% | Min Price ₹{MIN_STOCK_PRICE}")
     
+    # Connect and subscribe ahead of the window so 9:10 only flips the gate
+    selection_start = datetime.now().replace(hour=SELECTION_START_HOUR, minute=SELECTION_START_MINUTE,
+                                             second=0, microsecond=0)
+    connect_at = selection_start - timedelta(minutes=CONNECT_LEAD_MINUTES)
+    
     print("\n" + "=" * 80)
-    print("⏰ WAITING FOR 9:10 AM")
+    print(f"⏰ WAITING FOR {connect_at.strftime('%H:%M')} (selection opens {selection_start.strftime('%H:%M')})")
     print("=" * 80)
-    wait_for_market_time(target_hour=9, target_minute=10)
+    wait_for_market_time(target_hour=connect_at.hour, target_minute=connect_at.minute)
     print("=" * 80)
     
     try:
-        token = get_stored_token()
-        access_token = f"{APP_ID}-{APP_TYPE}:{token}"
+        access_token = get_access_token()
         
         print("\n🔌 Connecting to Fyers WebSocket...")
         
-        fyers_ws = data_ws.FyersDataSocket(
+        fyers_ws = ShardedDataSocket(
             access_token=access_token,
+            shards=shards_needed(len(subscribed_symbols)),
             log_path="",
             litemode=False,
             write_to_file=False,
@@ -525,8 +718,30 @@ def run_stock_selection(historical_data):
             on_message=onmessage
         )
         
+        if RECORD_TICKS:
+            tick_recorder = TickRecorder.for_session(symbol_registry)
+            tick_recorder.start()
+        latency_tracker.reset()
+        tick_worker = TickWorker(tick_queue, process_message, latency=latency_tracker)
+        tick_worker.start()
+        dashboard = Dashboard(render_dashboard, counter=lambda: message_count)
+        dashboard.start()
+        
+        selection_gate.reset()
+        gate_ns = TICK_CLOCK.mono_ns_at(selection_start)
+        now_ns = time.monotonic_ns()
+        if gate_ns > now_ns:
+            selection_gate.arm(gate_ns, tick_queue)
+        selection_gate.set_deadline(max(gate_ns, now_ns) + SELECTION_DEADLINE_SECONDS * 1_000_000_000, tick_queue)
+        
         fyers_ws.connect()
         
+        # Hard upper bound: the deadline forces a result, closing builds the payload (onclose)
+        budget = (selection_gate.deadline_ns - time.monotonic_ns()) / 1e9 + SELECTION_FALLBACK_GRACE_SECONDS
+        if not selection_gate.wait(budget):
+            print(f"\n⚠️ Selection not final {SELECTION_FALLBACK_GRACE_SECONDS}s after the deadline - closing the socket")
+        fyers_ws.close_connection()
+        
     except KeyboardInterrupt:
         print("\n\n⚠️ Interrupted by user (Ctrl+C)")
     except Exception as e:
@@ -537,8 +752,14 @@ def run_stock_selection(historical_data):
 # STEP 3: ORDER EXECUTION AT 9:15 AM
 # ============================================================================
 
-def wait_for_execution_time():
-    """Wait until 9:15 AM for order execution."""
+def wait_for_execution_time(warm=None):
+    """
+    Wait until 9:15 AM for order execution.
+    
+    Args:
+        warm (callable): Called once ORDER_PREWARM_SECONDS before execution to open
+            the order connections (returns the number warmed)
+    """
     now = datetime.now()
     target_time = now.replace(
         hour=ORDER_EXECUTION_HOUR,
@@ -563,51 +784,69 @@ def wait_for_execution_time():
         elapsed = (datetime.now() - start_wait).total_seconds()
         remaining = wait_seconds - elapsed
         
+        if warm and remaining <= ORDER_PREWARM_SECONDS:
+            warmed = warm()
+            warm = None
+            print(f"\n🔥 {warmed} order connection(s) warmed")
+        
         if remaining > 0:
             print(f"\r⏳ Countdown to execution: {remaining:.0f} seconds remaining", end='', flush=True)
         
-        time.sleep(1)
+        time.sleep(min(1, max(remaining, 0)))
     
     print(f"\n\n🚀 EXECUTION TIME REACHED: {datetime.now().strftime('%H:%M:%S')}\n")
 
 
-def execute_fyers_orders(payload_list):
-    """Execute orders using Fyers API."""
+def execute_fyers_orders(payload_list, order_fanout=None):
+    """
+    Execute orders using Fyers API, all at the same instant.
+    
+    Args:
+        payload_list (list): Payloads from selected_stocks_payload
+        order_fanout (OrderFanout): Pre-warmed dispatcher (created here if None)
+    """
     global fyers_client
     
     print("\n" + "=" * 80)
     print("📤 EXECUTING ORDERS - FYERS API")
     print("=" * 80)
     
+    order_list = []
     for payload in payload_list:
-        try:
-            order_data = {
-                "symbol": payload["fyers_symbol"],
-                "qty": payload["qty"],
-                "type": 2,  # Market order
-                "side": 1,  # Buy
-                "productType": "INTRADAY",
-                "limitPrice": 0,
-                "stopPrice": 0,
-                "validity": "DAY",
-                "disclosedQty": 0,
-                "offlineOrder": False
-            }
-            
-            print(f"\n🔄 Placing order: {payload['trading_symbol']} (Rank {payload['rank']})")
-            print(f"   Gap-up: {payload['gap_up_pct']:.2f}% | Qty: {payload['qty']}")
-            
-            response = fyers_client.place_order(data=order_data)
-            
-            if response.get("s") == "ok":
-                print(f"✅ Order placed successfully!")
-                print(f"   Order ID: {response.get('id', 'N/A')}")
-            else:
-                print(f"❌ Order failed: {response.get('message', 'Unknown error')}")
-                
-        except Exception as e:
-            print(f"❌ Exception placing order for {payload['trading_symbol']}: {str(e)}")
+        order_list.append({
+            "symbol": payload["fyers_symbol"],
+            "qty": payload["qty"],
+            "type": 2,  # Market order
+            "side": 1,  # Buy
+            "productType": "INTRADAY",
+            "limitPrice": 0,
+            "stopPrice": 0,
+            "validity": "DAY",
+            "disclosedQty": 0,
+            "offlineOrder": False
+        })
+    
+    if order_fanout is None:
+        order_fanout = OrderFanout(fyers_client, len(order_list))
+    
+    results, elapsed_ms = order_fanout.fire(order_list, fyers_client.place_order)
+    order_fanout.close()
+    
+    for payload, result in zip(payload_list, results):
+        response = result["response"]
+        
+        print(f"\n🔄 Order: {payload['trading_symbol']} (Rank {payload['rank']})")
+        print(f"   Gap-up: {payload['gap_up_pct']:.2f}% | Qty: {payload['qty']} | RTT: {result['rtt_ms']:.2f} ms")
+        
+        if result["error"]:
+            print(f"❌ Exception placing order for {payload['trading_symbol']}: {result['error']}")
+        elif response.get("s") == "ok":
+            print(f"✅ Order placed successfully!")
+            print(f"   Order ID: {response.get('id', 'N/A')}")
+        else:
+            print(f"❌ Order failed: {response.get('message', 'Unknown error')}")
     
+    print(f"\n⏱ {len(results)} orders fired together | fire → last ack: {elapsed_ms:.2f} ms")
     print("\n" + "=" * 80)
 
 
@@ -686,14 +925,19 @@ def execute_orders():
     for idx, stock in enumerate(selected_stocks_payload, 1):
         print(f"   {idx}. {stock['trading_symbol']} | Gap: {stock['gap_up_pct']:.2f}%")
     
+    # One connection per order, opened just before 9:15
+    order_fanout = None
+    if EXECUTION_MODE != "ZERODHA":
+        order_fanout = OrderFanout(fyers_client, len(selected_stocks_payload))
+    
     # Wait until 9:15 AM
-    wait_for_execution_time()
+    wait_for_execution_time(warm=order_fanout.warm if order_fanout else None)
     
     # Execute based on mode
     if EXECUTION_MODE == "ZERODHA":
         execute_zerodha_orders(selected_stocks_payload)
     else:  # FYERS
-        execute_fyers_orders(selected_stocks_payload)
+        execute_fyers_orders(selected_stocks_payload, order_fanout)
     
     print("\n✅ Order execution completed!")
 
@@ -719,6 +963,7 @@ def main():
     print(f"   • Max Stocks: {MAX_FILTERED_STOCKS}")
     print(f"   • Gap-up Range: {GAP_UP_MIN}% - {GAP_UP_MAX}%")
     print(f"   • Min Stock Price: ₹{MIN_STOCK_PRICE}")
+    print(f"   • Selection Window: {SELECTION_START_HOUR:02d}:{SELECTION_START_MINUTE:02d} + {SELECTION_DEADLINE_SECONDS}s")
     print(f"   • Execution Time: {ORDER_EXECUTION_HOUR:02d}:{ORDER_EXECUTION_MINUTE:02d} AM")
     print("\n" + "=" * 100)
     
@@ -728,7 +973,7 @@ def main():
         
         # STEP 2: Fetch historical data
         print("\n📥 Fetching last trading day data...")
-        df = fetch_last_trading_day_all_stocks()
+        df = load_prev_close_table()
         
         if df.empty:
             print("\n❌ No historical data fetched. Exiting.")
@@ -0,0 +1,401 @@
+"""
+Broker Connection Manager
+A small pool of persistent, pre-handshaked HTTPS connections to the order host,
+kept healthy by background probes so the fire path never pays a TCP or TLS handshake.
+"""
+
+import http.client
+import json
+import select
+import socket
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+from fyers_apiv3.fyersModel import Config
+
+from fyers_bulk_fetch import FYERS_LIMITER
+
+
+# Connections held open to the order host
+ORDER_POOL_SIZE = 2
+
+# Seconds between background probe rounds. Probes are profile calls and count
+# against the same API quota as data requests, so this only needs to beat the
+# server's idle timeout: 2 connections every 5s is 24 of the 200 calls/min
+PROBE_INTERVAL_SECONDS = 5.0
+
+# Probes stop this many seconds before a fire, so none is in flight at the fire instant
+PROBE_QUIET_SECONDS = 1.0
+
+# Longest acquire() waits for a busy connection at fire time before giving up
+ACQUIRE_WAIT_SECONDS = 0.05
+
+# An RTT sample older than this is not trusted when choosing the fire connection
+RTT_FRESHNESS_SECONDS = 2.5 * PROBE_INTERVAL_SECONDS
+
+# TCP keepalive: idle seconds before the first keepalive, seconds between them, failures before drop
+KEEPALIVE_IDLE_SECONDS = 10
+KEEPALIVE_INTERVAL_SECONDS = 5
+KEEPALIVE_COUNT = 3
+
+
+def render_request(method, host, port, path, headers, body=b""):
+    """
+    Serialize a complete HTTP/1.1 request.
+
+    Args:
+        method (str): "GET" / "POST"
+        host (str): Host header value (port appended when not 80/443)
+        port (int): Server port
+        path (str): Request path
+        headers (dict): Extra headers (auth, content type, ...)
+        body (bytes): Request body
+
+    Returns:
+        bytes: Request ready to be written to a socket
+    """
+    host_header = host if port in (80, 443) else f"{host}:{port}"
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host_header}", "Connection: keep-alive",
+             "Accept: application/json", "Accept-Encoding: identity"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    if method != "GET" or body:
+        lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def tune_socket(sock):
+    """TCP_NODELAY plus aggressive TCP keepalive (options the platform lacks are skipped)."""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE_SECONDS),
+                          ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL_SECONDS),
+                          ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that dials a pre-resolved address instead of resolving the host name."""
+
+    def __init__(self, host, port, address, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+        tune_socket(self.sock)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that dials a pre-resolved address; the certificate is still checked against the host name."""
+
+    def __init__(self, host, port, address, timeout, context=None):
+        super().__init__(host, port, timeout=timeout, context=context or ssl.create_default_context())
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        tune_socket(sock)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+class BrokerConnection:
+    """
+    One persistent connection of the pool.
+
+    Attributes:
+        index (int): Position in the pool
+        rtt_ms (float): Last probe round trip (None before the first)
+        probed_at (int): monotonic_ns of the last successful probe
+        send_ns / sent_ns / ack_ns (int): Stamps of the last exchange
+        connects (int): Times the connection was (re)opened
+        failures (int): Probes or exchanges that failed
+    """
+
+    def __init__(self, index, factory):
+        self.index = index
+        self._factory = factory
+        self.conn = None
+        self.rtt_ms = None
+        self.probed_at = 0
+        self.send_ns = self.sent_ns = self.ack_ns = 0
+        self.connects = 0
+        self.failures = 0
+        self.busy = False
+
+    def open(self):
+        self.close()
+        self.conn = self._factory()
+        self.conn.connect()
+        self.connects += 1
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def is_open(self):
+        """An idle keep-alive socket only becomes readable when the server closes it."""
+        if self.conn is None or self.conn.sock is None:
+            return False
+        readable, _, _ = select.select([self.conn.sock], [], [], 0)
+        return not readable
+
+    def exchange(self, request_bytes, method):
+        """
+        Write a pre-rendered request and read the response.
+
+        Returns:
+            dict: Response JSON (or an error dict if the body is not JSON)
+        """
+        self.send_ns = time.monotonic_ns()
+        self.conn.sock.sendall(request_bytes)
+        self.sent_ns = time.monotonic_ns()
+        return self.read_response(method)
+
+    def read_response(self, method):
+        response = http.client.HTTPResponse(self.conn.sock, method=method)
+        response.begin()
+        body = response.read()
+        self.ack_ns = time.monotonic_ns()
+
+        if response.will_close:
+            self.close()
+        try:
+            return json.loads(body)
+        except ValueError:
+            return {"s": "error", "code": response.status, "message": body.decode(errors="replace")}
+
+    def probe(self, probe_bytes):
+        """
+        Health probe: re-open if the server dropped the connection, then time one request.
+
+        Returns:
+            bool: True if the probe succeeded
+        """
+        try:
+            if not self.is_open():
+                self.open()
+            self.exchange(probe_bytes, "GET")
+            self.rtt_ms = (self.ack_ns - self.send_ns) / 1e6
+            self.probed_at = self.ack_ns
+            return True
+        except Exception:
+            self.failures += 1
+            self.close()
+            return False
+
+
+class BrokerConnectionManager(threading.Thread):
+    """
+    Pool of persistent connections to the order API host.
+
+    start() resolves the host once (every connection dials that pinned
+    address, so no DNS lookup happens later), opens `size` connections with
+    TCP_NODELAY and tuned keepalive, and probes each one. The thread then
+    probes every idle connection each `probe_interval` seconds, re-opening
+    any the server dropped, so warmth no longer depends on SDK profile calls.
+
+    acquire() hands out the open connection with the lowest fresh RTT;
+    pause_probes() stops probing (and waits for one in flight) so nothing
+    competes with the fire. on_probe, if set, is called with every
+    successful probe's RTT in ms (from the probing thread). Every probe
+    takes a token from the shared rate limiter first.
+    """
+
+    def __init__(self, auth_header, api_url=None, size=ORDER_POOL_SIZE, probe_path=None,
+                 probe_interval=PROBE_INTERVAL_SECONDS, timeout=10, limiter=FYERS_LIMITER):
+        """
+        Args:
+            auth_header (str): "client_id:access_token" (FyersModel.header)
+            api_url (str): API base URL (default: the SDK's order API)
+            size (int): Connections in the pool
+            probe_path (str): Authenticated GET used as the probe (default: profile)
+            probe_interval (float): Seconds between probes of each connection
+            timeout (float): Socket timeout in seconds
+            limiter (RateLimiter): Quota shared with the other API calls (None: unthrottled)
+        """
+        super().__init__(name="broker-connections", daemon=True)
+        url = urlsplit(api_url or Config.API)
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.base_path = url.path.rstrip("/")
+        self.auth_header = auth_header
+        self.headers = {"Authorization": auth_header, "Content-Type": "application/json", "version": "3"}
+        self.probe_interval = probe_interval
+        self.timeout = timeout
+        self.limiter = limiter
+        self.address = None
+        self.probe_bytes = render_request("GET", self.host, self.port,
+                                          self.base_path + (probe_path or Config.get_profile), self.headers)
+        self.connections = [BrokerConnection(i, self._new_connection) for i in range(max(1, size))]
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._paused = False
+        self._stop_event = threading.Event()
+        self.on_probe = None
+
+    @classmethod
+    def for_client(cls, fyers, **kwargs):
+        """Pool authenticated with a FyersModel client's header."""
+        return cls(fyers.header, **kwargs)
+
+    def _new_connection(self):
+        if self.scheme == "https":
+            return _PinnedHTTPSConnection(self.host, self.port, self.address, self.timeout)
+        return _PinnedHTTPConnection(self.host, self.port, self.address, self.timeout)
+
+    def render(self, method, path, body=b""):
+        """Pre-render a request for this host with the pool's auth headers."""
+        return render_request(method, self.host, self.port, self.base_path + path, self.headers, body)
+
+    def start(self):
+        """
+        Pin DNS, open and probe every connection, then start background probing.
+
+        Returns:
+            int: Connections that came up healthy
+        """
+        self.address = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)[0][4][0]
+        healthy = self.probe_idle()
+        super().start()
+        return healthy
+
+    def run(self):
+        while not self._stop_event.wait(self.probe_interval):
+            self.probe_idle()
+
+    def probe_idle(self):
+        """
+        Probe every connection that is not in use (skipped while probes are paused).
+
+        Returns:
+            int: Successful probes
+        """
+        healthy = 0
+        for connection in self.connections:
+            if self._paused or connection.busy:
+                continue
+            # Take the token before claiming the connection, so a wait on the quota never holds it busy
+            if self.limiter:
+                self.limiter.acquire()
+            with self._lock:
+                if self._paused or connection.busy:
+                    continue
+                connection.busy = True
+            try:
+                if connection.probe(self.probe_bytes):
+                    healthy += 1
+                    if self.on_probe:
+                        self.on_probe(connection.rtt_ms)
+            finally:
+                with self._lock:
+                    connection.busy = False
+                    self._idle.notify_all()
+        return healthy
+
+    def pause_probes(self, timeout=0.0):
+        """
+        Stop background probes, waiting at most `timeout` seconds for one in flight.
+        A probe still running keeps its connection busy, and acquire() skips it.
+        """
+        with self._lock:
+            self._paused = True
+            self._idle.wait_for(lambda: not any(c.busy for c in self.connections), timeout)
+
+    def resume_probes(self):
+        with self._lock:
+            self._paused = False
+
+    def ensure_ready(self):
+        """
+        Re-open (and probe) any idle connection the server dropped. Call before the spin phase.
+
+        These probes skip the rate limiter: there is at most one per dropped
+        connection per fire, and blocking on the quota this close to the
+        target would push the fire past it.
+        """
+        for connection in self.connections:
+            with self._lock:
+                if connection.busy or connection.is_open():
+                    continue
+                connection.busy = True
+            try:
+                connection.probe(self.probe_bytes)
+            finally:
+                self.release(connection)
+
+    def acquire(self, timeout=ACQUIRE_WAIT_SECONDS):
+        """
+        Take the best connection for a request: open, with the lowest RTT among
+        fresh samples (any open one if none is fresh). Opens one if none is open.
+
+        Args:
+            timeout (float): Longest wait if every connection is busy (e.g. a probe in flight)
+
+        Returns:
+            BrokerConnection: Marked busy until release()
+
+        Raises:
+            ConnectionError: If no connection became idle within timeout
+        """
+        now_ns = time.monotonic_ns()
+        stale_ns = int(RTT_FRESHNESS_SECONDS * 1e9)
+        with self._lock:
+            idle = [c for c in self.connections if not c.busy]
+            if not idle:
+                self._idle.wait_for(lambda: any(not c.busy for c in self.connections), timeout)
+                idle = [c for c in self.connections if not c.busy]
+            if not idle:
+                raise ConnectionError(f"no idle broker connection within {timeout * 1000:.0f} ms")
+            candidates = [c for c in idle if c.conn is not None and c.rtt_ms is not None]
+            fresh = [c for c in candidates if now_ns - c.probed_at <= stale_ns]
+            pool = fresh or candidates or idle
+            best = min(pool, key=lambda c: c.rtt_ms if c.rtt_ms is not None else float("inf"))
+            best.busy = True
+
+        if best.conn is None:
+            try:
+                best.open()
+            except Exception:
+                self.release(best)
+                raise
+        return best
+
+    def release(self, connection):
+        with self._lock:
+            connection.busy = False
+            self._idle.notify_all()
+
+    def best_rtt_ms(self):
+        """Lowest RTT among open connections (None if none has been probed)."""
+        rtts = [c.rtt_ms for c in self.connections if c.conn is not None and c.rtt_ms is not None]
+        return min(rtts) if rtts else None
+
+    def stats(self):
+        """
+        Returns:
+            list: One dict per connection: index, open, rtt_ms, probe_age_s, connects, failures
+        """
+        now_ns = time.monotonic_ns()
+        return [
+            {
+                "index": c.index,
+                "open": c.conn is not None,
+                "rtt_ms": c.rtt_ms,
+                "probe_age_s": (now_ns - c.probed_at) / 1e9 if c.probed_at else None,
+                "connects": c.connects,
+                "failures": c.failures
+            }
+            for c in self.connections
+        ]
+
+    def close(self):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(self.timeout)
+        for connection in self.connections:
+            connection.close()
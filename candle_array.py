@@ -0,0 +1,101 @@
+"""
+Candle Arrays
+NumPy structured-array representation of Fyers candle data.
+"""
+
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+
+# One record per candle; ts is the Unix epoch second the candle opened at
+CANDLE_DTYPE = np.dtype([
+    ("ts", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("volume", np.int64),
+])
+
+# IST has no DST, so exchange-local wall time is a fixed offset from UTC
+IST_OFFSET_SECONDS = 5 * 3600 + 30 * 60
+
+
+def candles_to_array(candles):
+    """
+    Convert a Fyers "candles" list into a structured array.
+
+    Args:
+        candles (list): [[timestamp, open, high, low, close, volume], ...]
+
+    Returns:
+        np.ndarray: Array of CANDLE_DTYPE records (no per-candle Python objects)
+    """
+    if not candles:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+
+    # Flatten in C and let NumPy size the buffer up front
+    raw = np.fromiter(chain.from_iterable(candles), dtype=np.float64, count=len(candles) * 6)
+    raw = raw.reshape(-1, 6)
+    arr = np.empty(len(raw), dtype=CANDLE_DTYPE)
+    arr["ts"] = raw[:, 0]
+    arr["open"] = raw[:, 1]
+    arr["high"] = raw[:, 2]
+    arr["low"] = raw[:, 3]
+    arr["close"] = raw[:, 4]
+    arr["volume"] = raw[:, 5]
+    return arr
+
+
+def parse_candles_array(response):
+    """
+    Parse the candle data from API response into a structured NumPy array.
+    Drop-in for parse_candles when pulling large ranges: timestamps stay int64
+    epochs and datetimes are only built on request via candle_datetimes().
+
+    Args:
+        response (dict): API response from fetch_historical_data
+
+    Returns:
+        np.ndarray: Array of CANDLE_DTYPE records
+            fields: ts, open, high, low, close, volume
+
+    Raises:
+        Exception: If response indicates an error
+    """
+    if response.get("s") != "ok":
+        raise Exception(f"API Error: {response.get('message', 'Unknown error')} (Code: {response.get('code')})")
+
+    return candles_to_array(response.get("candles", []))
+
+
+def candle_datetimes(arr):
+    """
+    Convert candle timestamps to exchange-local (IST) wall-clock times.
+
+    Args:
+        arr (np.ndarray): Array of CANDLE_DTYPE records
+
+    Returns:
+        np.ndarray: datetime64[s] values, naive IST
+    """
+    return (arr["ts"] + IST_OFFSET_SECONDS).astype("datetime64[s]")
+
+
+def candles_to_dataframe(arr, with_datetime=False):
+    """
+    Wrap a candle array in a DataFrame (columns share memory with the array where possible).
+
+    Args:
+        arr (np.ndarray): Array of CANDLE_DTYPE records
+        with_datetime (bool): Add a "datetime" column (IST) (default: False)
+
+    Returns:
+        pd.DataFrame: Columns ts, open, high, low, close, volume [, datetime]
+    """
+    df = pd.DataFrame(arr)
+    if with_datetime:
+        df["datetime"] = candle_datetimes(arr)
+    return df
@@ -0,0 +1,210 @@
+"""
+Local Candle Store
+SQLite-backed OHLCV cache keyed by (symbol, resolution, ts) with incremental gap-filling.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from nse_calendar import has_session_between
+
+
+CANDLE_DB_PATH = os.getenv("CANDLE_DB_PATH", "candles.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol     TEXT    NOT NULL,
+    resolution TEXT    NOT NULL,
+    ts         INTEGER NOT NULL,
+    open       REAL,
+    high       REAL,
+    low        REAL,
+    close      REAL,
+    volume     INTEGER,
+    PRIMARY KEY (symbol, resolution, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol     TEXT    NOT NULL,
+    resolution TEXT    NOT NULL,
+    range_from INTEGER NOT NULL,
+    range_to   INTEGER NOT NULL,
+    PRIMARY KEY (symbol, resolution, range_from)
+) WITHOUT ROWID;
+"""
+
+
+def _start_of_today():
+    return int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+
+class CandleStore:
+    """
+    On-disk candle cache.
+
+    Besides the candles themselves, the store remembers which time ranges have
+    already been requested ("coverage"), so ranges that legitimately have no
+    candles (holidays, weekends) are not requested again either. Only ranges
+    that ended before today are marked covered - today's candles are still
+    forming and are always re-fetched.
+    """
+
+    def __init__(self, path=CANDLE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def missing_ranges(self, symbol, resolution, range_from, range_to):
+        """
+        Work out which parts of [range_from, range_to] are not in the store yet.
+
+        Args:
+            symbol (str): Trading symbol in Fyers format
+            resolution (str): Candle resolution
+            range_from (int): Start timestamp (Unix epoch)
+            range_to (int): End timestamp (Unix epoch)
+
+        Returns:
+            list: (range_from, range_to) tuples still to be fetched, in time order
+        """
+        with self._lock:
+            covered = self._conn.execute(
+                "SELECT range_from, range_to FROM coverage "
+                "WHERE symbol = ? AND resolution = ? AND range_to >= ? AND range_from <= ? "
+                "ORDER BY range_from",
+                (symbol, resolution, range_from, range_to)
+            ).fetchall()
+
+        gaps = []
+        cursor = range_from
+        for covered_from, covered_to in covered:
+            if covered_from > cursor:
+                gaps.append((cursor, covered_from - 1))
+            cursor = max(cursor, covered_to + 1)
+            if cursor > range_to:
+                break
+        if cursor <= range_to:
+            gaps.append((cursor, range_to))
+        return gaps
+
+    def save(self, symbol, resolution, candles, range_from, range_to):
+        """
+        Upsert candles and record [range_from, range_to] as fetched.
+
+        Args:
+            symbol (str): Trading symbol in Fyers format
+            resolution (str): Candle resolution
+            candles (list): [[timestamp, open, high, low, close, volume], ...] from the API
+            range_from (int): Start of the requested range (Unix epoch)
+            range_to (int): End of the requested range (Unix epoch)
+        """
+        rows = [(symbol, resolution, int(c[0]), c[1], c[2], c[3], c[4], c[5]) for c in candles]
+        covered_to = min(range_to, _start_of_today() - 1)
+
+        with self._lock, self._conn:
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+            if covered_to >= range_from:
+                self._add_coverage(symbol, resolution, range_from, covered_to)
+
+    def _add_coverage(self, symbol, resolution, range_from, range_to):
+        """Insert a covered interval, merging it with any it touches or overlaps."""
+        overlapping = self._conn.execute(
+            "SELECT range_from, range_to FROM coverage "
+            "WHERE symbol = ? AND resolution = ? AND range_to >= ? AND range_from <= ?",
+            (symbol, resolution, range_from - 1, range_to + 1)
+        ).fetchall()
+
+        for covered_from, covered_to in overlapping:
+            range_from = min(range_from, covered_from)
+            range_to = max(range_to, covered_to)
+
+        self._conn.execute(
+            "DELETE FROM coverage WHERE symbol = ? AND resolution = ? AND range_to >= ? AND range_from <= ?",
+            (symbol, resolution, range_from - 1, range_to + 1)
+        )
+        self._conn.execute(
+            "INSERT INTO coverage VALUES (?, ?, ?, ?)",
+            (symbol, resolution, range_from, range_to)
+        )
+
+    def load(self, symbol, resolution, range_from, range_to):
+        """
+        Read stored candles for a range, oldest first.
+
+        Returns:
+            list: [[timestamp, open, high, low, close, volume], ...] (same shape as the API)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, open, high, low, close, volume FROM candles "
+                "WHERE symbol = ? AND resolution = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (symbol, resolution, range_from, range_to)
+            ).fetchall()
+        return [list(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_candle_store():
+    """Get the process-wide CandleStore, opening it on first use."""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = CandleStore()
+        return _store
+
+
+def fetch_history_cached(request_fn, symbol, resolution, range_from, range_to, store=None):
+    """
+    Serve a history request from the local store, fetching only the missing ranges.
+
+    Args:
+        request_fn (callable): request_fn(range_from, range_to) -> Fyers history response
+        symbol (str): Trading symbol in Fyers format
+        resolution (str): Candle resolution
+        range_from (int): Start timestamp (Unix epoch)
+        range_to (int): End timestamp (Unix epoch)
+        store (CandleStore): Store to use (default: process-wide store)
+
+    Returns:
+        dict: Response in the Fyers history format
+            {"candles": [[timestamp, open, high, low, close, volume], ...], "code": 200, "message": "", "s": "ok"}
+            or the failing API response if a gap could not be fetched
+    """
+    store = store or get_candle_store()
+
+    for gap_from, gap_to in store.missing_ranges(symbol, resolution, range_from, range_to):
+        # Nothing trades on weekends/holidays - record the gap as covered without a request
+        if not has_session_between(gap_from, gap_to):
+            store.save(symbol, resolution, [], gap_from, gap_to)
+            continue
+
+        response = request_fn(gap_from, gap_to)
+
+        # "no_data" is a valid answer for ranges without sessions
+        if response.get("s") not in ("ok", "no_data"):
+            return response
+
+        store.save(symbol, resolution, response.get("candles", []), gap_from, gap_to)
+
+    return {
+        "candles": store.load(symbol, resolution, range_from, range_to),
+        "code": 200,
+        "message": "",
+        "s": "ok"
+    }
@@ -0,0 +1,233 @@
+"""
+Clock Sync
+NTP-style estimate of this host's clock offset to a reference clock, so a fire
+target like 09:15:00.000 is met on the reference (exchange-aligned) clock
+instead of on the local one.
+
+Each sample is one SNTP exchange (RFC 4330) with the four classic stamps:
+
+    t1 local send, t2 reference receive, t3 reference transmit, t4 local receive
+    offset = ((t2 - t1) + (t3 - t4)) / 2      reference - local
+    delay  = (t4 - t1) - (t3 - t2)            network round trip
+
+The true offset lies within offset ± delay / 2, so the sample with the lowest
+delay is kept and half its delay is the uncertainty.
+"""
+
+import os
+import socket
+import struct
+import threading
+import time
+from datetime import timedelta
+
+
+# Reference clock as "host[:port]", or "local" for the local stand-in server
+CLOCK_REFERENCE = os.getenv("CLOCK_REFERENCE", "time.google.com")
+# Offset (ms) the local stand-in adds to this host's clock, to rehearse a skewed host
+CLOCK_STANDIN_OFFSET_MS = float(os.getenv("CLOCK_STANDIN_OFFSET_MS", "0"))
+
+NTP_PORT = 123
+# Exchanges per measurement (the lowest-delay one wins)
+CLOCK_SYNC_SAMPLES = 8
+# Re-measure during the wait once the estimate is this old
+CLOCK_RESYNC_SECONDS = 30
+# Shift fire targets later by the uncertainty, so they are never early on the reference clock
+CLOCK_UNCERTAINTY_GUARD = True
+
+# Seconds between the NTP era (1900) and the Unix epoch (1970)
+_NTP_EPOCH_DELTA = 2_208_988_800
+_NTP_PACKET = struct.Struct("!BBbb11I")
+
+
+def _to_ntp(epoch_ns):
+    seconds, frac_ns = divmod(epoch_ns, 1_000_000_000)
+    return seconds + _NTP_EPOCH_DELTA, (frac_ns << 32) // 1_000_000_000
+
+
+def _from_ntp(seconds, fraction):
+    return (seconds - _NTP_EPOCH_DELTA) * 1_000_000_000 + ((fraction * 1_000_000_000) >> 32)
+
+
+def parse_reference(reference):
+    """
+    "host[:port]" -> (host, port); port defaults to 123.
+    """
+    host, _, port = reference.rpartition(":") if ":" in reference else (reference, "", "")
+    return host, int(port) if port else NTP_PORT
+
+
+class ReferenceClockServer(threading.Thread):
+    """
+    Local SNTP server answering with this host's clock plus a fixed offset.
+
+    Stand-in for the reference clock in dry runs and tests: it exercises the
+    same code path as a real NTP server, and offset_ms lets a skewed host be
+    rehearsed without touching the system clock.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, offset_ms=0.0):
+        super().__init__(name="reference-clock", daemon=True)
+        self.offset_ns = int(offset_ms * 1e6)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.address = self.sock.getsockname()
+        self._stop_event = threading.Event()
+
+    @property
+    def reference(self):
+        return f"{self.address[0]}:{self.address[1]}"
+
+    def run(self):
+        self.sock.settimeout(0.2)
+        while not self._stop_event.is_set():
+            try:
+                data, peer = self.sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            recv = _to_ntp(time.time_ns() + self.offset_ns)
+            if len(data) < _NTP_PACKET.size:
+                continue
+            origin = _NTP_PACKET.unpack(data[:_NTP_PACKET.size])[-2:]
+            # LI 0, version 4, mode 4 (server), stratum 1
+            reply_head = (0 << 6) | (4 << 3) | 4, 1, 0, -20
+            transmit = _to_ntp(time.time_ns() + self.offset_ns)
+            reply = _NTP_PACKET.pack(*reply_head, 0, 0, 0, 0, 0, *origin, *recv, *transmit)
+            self.sock.sendto(reply, peer)
+
+    def close(self):
+        self._stop_event.set()
+        self.sock.close()
+
+
+class ClockSync:
+    """
+    Offset between this host's wall clock and a reference clock.
+
+    measure() runs a burst of SNTP exchanges and keeps the lowest-delay
+    sample. Until the first successful measurement the offset is 0 and the
+    uncertainty unknown (None), so callers fall back to the local clock.
+
+    Attributes:
+        reference (str): "host:port" of the reference clock
+        offset_ms (float): Reference minus local clock
+        uncertainty_ms (float): Half the round trip of the kept sample (None if never measured)
+        delay_ms (float): Round trip of the kept sample
+        measured_at (float): time.monotonic() of the last successful measurement
+        error (str): Reason the last measurement failed, or None
+    """
+
+    def __init__(self, reference=CLOCK_REFERENCE, samples=CLOCK_SYNC_SAMPLES, timeout=1.0):
+        self.standin = None
+        if reference == "local":
+            self.standin = ReferenceClockServer(offset_ms=CLOCK_STANDIN_OFFSET_MS)
+            self.standin.start()
+            reference = self.standin.reference
+        self.reference = reference
+        self.host, self.port = parse_reference(reference)
+        self.samples = samples
+        self.timeout = timeout
+        self.offset_ms = 0.0
+        self.uncertainty_ms = None
+        self.delay_ms = None
+        self.measured_at = None
+        self.error = None
+
+    def _exchange(self, sock, address):
+        """One SNTP request/response -> (offset_ns, delay_ns)."""
+        # Local receive time is t1 plus the monotonic interval, so a clock step mid-exchange cannot skew it
+        t1 = time.time_ns()
+        mono1 = time.monotonic_ns()
+        # LI 0, version 4, mode 3 (client); t1 goes out as the transmit stamp and comes back as origin
+        request = _NTP_PACKET.pack((4 << 3) | 3, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, *_to_ntp(t1))
+        sock.sendto(request, address)
+        while True:
+            data, _ = sock.recvfrom(512)
+            mono4 = time.monotonic_ns()
+            if len(data) < _NTP_PACKET.size:
+                continue
+            fields = _NTP_PACKET.unpack(data[:_NTP_PACKET.size])
+            if fields[9:11] == _to_ntp(t1):
+                break
+
+        t4 = t1 + (mono4 - mono1)
+        t2 = _from_ntp(*fields[11:13])
+        t3 = _from_ntp(*fields[13:15])
+        return ((t2 - t1) + (t3 - t4)) // 2, (t4 - t1) - (t3 - t2)
+
+    def measure(self):
+        """
+        Run one burst of exchanges and update the estimate.
+
+        Returns:
+            bool: True if at least one exchange succeeded (otherwise the previous estimate is kept)
+        """
+        best = None
+        try:
+            address = socket.getaddrinfo(self.host, self.port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.settimeout(self.timeout)
+                for _ in range(self.samples):
+                    try:
+                        offset_ns, delay_ns = self._exchange(sock, address)
+                    except socket.timeout:
+                        continue
+                    if best is None or delay_ns < best[1]:
+                        best = (offset_ns, delay_ns)
+        except OSError as e:
+            self.error = str(e)
+            return False
+
+        if best is None:
+            self.error = f"no reply from {self.reference}"
+            return False
+
+        offset_ns, delay_ns = best
+        self.offset_ms = offset_ns / 1e6
+        self.delay_ms = max(delay_ns, 0) / 1e6
+        self.uncertainty_ms = self.delay_ms / 2
+        self.measured_at = time.monotonic()
+        self.error = None
+        return True
+
+    def is_synced(self):
+        return self.measured_at is not None
+
+    def age_seconds(self):
+        """Seconds since the last successful measurement (None if never measured)."""
+        return None if self.measured_at is None else time.monotonic() - self.measured_at
+
+    def to_local(self, reference_time):
+        """Reference-clock datetime -> the local wall-clock datetime of the same instant."""
+        return reference_time - timedelta(milliseconds=self.offset_ms)
+
+    def to_reference(self, local_time):
+        """Local wall-clock datetime -> the reference-clock datetime of the same instant."""
+        return local_time + timedelta(milliseconds=self.offset_ms)
+
+    def fire_time(self, reference_time, guard=CLOCK_UNCERTAINTY_GUARD):
+        """
+        Local wall-clock instant at which to act for a reference-clock target.
+
+        Args:
+            reference_time (datetime): Target on the reference clock
+            guard (bool): Add the uncertainty, so the local instant cannot fall before the target
+
+        Returns:
+            datetime: Local wall-clock time
+        """
+        local_time = self.to_local(reference_time)
+        if guard and self.uncertainty_ms:
+            local_time += timedelta(milliseconds=self.uncertainty_ms)
+        return local_time
+
+    def describe(self):
+        if not self.is_synced():
+            return f"not synced ({self.error or 'never measured'})"
+        return f"{self.offset_ms:+.2f} ms ± {self.uncertainty_ms:.2f} ms vs {self.reference}"
+
+    def close(self):
+        if self.standin:
+            self.standin.close()
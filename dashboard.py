@@ -0,0 +1,79 @@
+"""
+Terminal Dashboard
+Redraws a live status line at a fixed rate from its own thread,
+so tick handling never writes to stdout.
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+
+
+DASHBOARD_HZ = 5
+
+
+class Dashboard(threading.Thread):
+    """
+    Fixed-rate terminal renderer.
+
+    Every 1/hz seconds the thread prints any event lines posted since the
+    last frame (candidates, selection complete, ...) and then redraws the
+    single status line returned by `render(rate)`, where `rate` is the
+    messages/sec measured from `counter()` over the last frame.
+
+    post() is a deque append, so the tick worker can report events without
+    blocking on the terminal.
+    """
+
+    def __init__(self, render, counter, hz=DASHBOARD_HZ, stream=None):
+        super().__init__(name="dashboard", daemon=True)
+        self.render = render
+        self.counter = counter
+        self.interval = 1.0 / hz
+        self.stream = stream or sys.stdout
+        self._events = deque()
+        self._stop_event = threading.Event()
+        self._last_count = 0
+        self._last_time = None
+
+    def post(self, text):
+        """Queue a message to print above the status line on the next frame."""
+        self._events.append(text)
+
+    def _draw(self):
+        now = time.monotonic()
+        count = self.counter()
+        if self._last_time is None or now <= self._last_time:
+            rate = 0.0
+        else:
+            rate = (count - self._last_count) / (now - self._last_time)
+        self._last_count = count
+        self._last_time = now
+
+        out = []
+        if self._events:
+            out.append("\r\033[K")
+            while self._events:
+                out.append(self._events.popleft() + "\n")
+        try:
+            status = self.render(rate)
+        except Exception as e:
+            status = f"dashboard error: {e}"
+        out.append("\r\033[K" + status)
+
+        self.stream.write("".join(out))
+        self.stream.flush()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._draw()
+
+    def stop(self):
+        """Stop redrawing, flush pending events with one last frame and end the line."""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(self.interval * 2)
+        self._draw()
+        self.stream.write("\n")
+        self.stream.flush()
@@ -13,6 +13,11 @@ import threading
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor
 
+from broker_connection import BrokerConnectionManager, PROBE_QUIET_SECONDS
+from clock_sync import ClockSync, CLOCK_RESYNC_SECONDS
+from fire_calibration import FireCalibrator, ARRIVAL_PERCENTILE, CALIBRATION_SEED_ROUNDS
+from raw_order_fire import RawOrderFire
+
 # Import connection utilities from fyers_connection
 from fyers_connection import (
     APP_ID,
@@ -427,16 +432,35 @@ def fire_order_only(fyers, orders_data):
     return response, execution_time_ms
 
 
-def wait_and_fire_at_exact_time(target_time, fyers, orders_data, early_fire_ms=0):
+def wait_and_fire_at_exact_time(target_time, fyers, orders_data, early_fire_ms=0, raw=True, broker=None,
+                                clock_sync=None, calibrator=None):
     """
     Low-latency order fire at exact target time (or early by offset).
     Two-phase: wall-clock coarse wait with connection warming, then perf_counter spin.
     
+    With raw=True the complete HTTP request (URL, auth headers, JSON body) is
+    rendered before the wait and written at the target instant onto the
+    freshest connection of the broker pool (see raw_order_fire.py and
+    broker_connection.py); the SDK call is the fallback.
+    
+    With a synced clock_sync, target_time is on the reference clock: the
+    local fire instant is shifted by the measured offset (and its
+    uncertainty), the estimate is refreshed during the coarse wait, and the
+    returned fire/response times and delay are on the reference clock too.
+    
+    With a calibrator, early_fire_ms is only the starting value: it is
+    re-fitted from the latest RTT samples on every pass of the coarse wait
+    and frozen when the spin phase begins.
+    
     Args:
         target_time: datetime for the scheduled/display time
         fyers: FyersModel instance
         orders_data: Order data list
         early_fire_ms: Milliseconds to fire BEFORE target_time (to compensate for latency)
+        raw: Use the pre-serialized raw fire path (default: True)
+        broker: Running BrokerConnectionManager to fire on (default: a private one-connection pool)
+        clock_sync: ClockSync estimate of the reference clock (default: fire on the local clock)
+        calibrator: FireCalibrator that sets the early-fire offset (default: fixed early_fire_ms)
     
     Returns:
         Tuple of (response, execution_time_ms, fire_time, response_time, delay_ms, early_fire_ms)
@@ -449,28 +473,81 @@ def wait_and_fire_at_exact_time(target_time, fyers, orders_data, early_fire_ms=0
     _time = time.time
     _get_profile = fyers.get_profile  # For connection warming
     
+    # Render the request and open its connection now - not at fire time
+    raw_fire = None
+    if raw:
+        try:
+            raw_fire = RawOrderFire(fyers, orders_data, manager=broker)
+            if calibrator and raw_fire.manager.on_probe is None:
+                raw_fire.manager.on_probe = calibrator.add_rtt
+            raw_fire.connect()
+        except Exception as e:
+            print(f"⚠️ Raw fire path unavailable ({e}) - using SDK call")
+            raw_fire = None
+    
+    if raw_fire:
+        _fire = raw_fire.fire
+        _warm = None  # The connection pool probes its connections in the background
+    else:
+        _fire = lambda: _place_orders(data=_data)
+        _warm = _get_profile
+    
     # Target as unix timestamp - subtract early fire offset
     # If early_fire_ms=100, we fire 100ms BEFORE target_time
     adjusted_target_time = target_time - timedelta(milliseconds=early_fire_ms)
-    target_ts = adjusted_target_time.timestamp()
+    
+    def _local_target_ts():
+        # Reference-clock target -> local wall clock (offset, plus the uncertainty guard)
+        if clock_sync and clock_sync.is_synced():
+            return clock_sync.fire_time(adjusted_target_time).timestamp()
+        return adjusted_target_time.timestamp()
+    
+    target_ts = _local_target_ts()
     
     # Phase 1: Coarse sleep using wall clock (reliable)
     # Warm connection periodically to keep HTTP connection pool hot
     last_warm = 0
+    last_sync = _time()
+    probes_paused = False
     while True:
+        # Refine the early-fire offset from the latest RTT samples until the spin phase
+        if calibrator:
+            offset = calibrator.offset_ms()
+            if offset is not None and offset != early_fire_ms:
+                early_fire_ms = offset
+                adjusted_target_time = target_time - timedelta(milliseconds=early_fire_ms)
+                target_ts = _local_target_ts()
+        
         remaining = target_ts - _time()
         if remaining <= 0.2:
             break
         
+        # Quiet the pool before the fire; waiting for a probe in flight must end before the spin margin
+        if raw_fire and not probes_paused and remaining < PROBE_QUIET_SECONDS:
+            raw_fire.pause_probes(timeout=max(remaining - 0.25, 0))
+            probes_paused = True
+            continue
+        
         # Warm connection every 500ms, but stop 500ms before target
         current = _time()
-        if remaining > 0.5 and current - last_warm >= 0.5:
+        if _warm and remaining > 0.5 and current - last_warm >= 0.5:
             try:
-                _get_profile()  # Keeps connection alive
+                warm_start = _perf()
+                _warm()  # Keeps connection alive
+                if calibrator:
+                    calibrator.add_rtt((_perf() - warm_start) * 1000)
             except:
                 pass
             last_warm = current
         
+        # Refresh a stale clock estimate while even a failing burst (all timeouts) would still finish in time
+        if (clock_sync and clock_sync.is_synced() and current - last_sync >= CLOCK_RESYNC_SECONDS
+                and remaining > clock_sync.samples * clock_sync.timeout + 2.0):
+            clock_sync.measure()
+            last_sync = current
+            target_ts = _local_target_ts()
+            continue
+        
         if remaining > 2.0:
             _sleep(0.5)
         elif remaining > 0.5:
@@ -478,6 +555,10 @@ def wait_and_fire_at_exact_time(target_time, fyers, orders_data, early_fire_ms=0
         else:
             _sleep(0.01)
     
+    # Stop pool probes and re-open any connection the server dropped while idle
+    if raw_fire:
+        raw_fire.ensure_open()
+    
     # Phase 2: Convert to perf_counter for final precision
     # Sync wall clock to perf_counter at this moment
     sync_ts = _time()
@@ -490,7 +571,7 @@ def wait_and_fire_at_exact_time(target_time, fyers, orders_data, early_fire_ms=0
     
     # Fire - zero overhead
     t0 = _perf()
-    response = _place_orders(data=_data)
+    response = _fire()
     t1 = _perf()
     
     # Post-fire measurements
@@ -498,12 +579,21 @@ def wait_and_fire_at_exact_time(target_time, fyers, orders_data, early_fire_ms=0
     # delay_ms is relative to the ADJUSTED target (early fire time)
     delay_from_adjusted_ms = (t0 - target_pc) * 1000
     
-    # Calculate actual fire time and when response arrived
-    fire_time = adjusted_target_time + timedelta(milliseconds=delay_from_adjusted_ms)
+    # Calculate actual fire time (on the reference clock when synced) and when response arrived
+    fire_time = datetime.fromtimestamp(target_ts) + timedelta(milliseconds=delay_from_adjusted_ms)
+    if clock_sync and clock_sync.is_synced():
+        fire_time = clock_sync.to_reference(fire_time)
     response_time = fire_time + timedelta(milliseconds=execution_time_ms)
     
     # delay_ms shows how far from the ORIGINAL target (for display)
-    delay_from_original_ms = delay_from_adjusted_ms - early_fire_ms
+    delay_from_original_ms = (fire_time - target_time).total_seconds() * 1000
+    
+    if raw_fire:
+        connection = raw_fire.connection
+        used = f"connection #{connection.index} (probe RTT {connection.rtt_ms or 0:.2f} ms)" if connection else "no connection"
+        print(f"⚡ Raw fire path: request written in {raw_fire.send_overhead_us():.0f} µs | "
+              f"{used} | reconnects: {raw_fire.reconnects}")
+        raw_fire.close()
     
     return response, execution_time_ms, fire_time, response_time, delay_from_original_ms, early_fire_ms
 
@@ -575,15 +665,30 @@ def main():
     print("  • 50 ms   = Fire 50ms early (fast connection)")
     print("  • 100 ms  = Fire 100ms early (normal connection)")
     print("  • 150 ms  = Fire 150ms early (slower connection)")
+    print("  • auto    = Calibrate from measured round trips while waiting")
     print("-" * 60)
     
+    auto_calibrate = False
     while True:
-        offset_input = input("🚀 Enter early fire offset in ms (0-500, default=0): ").strip()
+        offset_input = input("🚀 Enter early fire offset in ms (0-500 or 'auto', default=0): ").strip()
         
         if offset_input == "":
             early_fire_ms = 0
             break
         
+        if offset_input.lower() == "auto":
+            auto_calibrate = True
+            early_fire_ms = 0
+            percentile_input = input(f"🎯 Target arrival percentile (1-99, default={ARRIVAL_PERCENTILE}): ").strip()
+            try:
+                arrival_percentile = float(percentile_input) if percentile_input else ARRIVAL_PERCENTILE
+                if not 1 <= arrival_percentile <= 99:
+                    raise ValueError
+            except ValueError:
+                print(f"⚠️ Using default percentile {ARRIVAL_PERCENTILE}")
+                arrival_percentile = ARRIVAL_PERCENTILE
+            break
+        
         try:
             early_fire_ms = int(offset_input)
             if early_fire_ms < 0 or early_fire_ms > 500:
@@ -598,7 +703,9 @@ def main():
     time_until = (adjusted_fire_time - datetime.now()).total_seconds()
     
     print(f"\n✅ Target time:      {scheduled_time.strftime('%H:%M:%S.000')}")
-    if early_fire_ms > 0:
+    if auto_calibrate:
+        print(f"🚀 Early fire offset: auto (p{arrival_percentile:g} arrival)")
+    elif early_fire_ms > 0:
         print(f"🚀 Early fire offset: -{early_fire_ms} ms")
         print(f"⚡ Actual fire time:  {adjusted_fire_time.strftime('%H:%M:%S.%f')[:-3]}")
     print(f"⏱️  Time until fire:  {time_until:.1f} seconds")
@@ -617,9 +724,37 @@ def main():
         print("❌ Failed to initialize Fyers client. Exiting.")
         return
     
-    # 2b. Warm up connection
-    print("\n🔥 Warming up connection...")
-    warm_connection(fyers)
+    # 2a'. Measure the clock offset to the reference clock
+    print("\n🕐 Syncing clock...")
+    clock_sync = ClockSync()
+    if clock_sync.measure():
+        print(f"✅ Clock offset: {clock_sync.describe()}")
+    else:
+        print(f"⚠️ Clock sync failed ({clock_sync.error}) - firing on the local clock")
+    
+    # 2b. Open the broker connection pool (DNS, TCP and TLS happen here, not at fire time)
+    print("\n🔥 Opening broker connections...")
+    broker = BrokerConnectionManager.for_client(fyers)
+    try:
+        healthy = broker.start()
+        print(f"✅ {healthy}/{len(broker.connections)} connections to {broker.host} ({broker.address}) | "
+              f"best RTT {broker.best_rtt_ms() or 0:.2f}ms")
+    except Exception as e:
+        print(f"⚠️ Connection pool unavailable ({e}) - warming the SDK session instead")
+        broker.close()
+        broker = None
+        warm_connection(fyers)
+    
+    # 2b'. Seed the early-fire calibration (the pool keeps feeding it while we wait)
+    calibrator = None
+    if auto_calibrate:
+        print("\n📐 Calibrating early-fire offset...")
+        calibrator = FireCalibrator(arrival_percentile)
+        if broker:
+            broker.on_probe = calibrator.add_rtt
+            for _ in range(CALIBRATION_SEED_ROUNDS):
+                broker.probe_idle()
+        print(f"✅ Early fire: {calibrator.describe()}")
     
     # 2c. Prepare orders - Ask user for symbol and quantity
     print("\n📝 Preparing order data...")
@@ -683,23 +818,30 @@ def main():
         side_str = "BUY" if order['side'] == 1 else "SELL"
         print(f"   {i}. {order['symbol']} - {side_str} {order['qty']} @ MARKET")
     
-    # 2d. Start connection keeper
-    print("\n🔄 Starting connection keep-alive...")
+    # 2d. Keep connections alive: the pool probes its own; the SDK session needs a keeper
     stop_event = threading.Event()
-    keeper_thread = threading.Thread(
-        target=keep_connection_alive,
-        args=(fyers, stop_event, 5),
-        daemon=True
-    )
-    keeper_thread.start()
+    if broker is None:
+        print("\n🔄 Starting connection keep-alive...")
+        keeper_thread = threading.Thread(
+            target=keep_connection_alive,
+            args=(fyers, stop_event, 5),
+            daemon=True
+        )
+        keeper_thread.start()
     
     # 2e. Final preparation status
     print("\n" + "─" * 60)
     print("✅ ALL PREPARATION COMPLETE!")
     print("─" * 60)
     print("   • Fyers client: Ready")
-    print("   • Connection: Warmed")
+    if broker:
+        print(f"   • Connections: {len(broker.connections)} pinned to {broker.address}, probed every {broker.probe_interval:g}s")
+    else:
+        print("   • Connection: Warmed")
     print("   • Orders: Pre-built")
+    print(f"   • Clock: {clock_sync.describe()}")
+    if calibrator:
+        print(f"   • Early fire: {calibrator.describe()}")
     print("   • Keep-alive: Active")
     print("\n🎯 At execution time, ONLY the API call will be made.")
     print("   No processing, no delays - just FIRE!")
@@ -711,62 +853,76 @@ def main():
     print("STEP 3: WAITING FOR SCHEDULED TIME")
     print("─" * 60)
     
-    # This function waits AND fires the order at the exact time (or early)
-    response, execution_time_ms, fire_time, response_time, delay_ms, used_offset = wait_and_fire_at_exact_time(
-        scheduled_time, fyers, orders_data, early_fire_ms
-    )
-    
-    # Stop keeper after firing
-    stop_event.set()
-    
-    # ═══════════════════════════════════════════════════════════
-    # RESULTS
-    # ═══════════════════════════════════════════════════════════
-    print("🚀 ORDER FIRED!")
-    print(f"🎯 Target Time:    {scheduled_time.strftime('%H:%M:%S.000')}")
-    if used_offset > 0:
-        print(f"🚀 Early Offset:   -{used_offset} ms")
-    print(f"⏰ Actual Fire:    {fire_time.strftime('%H:%M:%S.%f')[:-3]}")
-    print(f"📨 Response:       {response_time.strftime('%H:%M:%S.%f')[:-3]}")
-    
-    print("\n" + "=" * 60)
-    print("⚡ TIMING RESULTS")
-    print("=" * 60)
-    
-    # Show delay from target
-    if delay_ms >= 0:
-        delay_str = f"+{delay_ms:.2f}ms (late)"
-    else:
-        delay_str = f"{delay_ms:.2f}ms (early)"
-    
-    print(f"")
-    print(f"   🎯 Fire Delay from Target: {delay_str}")
-    print(f"   ⏱️  API Round-Trip Time:    {execution_time_ms:.2f} ms")
-    print(f"   📊 Total (Delay + API):     {delay_ms + execution_time_ms:.2f} ms")
-    print(f"")
-    
-    # Rating based on fire delay
-    if abs(delay_ms) < 5:
-        fire_rating = "🚀 PERFECT (<5ms)"
-    elif abs(delay_ms) < 20:
-        fire_rating = "⚡ EXCELLENT (<20ms)"
-    elif abs(delay_ms) < 50:
-        fire_rating = "✅ VERY GOOD (<50ms)"
-    elif abs(delay_ms) < 100:
-        fire_rating = "👍 GOOD (<100ms)"
-    else:
-        fire_rating = "⚠️ NEEDS IMPROVEMENT"
-    
-    print(f"   🏆 Fire Precision: {fire_rating}")
-    print("=" * 60)
-    
-    # Parse response
-    parse_basket_response(response)
-    
-    # Raw response
-    print("\n🔍 Raw Response:")
-    print(response)
-
+    # Whatever happens at fire time, the keeper, pool and clock stand-in are stopped
+    try:
+        # This function waits AND fires the order at the exact time (or early)
+        response, execution_time_ms, fire_time, response_time, delay_ms, used_offset = wait_and_fire_at_exact_time(
+            scheduled_time, fyers, orders_data, early_fire_ms, broker=broker, clock_sync=clock_sync,
+            calibrator=calibrator
+        )
+        
+        # ═══════════════════════════════════════════════════════════
+        # RESULTS
+        # ═══════════════════════════════════════════════════════════
+        print("🚀 ORDER FIRED!")
+        print(f"🎯 Target Time:    {scheduled_time.strftime('%H:%M:%S.000')}")
+        if used_offset > 0:
+            print(f"🚀 Early Offset:   -{used_offset} ms")
+        if calibrator:
+            print(f"📐 Calibration:    {calibrator.describe()}")
+        print(f"⏰ Actual Fire:    {fire_time.strftime('%H:%M:%S.%f')[:-3]}")
+        print(f"📨 Response:       {response_time.strftime('%H:%M:%S.%f')[:-3]}")
+        
+        print("\n" + "=" * 60)
+        print("⚡ TIMING RESULTS")
+        print("=" * 60)
+        
+        # Show delay from target
+        if delay_ms >= 0:
+            delay_str = f"+{delay_ms:.2f}ms (late)"
+        else:
+            delay_str = f"{delay_ms:.2f}ms (early)"
+        
+        print(f"")
+        print(f"   🎯 Fire Delay from Target: {delay_str}")
+        if clock_sync.is_synced():
+            print(f"   🕐 Clock Offset:           {clock_sync.offset_ms:+.2f} ms (reference {clock_sync.reference})")
+            print(f"   📏 Clock Uncertainty:      ±{clock_sync.uncertainty_ms:.2f} ms "
+                  f"(delay is {delay_ms - clock_sync.uncertainty_ms:+.2f} to {delay_ms + clock_sync.uncertainty_ms:+.2f} ms)")
+        else:
+            print(f"   🕐 Clock:                  local (not synced - {clock_sync.error})")
+        print(f"   ⏱️  API Round-Trip Time:    {execution_time_ms:.2f} ms")
+        print(f"   📊 Total (Delay + API):     {delay_ms + execution_time_ms:.2f} ms")
+        print(f"")
+        
+        # Rating based on fire delay
+        if abs(delay_ms) < 5:
+            fire_rating = "🚀 PERFECT (<5ms)"
+        elif abs(delay_ms) < 20:
+            fire_rating = "⚡ EXCELLENT (<20ms)"
+        elif abs(delay_ms) < 50:
+            fire_rating = "✅ VERY GOOD (<50ms)"
+        elif abs(delay_ms) < 100:
+            fire_rating = "👍 GOOD (<100ms)"
+        else:
+            fire_rating = "⚠️ NEEDS IMPROVEMENT"
+        
+        print(f"   🏆 Fire Precision: {fire_rating}")
+        print("=" * 60)
+        
+        # Parse response
+        parse_basket_response(response)
+        
+        # Raw response
+        print("\n🔍 Raw Response:")
+        print(response)
+
+    finally:
+        # Stop keeper / connection pool after firing
+        stop_event.set()
+        if broker:
+            broker.close()
+        clock_sync.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Fire Calibration
+Choose the early-fire offset from measured round trips instead of a guess.
+
+RTT samples to the order host are halved into one-way latencies (the path is
+assumed symmetric) and a log-normal is fitted to the most recent window. The
+offset is the one-way latency at the target arrival percentile: firing that
+many ms early, the order reaches the broker by the target instant in that
+share of cases (50 = median arrival on target; higher = arrive early more often).
+"""
+
+import math
+import statistics
+import threading
+from collections import deque
+
+
+# Target share (%) of orders that should arrive by the target instant
+ARRIVAL_PERCENTILE = 50
+
+# Most recent RTT samples used for the fit
+CALIBRATION_WINDOW = 120
+
+# Samples needed before an offset is proposed
+MIN_CALIBRATION_SAMPLES = 10
+
+# Probe rounds over the connection pool used to seed the fit before the wait
+CALIBRATION_SEED_ROUNDS = 10
+
+# Offset bounds (ms), same range the manual prompt accepts
+MAX_EARLY_FIRE_MS = 500
+
+
+class FireCalibrator:
+    """
+    Rolling early-fire offset from RTT samples.
+
+    add_rtt() may be called from any thread (e.g. as the connection pool's
+    probe callback); offset_ms() refits on the current window each call.
+    """
+
+    def __init__(self, arrival_percentile=ARRIVAL_PERCENTILE, window=CALIBRATION_WINDOW,
+                 min_samples=MIN_CALIBRATION_SAMPLES):
+        """
+        Args:
+            arrival_percentile (float): Target arrival percentile, 1-99
+            window (int): Most recent samples kept
+            min_samples (int): Samples required before offset_ms() returns a value
+        """
+        if not 0 < arrival_percentile < 100:
+            raise Exception(f"Arrival percentile must be between 0 and 100, got {arrival_percentile}")
+        self.arrival_percentile = arrival_percentile
+        self.min_samples = min_samples
+        self.rtts = deque(maxlen=window)
+        self.total_samples = 0
+        self._lock = threading.Lock()
+
+    def add_rtt(self, rtt_ms):
+        if rtt_ms is None or rtt_ms <= 0:
+            return
+        with self._lock:
+            self.rtts.append(rtt_ms)
+            self.total_samples += 1
+
+    def fit(self):
+        """
+        Log-normal fit of the one-way latency (RTT / 2) over the window.
+
+        Returns:
+            dict: samples, mu, sigma, offset_ms (fitted percentile), empirical_ms,
+                rtt_p50_ms, rtt_p90_ms - or None below min_samples
+        """
+        with self._lock:
+            rtts = sorted(self.rtts)
+        if len(rtts) < self.min_samples:
+            return None
+
+        logs = [math.log(rtt / 2) for rtt in rtts]
+        mu = statistics.fmean(logs)
+        sigma = statistics.pstdev(logs, mu)
+        z = statistics.NormalDist().inv_cdf(self.arrival_percentile / 100)
+        fitted = math.exp(mu + sigma * z)
+
+        def rtt_percentile(pct):
+            return rtts[min(len(rtts) - 1, int(len(rtts) * pct / 100))]
+
+        return {
+            "samples": len(rtts),
+            "mu": mu,
+            "sigma": sigma,
+            "offset_ms": round(min(max(fitted, 0.0), MAX_EARLY_FIRE_MS), 1),
+            "empirical_ms": rtt_percentile(self.arrival_percentile) / 2,
+            "rtt_p50_ms": rtt_percentile(50),
+            "rtt_p90_ms": rtt_percentile(90)
+        }
+
+    def offset_ms(self):
+        """Current early-fire offset in ms (None until min_samples RTTs were seen)."""
+        fit = self.fit()
+        return fit["offset_ms"] if fit else None
+
+    def describe(self):
+        fit = self.fit()
+        if fit is None:
+            return f"calibrating ({len(self.rtts)}/{self.min_samples} RTT samples)"
+        return (f"-{fit['offset_ms']:.1f} ms = p{self.arrival_percentile:g} one-way latency "
+                f"(empirical {fit['empirical_ms']:.1f} ms) | RTT p50 {fit['rtt_p50_ms']:.1f} ms, "
+                f"p90 {fit['rtt_p90_ms']:.1f} ms | n={fit['samples']}")
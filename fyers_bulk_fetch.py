@@ -0,0 +1,352 @@
+"""
+Fyers Bulk Fetcher
+Concurrent, rate-limit-aware access to the Fyers data API.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# Fyers API v3 per-app quotas
+FYERS_REQUESTS_PER_SECOND = 10
+FYERS_REQUESTS_PER_MINUTE = 200
+
+# Retry policy for throttled / transient failures
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills at
+    `refill_rate` tokens per second.
+    """
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.last_refill = now
+
+    def time_until_available(self, now):
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.refill_rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter built from several token buckets.
+    A request is only let through when every bucket has a token, so the
+    per-second and per-minute quotas are enforced together.
+    """
+
+    def __init__(self, limits):
+        """
+        Args:
+            limits (list): (requests, period_seconds, burst) tuples, e.g. [(10, 1, 1), (200, 60, 200)].
+                Each bucket refills at requests/period and holds at most `burst` tokens.
+        """
+        self._buckets = [TokenBucket(burst, requests / period) for requests, period, burst in limits]
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = max(bucket.time_until_available(now) for bucket in self._buckets)
+                    if wait <= 0:
+                        for bucket in self._buckets:
+                            bucket.consume()
+                        return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Hold back every caller for `seconds`.
+        Used when the server answers 429 so all workers back off together
+        instead of each one hammering the endpoint.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+# Shared limiter - every Fyers data request in the process should go through it.
+# The per-second quota is paced evenly (no burst) so a full bucket plus its refill
+# can never put ~2x the quota into one second; the per-minute quota may burst.
+FYERS_LIMITER = RateLimiter([
+    (FYERS_REQUESTS_PER_SECOND, 1, 1),
+    (FYERS_REQUESTS_PER_MINUTE, 60, FYERS_REQUESTS_PER_MINUTE),
+])
+
+
+def is_rate_limited(response):
+    """
+    Check whether a Fyers API response is a 429 "request limit reached".
+
+    Args:
+        response (dict): Response returned by the Fyers SDK
+
+    Returns:
+        bool: True if the request was throttled
+    """
+    if not isinstance(response, dict):
+        return False
+    if response.get("code") == 429:
+        return True
+    return "request limit" in str(response.get("message", "")).lower()
+
+
+def is_transient_error(response):
+    """
+    Check whether a Fyers API response is a network/server failure worth retrying.
+    The SDK reports connection problems as code -99 and passes 5xx codes through.
+    """
+    if not isinstance(response, dict):
+        return False
+    code = response.get("code")
+    return code == -99 or (isinstance(code, int) and 500 <= code < 600)
+
+
+def call_with_retry(request_fn, limiter=FYERS_LIMITER, max_retries=MAX_RETRIES):
+    """
+    Call a Fyers API function under the rate limiter, backing off and
+    retrying when the server throttles us or the call fails transiently.
+
+    Args:
+        request_fn (callable): Zero-argument function performing one API call
+        limiter (RateLimiter): Limiter to acquire a slot from before each attempt
+            (None if request_fn limits itself)
+        max_retries (int): Number of retries after the first attempt
+
+    Returns:
+        dict: The last API response
+
+    Raises:
+        Exception: If the final attempt raised
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = request_fn()
+            error = None
+        except Exception as e:
+            response = None
+            error = e
+
+        throttled = is_rate_limited(response)
+        if error is None and not throttled and not is_transient_error(response):
+            return response
+
+        if attempt >= max_retries:
+            if error is not None:
+                raise error
+            return response
+
+        backoff = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+        backoff += random.uniform(0, BACKOFF_BASE_SECONDS)
+        if throttled and limiter is not None:
+            limiter.pause(backoff)
+        else:
+            time.sleep(backoff)
+        attempt += 1
+
+
+def fetch_bulk(symbols, request_fn, max_workers=DEFAULT_MAX_WORKERS, limiter=FYERS_LIMITER,
+               max_retries=MAX_RETRIES, on_result=None):
+    """
+    Run one API request per symbol in parallel under the shared rate limit.
+
+    Args:
+        symbols (list): Symbols to fetch
+        request_fn (callable): Function taking a symbol and returning the API response
+        max_workers (int): Number of concurrent requests in flight
+        limiter (RateLimiter): Limiter shared by all workers. Pass None when request_fn
+            already rate-limits and retries its own network calls (e.g. cache-backed fetchers)
+        max_retries (int): Retries per symbol on 429 / transient errors
+        on_result (callable): Optional callback(done, total, symbol, ok) run in the
+            calling thread after each symbol completes (for progress display)
+
+    Returns:
+        tuple: (responses, failures)
+            responses: {symbol: response} for every request that returned s == "ok"
+            failures: {symbol: reason} for everything else - nothing is dropped silently
+    """
+    responses = {}
+    failures = {}
+    total = len(symbols)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(call_with_retry, lambda s=symbol: request_fn(s), limiter, max_retries): symbol
+            for symbol in symbols
+        }
+
+        for done, future in enumerate(as_completed(futures), 1):
+            symbol = futures[future]
+            try:
+                response = future.result()
+                if isinstance(response, dict) and response.get("s") == "ok":
+                    responses[symbol] = response
+                else:
+                    message = response.get("message", "Unknown error") if isinstance(response, dict) else response
+                    code = response.get("code") if isinstance(response, dict) else None
+                    failures[symbol] = f"{message} (Code: {code})"
+            except Exception as e:
+                failures[symbol] = str(e)
+
+            if on_result:
+                on_result(done, total, symbol, symbol in responses)
+
+    return responses, failures
+
+
+# Fyers /quotes accepts at most 50 symbols per request
+QUOTES_BATCH_SIZE = 50
+
+
+def fetch_quotes_bulk(symbols, quotes_fn, batch_size=QUOTES_BATCH_SIZE, max_workers=DEFAULT_MAX_WORKERS,
+                      limiter=FYERS_LIMITER, max_retries=MAX_RETRIES):
+    """
+    Fetch quotes for many symbols with batched /quotes calls issued concurrently.
+
+    Args:
+        symbols (list): Symbols in Fyers format
+        quotes_fn (callable): The client's quotes method, e.g. fyers.quotes
+        batch_size (int): Symbols per request (Fyers maximum is 50)
+        max_workers (int): Number of batches in flight
+        limiter (RateLimiter): Limiter shared by all workers
+        max_retries (int): Retries per batch on 429 / transient errors
+
+    Returns:
+        tuple: (quotes, failures)
+            quotes: {symbol: quote values dict ("v" field: lp, open_price, prev_close_price, ...)}
+            failures: {symbol: reason} for every symbol without a usable quote
+    """
+    batches = [",".join(symbols[i:i + batch_size]) for i in range(0, len(symbols), batch_size)]
+
+    responses, batch_failures = fetch_bulk(
+        batches,
+        lambda batch: quotes_fn(data={"symbols": batch}),
+        max_workers=max_workers,
+        limiter=limiter,
+        max_retries=max_retries
+    )
+
+    quotes = {}
+    failures = {}
+
+    for batch, reason in batch_failures.items():
+        for symbol in batch.split(","):
+            failures[symbol] = reason
+
+    for batch, response in responses.items():
+        for item in response.get("d", []):
+            values = item.get("v", {})
+            if item.get("s") == "ok" and isinstance(values, dict):
+                quotes[item.get("n")] = values
+            else:
+                failures[item.get("n")] = str(values.get("errmsg", values) if isinstance(values, dict) else values)
+
+        for symbol in batch.split(","):
+            if symbol not in quotes and symbol not in failures:
+                failures[symbol] = "Missing from quotes response"
+
+    return quotes, failures
+
+
+# Longest range Fyers serves in one /history call
+HISTORY_MAX_DAYS_INTRADAY = 100
+HISTORY_MAX_DAYS_DAILY = 366
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def history_max_days(resolution):
+    """Maximum days per /history request for a resolution ("D"/"1D" daily, anything else intraday)."""
+    if str(resolution).upper() in ("D", "1D"):
+        return HISTORY_MAX_DAYS_DAILY
+    return HISTORY_MAX_DAYS_INTRADAY
+
+
+def split_history_range(range_from, range_to, resolution):
+    """
+    Split [range_from, range_to] into consecutive ranges Fyers accepts in one request.
+
+    Args:
+        range_from (int): Start timestamp (Unix epoch)
+        range_to (int): End timestamp (Unix epoch)
+        resolution (str): Candle resolution
+
+    Returns:
+        list: (chunk_from, chunk_to) tuples covering the range without overlap
+    """
+    span = history_max_days(resolution) * DAY_SECONDS
+    chunks = []
+    chunk_from = int(range_from)
+    while chunk_from <= range_to:
+        chunk_to = min(int(range_to), chunk_from + span - 1)
+        chunks.append((chunk_from, chunk_to))
+        chunk_from = chunk_to + 1
+    return chunks
+
+
+def fetch_history_chunked(request_fn, range_from, range_to, resolution, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Fetch a long history range as compliant chunks in parallel and merge them.
+
+    Args:
+        request_fn (callable): request_fn(chunk_from, chunk_to) -> Fyers history response.
+            Must do its own rate limiting (e.g. through call_with_retry).
+        range_from (int): Start timestamp (Unix epoch)
+        range_to (int): End timestamp (Unix epoch)
+        resolution (str): Candle resolution
+        max_workers (int): Chunks in flight
+
+    Returns:
+        dict: Response in the Fyers history format with candles sorted by timestamp
+            and de-duplicated, or the first failing chunk's response
+    """
+    chunks = split_history_range(range_from, range_to, resolution)
+
+    if len(chunks) == 1:
+        return request_fn(*chunks[0])
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        responses = list(executor.map(lambda chunk: request_fn(*chunk), chunks))
+
+    merged = {}
+    for response in responses:
+        if response.get("s") not in ("ok", "no_data"):
+            return response
+        for candle in response.get("candles", []):
+            merged[candle[0]] = candle
+
+    return {
+        "candles": [merged[ts] for ts in sorted(merged)],
+        "code": 200,
+        "message": "",
+        "s": "ok"
+    }
@@ -0,0 +1,109 @@
+"""
+Fyers Client Manager
+One authenticated Fyers client per process, shared by history, selection and execution.
+"""
+
+import threading
+import time
+from fyers_apiv3 import fyersModel
+from requests.adapters import HTTPAdapter
+
+from fyers_connection import (
+    APP_ID,
+    APP_TYPE,
+    get_stored_token,
+    is_token_valid
+)
+from fyers_bulk_fetch import FYERS_LIMITER
+
+
+# How long a successful token validation is trusted before get_profile is called again
+TOKEN_VALIDATION_TTL_SECONDS = 300
+
+# Keep-alive connections held by the shared session (>= bulk fetch workers)
+CONNECTION_POOL_SIZE = 16
+
+_lock = threading.Lock()
+_client = None
+_token = None
+_validated_at = None
+
+
+def _build_client(token):
+    """Create the FyersModel and widen its session's connection pool."""
+    client_id = f"{APP_ID}-{APP_TYPE}"
+
+    fyers = fyersModel.FyersModel(
+        client_id=client_id,
+        token=token,
+        is_async=False,
+        log_path=""
+    )
+
+    adapter = HTTPAdapter(pool_connections=CONNECTION_POOL_SIZE, pool_maxsize=CONNECTION_POOL_SIZE)
+    fyers.service.session.mount("https://", adapter)
+
+    return fyers
+
+
+def get_client(force_validate=False):
+    """
+    Get the shared authenticated Fyers client.
+
+    The token is read and validated (one get_profile round trip) only on the
+    first call and after TOKEN_VALIDATION_TTL_SECONDS have passed; every other
+    call returns the cached FyersModel, reusing its HTTP connection pool.
+
+    Args:
+        force_validate (bool): Re-read and re-validate the token now
+
+    Returns:
+        fyersModel.FyersModel: Authenticated Fyers client
+
+    Raises:
+        Exception: If token is not found or invalid
+    """
+    global _client, _token, _validated_at
+
+    with _lock:
+        now = time.monotonic()
+        if (not force_validate and _client is not None and _validated_at is not None
+                and now - _validated_at < TOKEN_VALIDATION_TTL_SECONDS):
+            return _client
+
+        token = get_stored_token()
+
+        if not token:
+            raise Exception("No stored token found. Please run fyers_connection.py first to authenticate.")
+
+        if _client is None or token != _token:
+            _client = _build_client(token)
+            _token = token
+
+        # Profile calls count against the same API quota as data calls
+        FYERS_LIMITER.acquire()
+        if not is_token_valid(token, fyers=_client):
+            _validated_at = None
+            raise Exception("Stored token is invalid or expired. Please run fyers_connection.py to get a new token.")
+
+        _validated_at = time.monotonic()
+        return _client
+
+
+def get_access_token():
+    """
+    Get the WebSocket access token ("APP_ID-APP_TYPE:token") for the validated client.
+
+    Returns:
+        str: Access token in the format expected by FyersDataSocket
+    """
+    get_client()
+    return f"{APP_ID}-{APP_TYPE}:{_token}"
+
+
+def invalidate():
+    """Forget the last validation so the next get_client() call re-checks the token."""
+    global _validated_at
+
+    with _lock:
+        _validated_at = None
@@ -121,18 +121,20 @@ def get_stored_token():
         print(f"Error reading token: {e}")
     return None
 
-def is_token_valid(token):
+def is_token_valid(token, fyers=None):
     try:
         if not token:
             return False
             
-        client_id = f"{APP_ID}-{APP_TYPE}"
-        fyers = fyersModel.FyersModel(
-            client_id=client_id,
-            token=token,
-            is_async=False,
-            log_path=""
-        )
+        # Reuse the caller's client (and its connection pool) when one is given
+        if fyers is None:
+            client_id = f"{APP_ID}-{APP_TYPE}"
+            fyers = fyersModel.FyersModel(
+                client_id=client_id,
+                token=token,
+                is_async=False,
+                log_path=""
+            )
         
         # Try to get profile to check if token is valid
         profile = fyers.get_profile()
@@ -6,20 +6,60 @@ Uses the official Fyers API v3 to fetch historical candlestick data.
 import os
 import sys
 from datetime import datetime, timedelta
-from fyers_apiv3 import fyersModel
-from fyers_apiv3.FyersWebsocket import data_ws
 import pandas as pd
 import time
 from order_sender import send as send_order
+from fyers_bulk_fetch import (
+    fetch_bulk,
+    fetch_quotes_bulk,
+    fetch_history_chunked,
+    call_with_retry,
+    QUOTES_BATCH_SIZE
+)
+from candle_store import fetch_history_cached
+from candle_array import parse_candles_array
+from nse_calendar import previous_session
+from tick_queue import TickQueue, TickWorker
+from top_k import TopKSelector
+from tick_ring_buffer import TickRingBuffer
+from symbol_registry import SymbolRegistry, SymbolState
+from dashboard import Dashboard
+from tick_clock import TICK_CLOCK
+from tick_recorder import TickRecorder
+from sharded_socket import ShardedDataSocket, shards_needed
+from universe_filter import prefilter_universe, print_prefilter_summary
+from selection_gate import SelectionGate, GATE_MESSAGE_TYPE, DEADLINE_MESSAGE_TYPE
+from latency_stats import LatencyTracker, print_latency_summary
 
 
-# Import connection utilities from fyers_connection
-from fyers_connection import (
-    APP_ID,
-    APP_TYPE,
-    get_stored_token,
-    is_token_valid
-)
+# Import connection utilities from fyers_client_manager
+from fyers_client_manager import get_client, get_access_token
+
+# Where selection gets yesterday's close: "SNAPSHOT" (batched quotes) or "HISTORY" (per-symbol candles)
+PREV_CLOSE_SOURCE = os.getenv("PREV_CLOSE_SOURCE", "SNAPSHOT")
+
+# Calendar days of history requested before the last session when loading prev-close
+PREV_CLOSE_LOOKBACK_DAYS = 7
+
+# Record every SymbolUpdate to recordings/ for post-mortems ("0" to disable)
+RECORD_TICKS = os.getenv("RECORD_TICKS", "1") != "0"
+
+# Gap evaluation starts at 9:10; the socket connects and subscribes CONNECT_LEAD_MINUTES earlier
+SELECTION_START_HOUR = 9
+SELECTION_START_MINUTE = 10
+CONNECT_LEAD_MINUTES = 2
+
+# NSE pre-open collects orders until 9:08, so opens seen before then are only indicative.
+# The lead above keeps the connect at 9:08; opens received before it are ignored anyway
+PRICE_DISCOVERY_HOUR = 9
+PRICE_DISCOVERY_MINUTE = 8
+
+# Selection is final this long after it opens; symbols that never ticked are filled from /quotes
+SELECTION_DEADLINE_SECONDS = 30
+# Extra time allowed for that quotes fallback before the socket is closed regardless
+SELECTION_FALLBACK_GRACE_SECONDS = 15
+# Retries per quotes batch in that fallback, so it finishes well inside the grace period
+SELECTION_FALLBACK_RETRIES = 1
 
 # NSE Stocks List
 NSE_STOCKS = [
@@ -128,6 +168,8 @@ def wait_for_market_time(target_hour=9, target_minute=10):
 def get_fyers_client():
     """
     Get an authenticated Fyers API client using stored token.
+    The client is shared process-wide and the token is only re-validated
+    once the validation TTL expires (see fyers_client_manager).
     
     Returns:
         fyersModel.FyersModel: Authenticated Fyers client
@@ -135,28 +177,11 @@ def get_fyers_client():
     Raises:
         Exception: If token is not found or invalid
     """
-    token = get_stored_token()
-    
-    if not token:
-        raise Exception("No stored token found. Please run fyers_connection.py first to authenticate.")
-    
-    if not is_token_valid(token):
-        raise Exception("Stored token is invalid or expired. Please run fyers_connection.py to get a new token.")
-    
-    client_id = f"{APP_ID}-{APP_TYPE}"
-    
-    fyers = fyersModel.FyersModel(
-        client_id=client_id,
-        token=token,
-        is_async=False,
-        log_path=""
-    )
-    
-    return fyers
+    return get_client()
 
 
 def fetch_historical_data(symbol, resolution="D", range_from=None, range_to=None, 
-                          date_format="0", cont_flag="1"):
+                          date_format="0", cont_flag="1", use_store=True):
     """
     Fetch historical candlestick data from Fyers API.
     
@@ -175,6 +200,8 @@ def fetch_historical_data(symbol, resolution="D", range_from=None, range_to=None
         cont_flag (str): 
             - "0" for only current expiry data
             - "1" for continuous data (for F&O)
+        use_store (bool): Serve already-downloaded candles from the local candle store
+            and only request the missing ranges (default: True, epoch date_format only)
     
     Returns:
         dict: API response containing candle data
@@ -188,9 +215,6 @@ def fetch_historical_data(symbol, resolution="D", range_from=None, range_to=None
     Raises:
         Exception: If API call fails or client cannot be initialized
     """
-    # Get authenticated client
-    fyers = get_fyers_client()
-    
     # Set default date range if not provided (last 30 days)
     if range_from is None:
         range_from = int((datetime.now() - timedelta(days=30)).timestamp())
@@ -203,20 +227,32 @@ def fetch_historical_data(symbol, resolution="D", range_from=None, range_to=None
     if isinstance(range_to, datetime):
         range_to = int(range_to.timestamp())
     
-    # Prepare the request data according to Fyers API documentation
-    data = {
-        "symbol": symbol,
-        "resolution": resolution,
-        "date_format": date_format,
-        "range_from": str(range_from),
-        "range_to": str(range_to),
-        "cont_flag": cont_flag
-    }
+    def request_chunk(chunk_from, chunk_to):
+        # Prepare the request data according to Fyers API documentation
+        data = {
+            "symbol": symbol,
+            "resolution": resolution,
+            "date_format": date_format,
+            "range_from": str(chunk_from),
+            "range_to": str(chunk_to),
+            "cont_flag": cont_flag
+        }
+        
+        # Fetch historical data using the shared client, under the Fyers rate limit
+        return call_with_retry(lambda: get_fyers_client().history(data=data))
     
-    # Fetch historical data using Fyers API
-    response = fyers.history(data=data)
+    def request_range(range_from, range_to):
+        # Long ranges are split into chunks Fyers accepts and fetched in parallel
+        return fetch_history_chunked(request_chunk, range_from, range_to, resolution)
     
-    return response
+    # Chunking and the local store only understand epoch timestamps
+    if date_format != "0":
+        return request_chunk(range_from, range_to)
+    
+    if use_store:
+        return fetch_history_cached(request_range, symbol, resolution, int(range_from), int(range_to))
+    
+    return request_range(int(range_from), int(range_to))
 
 
 def fetch_intraday_data(symbol, resolution="5", days_back=1):
@@ -266,61 +302,77 @@ def fetch_daily_data(symbol, days_back=365):
     )
 
 
+def backfill_history(symbols=None, resolution="1", days_back=90):
+    """
+    Download history for a whole universe into the local candle store.
+    Ranges are chunked to Fyers' per-request limit and everything runs
+    in parallel under the shared rate limit; already-stored ranges are skipped.
+    
+    Args:
+        symbols (list): Symbols in Fyers format (default: NSE_STOCKS)
+        resolution (str): Candle resolution (default: "1" minute)
+        days_back (int): Number of days to backfill (default: 90)
+    
+    Returns:
+        tuple: (responses, failures)
+            responses: {symbol: response with the merged candles}
+            failures: {symbol: reason}
+    """
+    symbols = symbols or NSE_STOCKS
+    range_to = datetime.now()
+    range_from = range_to - timedelta(days=days_back)
+    
+    def fetch_symbol(symbol):
+        return fetch_historical_data(
+            symbol=symbol,
+            resolution=resolution,
+            range_from=range_from,
+            range_to=range_to,
+            date_format="0"
+        )
+    
+    def show_progress(done, total, symbol, ok):
+        print(f"\r[{done}/{total}] Backfilled {symbol}...", end="", flush=True)
+    
+    responses, failures = fetch_bulk(symbols, fetch_symbol, limiter=None, max_retries=0,
+                                     on_result=show_progress)
+    
+    print(f"\n\n✅ Backfilled: {len(responses)} | ❌ Failed: {len(failures)}")
+    for symbol, reason in failures.items():
+        print(f"   • {symbol}: {reason}")
+    
+    return responses, failures
+
+
 def parse_candles(response):
     """
-    Parse the candle data from API response into a more usable format.
+    Parse the candle data from API response into a structured NumPy array.
+    No per-candle dict or datetime is built; timestamps stay int64 epochs and
+    wall-clock times are derived on request with candle_datetimes(arr).
     
     Args:
         response (dict): API response from fetch_historical_data
         
     Returns:
-        list: List of dictionaries with candle data
-            [{"timestamp": ..., "open": ..., "high": ..., "low": ..., "close": ..., "volume": ...}, ...]
+        np.ndarray: Array of CANDLE_DTYPE records
+            fields: ts, open, high, low, close, volume
         
     Raises:
         Exception: If response indicates an error
     """
-    if response.get("s") != "ok":
-        raise Exception(f"API Error: {response.get('message', 'Unknown error')} (Code: {response.get('code')})")
-    
-    candles = response.get("candles", [])
-    parsed_data = []
-    
-    for candle in candles:
-        parsed_data.append({
-            "timestamp": candle[0],
-            "datetime": datetime.fromtimestamp(candle[0]),
-            "open": candle[1],
-            "high": candle[2],
-            "low": candle[3],
-            "close": candle[4],
-            "volume": candle[5]
-        })
-    
-    return parsed_data
+    return parse_candles_array(response)
 
 
 def get_last_trading_day():
     """
     Calculate the last trading day from today.
-    If today is Monday, returns last Friday.
-    Otherwise, returns the previous day.
+    Uses the NSE calendar, so weekends, exchange holidays and special
+    sessions (Budget day, Muhurat trading) are all accounted for.
     
     Returns:
-        datetime: The last trading day
+        datetime: The last trading day (midnight)
     """
-    today = datetime.now()
-    # Get weekday (0=Monday, 6=Sunday)
-    weekday = today.weekday()
-    
-    if weekday == 0:  # Monday
-        last_trading_day = today - timedelta(days=3)  # Last Friday
-    elif weekday == 6:  # Sunday
-        last_trading_day = today - timedelta(days=2)  # Last Friday
-    else:
-        last_trading_day = today - timedelta(days=1)  # Previous day
-    
-    return last_trading_day
+    return datetime.combine(previous_session(), datetime.min.time())
 
 
 def fetch_last_trading_day_all_stocks(save_to_csv=False, csv_filename="last_trading_day_data.csv"):
@@ -334,6 +386,7 @@ def fetch_last_trading_day_all_stocks(save_to_csv=False, csv_filename="last_trad
     Returns:
         pd.DataFrame: DataFrame containing OHLCV data for all stocks
             Columns: Symbol, Date, Open, High, Low, Close, Volume
+            df.attrs['failed_symbols'] maps every symbol that could not be fetched to the reason
     """
     print("=" * 80)
     print("Fetching OHLCV Data for Last Trading Day - All NSE Stocks")
@@ -341,63 +394,61 @@ def fetch_last_trading_day_all_stocks(save_to_csv=False, csv_filename="last_trad
     
     # Calculate last trading day
     last_trading_day = get_last_trading_day()
-    last_trading_day_start = last_trading_day.replace(hour=0, minute=0, second=0, microsecond=0)
     last_trading_day_end = last_trading_day.replace(hour=23, minute=59, second=59, microsecond=999999)
+    # Look back a few sessions: if the calendar ever misses a holiday we still
+    # get each symbol's latest close instead of an empty prev-close table
+    lookback_start = last_trading_day - timedelta(days=PREV_CLOSE_LOOKBACK_DAYS)
     
     print(f"\n📅 Last Trading Day: {last_trading_day.strftime('%Y-%m-%d (%A)')}")
     print(f"📊 Total Stocks to Fetch: {len(NSE_STOCKS)}")
     print("\n" + "=" * 80)
     
     all_data = []
-    successful_count = 0
-    failed_count = 0
     failed_stocks = []
     
-    for idx, symbol in enumerate(NSE_STOCKS, 1):
-        try:
-            print(f"\r[{idx}/{len(NSE_STOCKS)}] Fetching {symbol}...", end="", flush=True)
-            
-            # Fetch daily data for last trading day
-            response = fetch_historical_data(
-                symbol=symbol,
-                resolution="D",
-                range_from=last_trading_day_start,
-                range_to=last_trading_day_end,
-                date_format="0"
-            )
-            
-            if response.get("s") == "ok" and response.get("candles"):
-                candles = response.get("candles", [])
-                
-                # Get the last candle (most recent)
-                if candles:
-                    last_candle = candles[-1]
-                    
-                    all_data.append({
-                        "Symbol": symbol,
-                        "Date": datetime.fromtimestamp(last_candle[0]).strftime('%Y-%m-%d'),
-                        "Timestamp": last_candle[0],
-                        "Open": last_candle[1],
-                        "High": last_candle[2],
-                        "Low": last_candle[3],
-                        "Close": last_candle[4],
-                        "Volume": last_candle[5]
-                    })
-                    successful_count += 1
-                else:
-                    failed_count += 1
-                    failed_stocks.append(symbol)
-            else:
-                failed_count += 1
-                failed_stocks.append(symbol)
-            
-            # Small delay to avoid rate limiting
-            time.sleep(0.1)
-            
-        except Exception as e:
-            failed_count += 1
+    def fetch_symbol(symbol):
+        # Fetch daily data for last trading day
+        return fetch_historical_data(
+            symbol=symbol,
+            resolution="D",
+            range_from=lookback_start,
+            range_to=last_trading_day_end,
+            date_format="0"
+        )
+    
+    def show_progress(done, total, symbol, ok):
+        print(f"\r[{done}/{total}] Fetched {symbol}...", end="", flush=True)
+    
+    # Symbols run in parallel; fetch_historical_data serves stored candles from disk and
+    # rate-limits/retries only the ranges it actually has to download
+    responses, failures = fetch_bulk(NSE_STOCKS, fetch_symbol, limiter=None, max_retries=0,
+                                     on_result=show_progress)
+    
+    for symbol in NSE_STOCKS:
+        response = responses.get(symbol)
+        candles = response.get("candles") if response else None
+        
+        if not candles:
             failed_stocks.append(symbol)
-            # print(f"\n⚠️  Failed to fetch {symbol}: {str(e)}")
+            failures.setdefault(symbol, "No candles returned")
+            continue
+        
+        # Get the last candle (most recent)
+        last_candle = candles[-1]
+        
+        all_data.append({
+            "Symbol": symbol,
+            "Date": datetime.fromtimestamp(last_candle[0]).strftime('%Y-%m-%d'),
+            "Timestamp": last_candle[0],
+            "Open": last_candle[1],
+            "High": last_candle[2],
+            "Low": last_candle[3],
+            "Close": last_candle[4],
+            "Volume": last_candle[5]
+        })
+    
+    successful_count = len(all_data)
+    failed_count = len(failed_stocks)
     
     print("\n" + "=" * 80)
     print("\n✅ Data Fetching Complete!")
@@ -408,13 +459,12 @@ def fetch_last_trading_day_all_stocks(save_to_csv=False, csv_filename="last_trad
     
     if failed_stocks:
         print(f"\n⚠️  Failed Stocks ({len(failed_stocks)}):")
-        for stock in failed_stocks[:10]:  # Show first 10 failed stocks
-            print(f"   • {stock}")
-        if len(failed_stocks) > 10:
-            print(f"   ... and {len(failed_stocks) - 10} more")
+        for stock in failed_stocks:
+            print(f"   • {stock}: {failures[stock]}")
     
     # Create DataFrame
     df = pd.DataFrame(all_data)
+    df.attrs['failed_symbols'] = {symbol: failures[symbol] for symbol in failed_stocks}
     
     if not df.empty:
         # Sort by symbol
@@ -440,130 +490,337 @@ def fetch_last_trading_day_all_stocks(save_to_csv=False, csv_filename="last_trad
     return df
 
 
+def fetch_prev_close_snapshot(save_to_csv=False, csv_filename="prev_close_snapshot.csv"):
+    """
+    Fetch the previous close of all NSE stocks from the batched quotes endpoint.
+    Needs ~len(NSE_STOCKS)/50 requests instead of one /history call per symbol.
+    
+    Args:
+        save_to_csv (bool): Whether to save the data to a CSV file (default: False)
+        csv_filename (str): Name of the CSV file to save data (default: "prev_close_snapshot.csv")
+    
+    Returns:
+        pd.DataFrame: DataFrame with one row per stock
+            Columns: Symbol, Close (previous session close), LTP
+            df.attrs['failed_symbols'] maps every symbol without a quote to the reason
+    """
+    print("=" * 80)
+    print("Fetching Previous Close Snapshot (Quotes) - All NSE Stocks")
+    print("=" * 80)
+    print(f"\n📊 Total Stocks: {len(NSE_STOCKS)} in batches of {QUOTES_BATCH_SIZE}")
+    
+    quotes, failures = fetch_quotes_bulk(NSE_STOCKS, get_fyers_client().quotes)
+    
+    all_data = []
+    for symbol in NSE_STOCKS:
+        quote = quotes.get(symbol)
+        if not quote or not quote.get("prev_close_price"):
+            failures.setdefault(symbol, "No previous close in quote")
+            continue
+        
+        all_data.append({
+            "Symbol": symbol,
+            "Close": quote["prev_close_price"],
+            "LTP": quote.get("lp")
+        })
+    
+    print(f"\n✅ Success: {len(all_data)} | ❌ Failed: {len(failures)}")
+    for symbol, reason in failures.items():
+        print(f"   • {symbol}: {reason}")
+    
+    df = pd.DataFrame(all_data)
+    df.attrs['failed_symbols'] = failures
+    
+    if not df.empty:
+        df = df.sort_values('Symbol').reset_index(drop=True)
+        
+        if save_to_csv:
+            df.to_csv(csv_filename, index=False)
+            print(f"\n💾 Data saved to: {csv_filename}")
+    
+    print("\n" + "=" * 80)
+    
+    return df
+
+
+def load_prev_close_table():
+    """
+    Load the previous-close table from PREV_CLOSE_SOURCE, falling back to
+    the other source if the first one comes back empty.
+    
+    Returns:
+        pd.DataFrame: DataFrame with at least 'Symbol' and 'Close' columns
+    
+    Raises:
+        Exception: If neither source returned any data
+    """
+    sources = [fetch_prev_close_snapshot, fetch_last_trading_day_all_stocks]
+    if PREV_CLOSE_SOURCE != "SNAPSHOT":
+        sources.reverse()
+    
+    for source in sources:
+        try:
+            df = source()
+        except Exception as e:
+            print(f"\n⚠️  {source.__name__} failed: {str(e)}")
+            continue
+        if not df.empty:
+            return df
+        print(f"\n⚠️  {source.__name__} returned no data, trying the other source...")
+    
+    raise Exception("Could not load previous close prices from quotes or history.")
+
+
 # ============================================================================
 # LIVE DATA STREAMING FUNCTIONALITY
 # ============================================================================
 
 # Global variables for WebSocket and filtering
-live_data_buffer = []
+symbol_registry = SymbolRegistry(NSE_STOCKS)  # Symbol -> dense integer id
+symbol_state = SymbolState(symbol_registry)  # Prev close / open / gap% / checked arrays indexed by symbol id
+live_data_buffer = TickRingBuffer(capacity=1000, registry=symbol_registry)  # Last 1000 ticks
 message_count = 0
 websocket_start_time = None
-historical_close_prices = {}  # Store last trading day close prices by symbol
-filtered_stocks = {}  # Store stocks that meet gap-up criteria
-gap_up_checked = set()  # Track which stocks have been checked for gap-up
 MAX_FILTERED_STOCKS = 2  # Maximum number of stocks to filter (top 2 with highest gap-up)
+MIN_STOCK_PRICE = 100  # Minimum previous close
+subscribed_symbols = list(NSE_STOCKS)  # Symbols streamed after the pre-subscription prefilter
+filtered_stocks = TopKSelector(MAX_FILTERED_STOCKS)  # Top gap-up stocks that meet the criteria
 fyers_ws_instance = None  # Store WebSocket instance for closing connection
+tick_queue = TickQueue()  # Socket thread -> tick worker hand-off
+tick_worker = None  # Thread running process_message()
+dashboard = None  # Thread redrawing the terminal status line (5 Hz)
+tick_recorder = None  # Background writer for the full-session tick capture
+latency_tracker = LatencyTracker()  # Feed/queue/process latency histograms per shard and per second
+selection_gate = SelectionGate()  # Opens gap evaluation at SELECTION_START, forces it final at the deadline
 
 
 def onmessage(message):
     """
     Callback function to handle incoming WebSocket messages.
-    Filters stocks with gap-up between 1.8% and 8.4%.
+    Runs on the SDK's socket thread, so it only stamps the receive time and
+    enqueues the message; filtering happens in process_message() on the tick worker.
     
     Parameters:
         message (dict): The received message from the WebSocket containing live market data.
     """
-    global message_count, live_data_buffer, historical_close_prices, filtered_stocks, gap_up_checked
+    message['recv_ns'] = time.monotonic_ns()
+    tick_queue.put(message)
+
+
+def process_message(message):
+    """
+    Handle one queued WebSocket message on the tick worker thread.
+    Filters stocks with gap-up between 1.8% and 8.4%.
     
-    message_count += 1
+    Parameters:
+        message (dict): Message from onmessage() with 'recv_ns' (monotonic ns) set.
+    """
+    global message_count, live_data_buffer, filtered_stocks
     
-    # Add timestamp
-    message['received_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    # Gate marker queued by selection_gate at the start instant (not a tick)
+    if message.get('type') == GATE_MESSAGE_TYPE:
+        if selection_gate.check(message['recv_ns']):
+            open_selection_window()
+        return
     
-    # Store in buffer (keep last 1000)
-    live_data_buffer.append(message)
-    if len(live_data_buffer) > 1000:
-        live_data_buffer.pop(0)
+    # Deadline marker: finalize with whatever has not ticked yet taken from quotes
+    if message.get('type') == DEADLINE_MESSAGE_TYPE:
+        if selection_gate.check_deadline(message['recv_ns']):
+            expire_selection()
+        return
+    
+    message_count += 1
     
     # Check for gap-up filtering
     if 'symbol' in message:
         symbol = message.get('symbol', 'N/A')
         open_price = message.get('open_price')
         ltp = message.get('ltp', 'N/A')
-        volume = message.get('vol_traded_today', 'N/A')
-        change = message.get('ch', 'N/A')
-        change_pct = message.get('chp', 'N/A')
+        symbol_id = symbol_registry.intern(symbol)
         
-        # Check for gap-up if we have historical data and haven't checked this stock yet
-        if symbol in historical_close_prices and symbol not in gap_up_checked and open_price:
-            prev_close = historical_close_prices[symbol]
-            
-            # Calculate gap-up percentage: (open - prev_close) / prev_close * 100
-            gap_up_pct = ((open_price - prev_close) / prev_close) * 100
+        # Store in ring buffer (keeps last 1000 ticks) and the session recording (every tick)
+        live_data_buffer.append_message(message, symbol_id)
+        if tick_recorder:
+            tick_recorder.record(message, symbol_id)
+        
+        # Selection is final - keep buffering/recording only
+        if selection_gate.is_finished():
+            return
+        
+        # Before the selection window only keep each symbol's latest tick; all are evaluated when it opens
+        if not selection_gate.is_open():
+            symbol_state.observe(symbol_id, open_price, ltp, message['recv_ns'])
+            if selection_gate.check(message['recv_ns']):
+                open_selection_window()
+            return
+        
+        if selection_gate.check_deadline(message['recv_ns']):
+            expire_selection()
+            return
+        
+        # Gap-up % = (open - prev_close) / prev_close * 100; None if already checked or no prev close
+        gap_up_pct = symbol_state.check_gap(symbol_id, open_price) if open_price else None
+        
+        if gap_up_pct is not None:
+            prev_close = float(symbol_state.prev_close[symbol_id])
             
-            # Filter: gap-up >= 1.8% and < 8.4% AND minimum stock price >= 100
-            if 1.8 <= gap_up_pct < 8.4 and prev_close >= 100:
-                # Add stock to filtered list
-                filtered_stocks[symbol] = {
+            # Filter: gap-up >= 1.8% and < 8.4% AND minimum stock price >= MIN_STOCK_PRICE
+            if 1.8 <= gap_up_pct < 8.4 and prev_close >= MIN_STOCK_PRICE:
+                # Offer to the top-N heap (kept only if it beats the current weakest)
+                filtered_stocks.offer(symbol, gap_up_pct, {
                     'prev_close': prev_close,
                     'open_price': open_price,
                     'gap_up_pct': gap_up_pct,
                     'ltp': ltp,
-                    'timestamp': message['received_at']
-                }
+                    'recv_ns': message['recv_ns']
+                })
                 
-                # Keep only top N stocks with highest gap-up percentage
-                if len(filtered_stocks) > MAX_FILTERED_STOCKS:
-                    # Sort by gap_up_pct and keep only top N
-                    sorted_stocks = sorted(
-                        filtered_stocks.items(),
-                        key=lambda x: x[1]['gap_up_pct'],
-                        reverse=True
-                    )
-                    # Keep only top MAX_FILTERED_STOCKS
-                    filtered_stocks.clear()
-                    for sym, data in sorted_stocks[:MAX_FILTERED_STOCKS]:
-                        filtered_stocks[sym] = data
-                
-                # Print alert for filtered stock
-                print(f"\n\n🟢 CANDIDATE: {symbol} | Gap-Up: {gap_up_pct:.2f}% | Prev Close: {prev_close} | Open: {open_price}")
-                
-                # Show current top 2
-                if filtered_stocks:
-                    print(f"\n🏆 TOP {MAX_FILTERED_STOCKS} STOCKS (Updated):")
-                    sorted_current = sorted(
-                        filtered_stocks.items(),
-                        key=lambda x: x[1]['gap_up_pct'],
-                        reverse=True
-                    )
-                    for rank, (sym, data) in enumerate(sorted_current, 1):
-                        print(f"   {rank}. {sym:20s} | Gap-Up: {data['gap_up_pct']:.2f}%")
-                print("-" * 80)
-            
-            # Mark as checked
-            gap_up_checked.add(symbol)
+                # Alert for filtered stock (printed by the dashboard; the leaderboard is on its status line)
+                post_event(f"🟢 CANDIDATE: {symbol} | Gap-Up: {gap_up_pct:.2f}% | Prev Close: {prev_close} | Open: {open_price}")
             
             # Check if all stocks have been evaluated
-            if len(gap_up_checked) >= len(historical_close_prices):
-                print("\n\n" + "=" * 80)
-                print("✅ ALL STOCKS EVALUATED - SELECTION COMPLETE")
-                print("=" * 80)
-                
-                if len(filtered_stocks) >= MAX_FILTERED_STOCKS:
-                    print(f"\n🎯 Final Top {MAX_FILTERED_STOCKS} Shortlisted Stocks:")
-                    sorted_final = sorted(
-                        filtered_stocks.items(),
-                        key=lambda x: x[1]['gap_up_pct'],
-                        reverse=True
-                    )
-                    for rank, (sym, data) in enumerate(sorted_final, 1):
-                        print(f"   {rank}. {sym:20s} | Gap-Up: {data['gap_up_pct']:.2f}% | Open: {data['open_price']:.2f}")
-                
-                print("\n🔌 Disconnecting WebSocket...")
-                print("=" * 80 + "\n")
-                
-                # Unsubscribe and close the WebSocket connection
-                if fyers_ws_instance:
-                    try:
-                        # Unsubscribe from all stocks
-                        fyers_ws_instance.unsubscribe(symbols=NSE_STOCKS, data_type="SymbolUpdate")
-                        print("✅ Unsubscribed from all symbols")
-                    except Exception as e:
-                        print(f"Note: Disconnect - {e}")
+            if symbol_state.all_checked():
+                finish_selection()
+
+
+def price_discovery_ns():
+    """Monotonic instant pre-open price discovery ends; opens received earlier are only indicative."""
+    if selection_gate.gate_ns is None:
+        return None
+    lead_minutes = (SELECTION_START_HOUR - PRICE_DISCOVERY_HOUR) * 60 + SELECTION_START_MINUTE - PRICE_DISCOVERY_MINUTE
+    return selection_gate.gate_ns - lead_minutes * 60 * 1_000_000_000
+
+
+def open_selection_window():
+    """
+    Open the selection window: evaluate every symbol buffered before the gate
+    in one vectorized pass, then let later ticks be checked one by one.
+    Runs on the tick worker thread.
+    """
+    evaluated = symbol_state.evaluate_pending(price_discovery_ns())
+    offer_evaluated(evaluated)
+    
+    late_ms = TICK_CLOCK.elapsed_ms(selection_gate.gate_ns, selection_gate.opened_ns)
+    post_event(f"🔔 Selection window open: evaluated {len(evaluated)} buffered symbols "
+               f"{late_ms:.1f} ms after {SELECTION_START_HOUR:02d}:{SELECTION_START_MINUTE:02d}")
+    
+    if symbol_state.all_checked():
+        finish_selection()
+
+
+def offer_evaluated(symbol_ids):
+    """
+    Offer the qualifying symbols of a batch evaluation to the top-N heap,
+    using each symbol's last observed tick for ltp and timestamp.
+    
+    Parameters:
+        symbol_ids (np.ndarray): Registry ids evaluated by SymbolState.evaluate_pending()
+    """
+    # Same criteria as process_message: gap-up >= 1.8% and < 8.4%, prev close >= MIN_STOCK_PRICE
+    for symbol_id in symbol_state.qualifying(1.8, 8.4, MIN_STOCK_PRICE, ids=symbol_ids).tolist():
+        symbol = symbol_registry.name(symbol_id)
+        gap_up_pct = float(symbol_state.gap_pct[symbol_id])
+        prev_close = float(symbol_state.prev_close[symbol_id])
+        open_price = float(symbol_state.open_price[symbol_id])
+        filtered_stocks.offer(symbol, gap_up_pct, {
+            'prev_close': prev_close,
+            'open_price': open_price,
+            'gap_up_pct': gap_up_pct,
+            'ltp': float(symbol_state.last_ltp[symbol_id]),
+            'recv_ns': int(symbol_state.last_recv_ns[symbol_id])
+        })
+        post_event(f"🟢 CANDIDATE: {symbol} | Gap-Up: {gap_up_pct:.2f}% | Prev Close: {prev_close} | Open: {open_price}")
+
+
+def expire_selection():
+    """
+    Selection deadline reached: symbols that never ticked (illiquid, halted) are
+    evaluated from one concurrent batched quotes call, then the selection is finalized.
+    Runs on the tick worker thread.
+    """
+    stragglers = symbol_state.unchecked()
+    post_event(f"⏱️  Selection deadline reached with {len(stragglers)} symbols not evaluated")
+    
+    if len(stragglers):
+        names = symbol_registry.names(stragglers).tolist()
+        try:
+            quotes, failures = fetch_quotes_bulk(names, get_fyers_client().quotes, max_retries=SELECTION_FALLBACK_RETRIES)
+        except Exception as e:
+            quotes, failures = {}, {symbol: str(e) for symbol in names}
+        fetched_ns = time.monotonic_ns()
+        
+        # Quotes carry today's open like a SymbolUpdate - evaluate them the same way
+        for symbol_id, symbol in zip(stragglers.tolist(), names):
+            quote = quotes.get(symbol)
+            if quote:
+                symbol_state.observe(symbol_id, quote.get('open_price'), quote.get('lp'), fetched_ns)
+        offer_evaluated(symbol_state.evaluate_pending(price_discovery_ns()))
         
-        # Print compact live update
-        print(f"\r[{message_count:6d}] {symbol:20s} | LTP: {ltp:>8} | Vol: {volume:>10} | Chg: {change:>8} ({change_pct:>6}%)", 
-              end='', flush=True)
+        post_event(f"   📡 Quotes fallback: {len(quotes)} fetched | {len(failures)} failed "
+                   f"({TICK_CLOCK.elapsed_ms(selection_gate.expired_ns, fetched_ns):.0f} ms)")
+    
+    finish_selection("DEADLINE REACHED")
+
+
+def finish_selection(reason="ALL STOCKS EVALUATED"):
+    """
+    Mark the selection final (once), print the shortlist and unsubscribe.
+    
+    Parameters:
+        reason (str): Shown in the completion banner.
+    """
+    if not selection_gate.finish():
+        return
+    
+    lines = ["", "=" * 80, f"✅ {reason} - SELECTION COMPLETE", "=" * 80]
+    
+    if len(filtered_stocks) >= MAX_FILTERED_STOCKS:
+        lines.append(f"\n🎯 Final Top {MAX_FILTERED_STOCKS} Shortlisted Stocks:")
+        for rank, (sym, data) in enumerate(filtered_stocks.snapshot(), 1):
+            lines.append(f"   {rank}. {sym:20s} | Gap-Up: {data['gap_up_pct']:.2f}% | Open: {data['open_price']:.2f}")
+    
+    lines.append("\n🔌 Disconnecting WebSocket...")
+    lines.append("=" * 80)
+    post_event("\n".join(lines))
+    
+    # Unsubscribe and close the WebSocket connection
+    if fyers_ws_instance:
+        try:
+            # Unsubscribe from all stocks
+            fyers_ws_instance.unsubscribe(symbols=subscribed_symbols, data_type="SymbolUpdate")
+            post_event("✅ Unsubscribed from all symbols")
+        except Exception as e:
+            post_event(f"Note: Disconnect - {e}")
+
+
+def post_event(text):
+    """Print a line above the dashboard status line (or directly if no dashboard is running)."""
+    if dashboard:
+        dashboard.post(text)
+    else:
+        print(text)
+
+
+def render_dashboard(rate):
+    """
+    Build the dashboard status line from the shared selection state.
+    
+    Parameters:
+        rate (float): Messages/sec over the last frame.
+    """
+    pending = symbol_state.tracked - symbol_state.checked_count
+    if selection_gate.is_finished():
+        status = "✅ Final"
+    elif not selection_gate.is_open():
+        status = f"⏳ Selection in {selection_gate.seconds_until_open():5.1f}s"
+    else:
+        status = f"Pending: {pending:4d}"
+    leaders = " | ".join(
+        f"{rank}. {sym} {data['gap_up_pct']:.2f}%"
+        for rank, (sym, data) in enumerate(filtered_stocks.snapshot(), 1)
+    )
+    return (f"[{message_count:7d} msgs | {rate:6.0f}/s | queue {tick_queue.depth():5d}] "
+            f"{status} | 🏆 TOP {MAX_FILTERED_STOCKS}: {leaders or '-'}")
 
 
 def onerror(message):
@@ -584,6 +841,14 @@ def onclose(message):
 
     print(f"\n\n🔌 WebSocket Connection Closed: {message}")
 
+    # Let the worker finish the ticks already queued before reading the results
+    if tick_worker:
+        tick_worker.stop()
+    if dashboard:
+        dashboard.stop()
+    if tick_recorder:
+        tick_recorder.close()
+
     # ---- SUMMARY BLOCK (same as before) ----
     if websocket_start_time:
         duration = (datetime.now() - websocket_start_time).total_seconds()
@@ -592,21 +857,31 @@ def onclose(message):
         print(f"   • Messages Received: {message_count:,}")
         print(f"   • Avg Messages/sec: {message_count/duration:.2f}")
         print(f"   • Buffer Size: {len(live_data_buffer)}")
+        queue_stats = tick_queue.stats()
+        print(f"   • Tick Queue: max depth {queue_stats['max_depth']:,} | dropped {queue_stats['dropped']:,}")
+        if tick_recorder:
+            print(f"   • Recorded: {tick_recorder.records_written:,} ticks → {tick_recorder.base_path}.ticks")
+        if fyers_ws_instance:
+            for shard in fyers_ws_instance.stats():
+                print(f"   • Shard {shard['shard']}: {shard['symbols']} symbols | {shard['messages']:,} messages | "
+                      f"{shard['connects'] - 1} reconnects")
+        print_latency_summary(latency_tracker)
 
     print("\n" + "=" * 80)
     print(f"🎯 FINAL TOP {MAX_FILTERED_STOCKS} SELECTED STOCKS")
     print("=" * 80)
 
+    if tick_worker and tick_worker.is_alive():
+        # Still inside the quotes fallback: the heap could change under the snapshot
+        print("\n❌ Tick worker still running - selection not final. Nothing will be sent to Go server.")
+        return
+
     if not filtered_stocks:
         print("\n⚠️ No stocks selected. Nothing will be sent to Go server.")
         return
 
-    # ---- SORT FINAL WINNERS ----
-    sorted_final = sorted(
-        filtered_stocks.items(),
-        key=lambda x: x[1]['gap_up_pct'],
-        reverse=True
-    )
+    # ---- FINAL WINNERS (best first) ----
+    sorted_final = filtered_stocks.snapshot()
 
     # ---- PRINT RESULTS ----
     for rank, (symbol, data) in enumerate(sorted_final, 1):
@@ -661,15 +936,15 @@ def onopen(fyers_ws):
     
     data_type = "SymbolUpdate"
     
-    print(f"\n📡 Subscribing to {len(NSE_STOCKS)} NSE stocks for live updates...")
+    print(f"\n📡 Subscribing to {len(subscribed_symbols)} NSE stocks for live updates...")
     print(f"📅 Start Time: {websocket_start_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"🔔 Data Type: {data_type}")
     print("\n" + "=" * 80)
     
     try:
         # Subscribe to all NSE stocks
-        fyers_ws.subscribe(symbols=NSE_STOCKS, data_type=data_type)
-        print(f"\n✅ Successfully subscribed to {len(NSE_STOCKS)} stocks!")
+        fyers_ws.subscribe(symbols=subscribed_symbols, data_type=data_type)
+        print(f"\n✅ Successfully subscribed to {len(subscribed_symbols)} stocks!")
         print("\n📊 Streaming live data... (Press Ctrl+C to stop)\n")
         print("-" * 80)
         
@@ -693,7 +968,7 @@ def start_live_data_stream(historical_data=None, litemode=False):
     Returns:
         None
     """
-    global live_data_buffer, message_count, historical_close_prices, filtered_stocks, gap_up_checked
+    global live_data_buffer, message_count, filtered_stocks, tick_worker, dashboard, tick_recorder, subscribed_symbols
     
     print("\n" + "=" * 80)
     print("Starting Live Data Stream with Gap-Up Filtering")
@@ -701,47 +976,49 @@ def start_live_data_stream(historical_data=None, litemode=False):
     
     # Reset filtering variables
     filtered_stocks.clear()
-    gap_up_checked.clear()
+    symbol_state.reset()
     
     # Store historical close prices
+    subscribed_symbols = list(NSE_STOCKS)
     if historical_data is not None and not historical_data.empty:
-        for _, row in historical_data.iterrows():
-            historical_close_prices[row['Symbol']] = row['Close']
+        prev_closes = dict(zip(historical_data['Symbol'], historical_data['Close']))
         
-        print(f"\n✅ Loaded historical data for {len(historical_close_prices)} stocks")
+        # Drop symbols that can never qualify before subscribing
+        subscribed_symbols, rejected = prefilter_universe(NSE_STOCKS, prev_closes, MIN_STOCK_PRICE)
+        print_prefilter_summary(NSE_STOCKS, subscribed_symbols, rejected)
+        symbol_state.load_prev_close({symbol: prev_closes[symbol] for symbol in subscribed_symbols})
+        
+        print(f"\n✅ Loaded historical data for {symbol_state.tracked} stocks")
         print(f"🎯 Filtering criteria:")
         print(f"   • Gap-up >= 1.8% and < 8.4%")
-        print(f"   • Minimum stock price >= ₹100")
+        print(f"   • Minimum stock price >= ₹{MIN_STOCK_PRICE}")
         print(f"   • Select TOP {MAX_FILTERED_STOCKS} stocks with highest gap-up")
     else:
         print("\n⚠️  No historical data provided. Gap-up filtering will be skipped.")
     
-    # Wait for 9:10 AM to capture pre-market opening data
+    # Connect and subscribe CONNECT_LEAD_MINUTES before the window so 9:10 only has to open the gate
+    selection_start = datetime.now().replace(hour=SELECTION_START_HOUR, minute=SELECTION_START_MINUTE,
+                                             second=0, microsecond=0)
+    connect_at = selection_start - timedelta(minutes=CONNECT_LEAD_MINUTES)
+    
     print("\n" + "=" * 80)
-    print("⏰ WAITING FOR MARKET TIME")
+    print(f"⏰ WAITING FOR MARKET TIME (connect {connect_at.strftime('%H:%M')}, select from {selection_start.strftime('%H:%M')})")
     print("=" * 80)
-    wait_for_market_time(target_hour=9, target_minute=10)
+    wait_for_market_time(target_hour=connect_at.hour, target_minute=connect_at.minute)
     print("=" * 80)
     
     try:
         # Get access token
         print("\n🔑 Authenticating...")
-        token = get_stored_token()
-        
-        if not token:
-            raise Exception("No stored token found. Please run fyers_connection.py first.")
-        
-        if not is_token_valid(token):
-            raise Exception("Token is invalid or expired. Please run fyers_connection.py again.")
-        
-        access_token = f"{APP_ID}-{APP_TYPE}:{token}"
+        access_token = get_access_token()
         print("✅ Authentication successful!")
         
         # Create WebSocket instance
         print("\n🔌 Connecting to Fyers WebSocket...")
         
-        fyers_ws = data_ws.FyersDataSocket(
+        fyers_ws = ShardedDataSocket(
             access_token=access_token,
+            shards=shards_needed(len(subscribed_symbols)),
             log_path="",
             litemode=litemode,
             write_to_file=False,
@@ -752,9 +1029,33 @@ def start_live_data_stream(historical_data=None, litemode=False):
             on_message=onmessage
         )
         
+        # Selection runs on its own thread so the socket thread only reads frames
+        if RECORD_TICKS:
+            tick_recorder = TickRecorder.for_session(symbol_registry)
+            tick_recorder.start()
+        latency_tracker.reset()
+        tick_worker = TickWorker(tick_queue, process_message, latency=latency_tracker)
+        tick_worker.start()
+        dashboard = Dashboard(render_dashboard, counter=lambda: message_count)
+        dashboard.start()
+        
+        # Buffer ticks until the selection start (evaluate immediately if it has already passed)
+        selection_gate.reset()
+        gate_ns = TICK_CLOCK.mono_ns_at(selection_start)
+        now_ns = time.monotonic_ns()
+        if gate_ns > now_ns:
+            selection_gate.arm(gate_ns, tick_queue)
+        selection_gate.set_deadline(max(gate_ns, now_ns) + SELECTION_DEADLINE_SECONDS * 1_000_000_000, tick_queue)
+        
         # Connect to WebSocket
         fyers_ws.connect()
         
+        # Hard upper bound on selection: the deadline forces a result; closing sends it (onclose)
+        budget = (selection_gate.deadline_ns - time.monotonic_ns()) / 1e9 + SELECTION_FALLBACK_GRACE_SECONDS
+        if not selection_gate.wait(budget):
+            print(f"\n⚠️  Selection not final {SELECTION_FALLBACK_GRACE_SECONDS}s after the deadline - closing the socket")
+        fyers_ws.close_connection()
+        
     except KeyboardInterrupt:
         print("\n\n⚠️  Stream interrupted by user (Ctrl+C)")
     except Exception as e:
@@ -779,7 +1080,7 @@ def start_live_data_stream(historical_data=None, litemode=False):
                         'Open': data['open_price'],
                         'Gap_Up_Pct': data['gap_up_pct'],
                         'LTP': data['ltp'],
-                        'Timestamp': data['timestamp']
+                        'Timestamp': TICK_CLOCK.format(data['recv_ns'])
                     })
                 
                 df_filtered = pd.DataFrame(filtered_data)
@@ -796,7 +1097,7 @@ def start_live_data_stream(historical_data=None, litemode=False):
                 if not filename:
                     filename = "live_data_buffer.csv"
                 
-                df = pd.DataFrame(live_data_buffer)
+                df = live_data_buffer.to_dataframe()
                 df.to_csv(filename, index=False)
                 print(f"\n✅ Saved {len(df)} records to: {filename}")
 
@@ -823,7 +1124,7 @@ def main():
         print("\n" + "=" * 80)
         print("STEP 1: Fetching Last Trading Day Data")
         print("=" * 80)
-        df = fetch_last_trading_day_all_stocks()
+        df = load_prev_close_table()
         
         # STEP 2: Start live streaming with historical data for filtering
         print("\n" + "=" * 80)
@@ -0,0 +1,279 @@
+"""
+Latency Stats
+Streaming HDR-style latency histograms for the market data path, per shard and per second.
+
+Stages (microseconds):
+    feed     exch_feed_time -> socket callback (exchange, broker feed, network and SDK decode)
+    queue    socket callback -> tick worker pickup (our hand-off)
+    process  tick worker handler run time (selection logic)
+
+exch_feed_time has one-second resolution, so the feed stage is exact only to
+within a second; queue and process use monotonic_ns and are exact.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from tick_clock import TICK_CLOCK
+
+
+STAGES = ("feed", "queue", "process")
+
+# 2^7 sub-buckets per power of two: every recorded value is kept within 1/64 (~1.6%)
+SUB_BUCKET_BITS = 7
+# Values above this (60 s in µs) land in the top bucket
+HIGHEST_TRACKABLE_US = 60_000_000
+
+# Per-second histograms kept (oldest seconds are dropped first)
+PER_SECOND_WINDOW = 600
+
+_SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+
+
+def _bucket_index(value):
+    """Log-linear bucket: exact below 128, then 64 buckets per power of two."""
+    if value < _SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return _SUB_BUCKET_COUNT + (shift - 1) * _SUB_BUCKET_HALF + ((value >> shift) - _SUB_BUCKET_HALF)
+
+
+def _bucket_upper(index):
+    """Highest value that maps to a bucket."""
+    if index < _SUB_BUCKET_COUNT:
+        return index
+    shift = (index - _SUB_BUCKET_COUNT) // _SUB_BUCKET_HALF + 1
+    top = (index - _SUB_BUCKET_COUNT) % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+    return ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of non-negative integer latencies.
+
+    record() is one dict increment, memory grows only with the number of
+    distinct buckets hit, and percentiles are read from the bucket counts
+    (reported as the highest value of the bucket, so never optimistic).
+    Negative samples (clock skew) are counted and recorded as 0.
+    """
+
+    def __init__(self, highest=HIGHEST_TRACKABLE_US):
+        self.highest = highest
+        self._top_index = _bucket_index(highest)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.negative = 0
+
+    def record(self, value):
+        value = int(value)
+        if value < 0:
+            self.negative += 1
+            value = 0
+        index = _bucket_index(value) if value <= self.highest else self._top_index
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add another histogram's samples to this one."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.negative += other.negative
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, pct):
+        """
+        Args:
+            pct (float): 0-100
+
+        Returns:
+            int: Latency at or below which pct% of samples fall (None if empty)
+        """
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(_bucket_upper(index), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Returns:
+            dict: count, min, mean, p50, p90, p99, p999, max, negative
+        """
+        return {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+            "negative": self.negative
+        }
+
+
+def _stage_histograms():
+    return {stage: LatencyHistogram() for stage in STAGES}
+
+
+class LatencyTracker:
+    """
+    Per-tick latency instrumentation for the tick worker.
+
+    record() is called once per processed tick with the worker's start/end
+    stamps and updates the feed/queue/process histograms of the tick's shard
+    and of its receive second (Unix epoch second). Updates and stats()
+    share one lock, so stats() may be called from any thread mid-session.
+    """
+
+    def __init__(self, clock=TICK_CLOCK, window=PER_SECOND_WINDOW):
+        self.clock = clock
+        self.window = window
+        self.shards = {}
+        self.seconds = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.shards = {}
+            self.seconds = OrderedDict()
+
+    def record(self, message, start_ns, end_ns):
+        """
+        Args:
+            message (dict): Tick with 'recv_ns' (and 'shard', 'exch_feed_time' when present)
+            start_ns / end_ns (int): monotonic_ns around the handler call
+        """
+        recv_ns = message.get('recv_ns')
+        if recv_ns is None or 'symbol' not in message:
+            return
+
+        epoch_ns = self.clock.to_epoch_ns(recv_ns)
+        second = epoch_ns // 1_000_000_000
+        shard = message.get('shard', 0)
+
+        with self._lock:
+            by_shard = self.shards.get(shard)
+            if by_shard is None:
+                by_shard = self.shards[shard] = _stage_histograms()
+            by_second = self.seconds.get(second)
+            if by_second is None:
+                by_second = self.seconds[second] = _stage_histograms()
+                while len(self.seconds) > self.window:
+                    self.seconds.popitem(last=False)
+
+            exch_ts = message.get('exch_feed_time')
+            if exch_ts:
+                feed_us = (epoch_ns - exch_ts * 1_000_000_000) // 1000
+                by_shard["feed"].record(feed_us)
+                by_second["feed"].record(feed_us)
+
+            queue_us = (start_ns - recv_ns) // 1000
+            by_shard["queue"].record(queue_us)
+            by_second["queue"].record(queue_us)
+
+            process_us = (end_ns - start_ns) // 1000
+            by_shard["process"].record(process_us)
+            by_second["process"].record(process_us)
+
+    def overall(self):
+        """Per-stage histograms merged over all shards."""
+        merged = _stage_histograms()
+        with self._lock:
+            for by_shard in self.shards.values():
+                for stage in STAGES:
+                    merged[stage].merge(by_shard[stage])
+        return merged
+
+    def stats(self):
+        """
+        Returns:
+            dict: {
+                "overall": {stage: summary},
+                "shards": {shard: {stage: summary}},
+                "seconds": [(epoch_second, {stage: summary}), ...] oldest first
+            }
+        """
+        overall = self.overall()
+        with self._lock:
+            shards = {shard: {stage: h.summary() for stage, h in hists.items()}
+                      for shard, hists in sorted(self.shards.items())}
+            seconds = [(second, {stage: h.summary() for stage, h in hists.items()})
+                       for second, hists in self.seconds.items()]
+        return {
+            "overall": {stage: h.summary() for stage, h in overall.items()},
+            "shards": shards,
+            "seconds": seconds
+        }
+
+
+def _format_us(value):
+    if value is None:
+        return "-"
+    if value >= 1_000_000:
+        return f"{value / 1e6:.2f}s"
+    if value >= 1000:
+        return f"{value / 1000:.1f}ms"
+    return f"{value}µs"
+
+
+def _format_stage(summary):
+    return (f"p50 {_format_us(summary['p50'])} | p99 {_format_us(summary['p99'])} | "
+            f"max {_format_us(summary['max'])}")
+
+
+def print_latency_summary(tracker, worst_seconds=5):
+    """
+    Print overall and per-shard percentiles and the seconds with the worst tail.
+
+    Args:
+        tracker (LatencyTracker): Session tracker
+        worst_seconds (int): Number of per-second rows (ranked by feed p99, then queue p99)
+    """
+    stats = tracker.stats()
+    if not stats["overall"]["queue"]["count"]:
+        return
+
+    print("\n⏱️  Tick Latency (feed = exchange→socket, queue = socket→worker, process = selection)")
+    for stage in STAGES:
+        summary = stats["overall"][stage]
+        if summary["count"]:
+            skew = f" | {summary['negative']:,} negative (clock skew)" if summary["negative"] else ""
+            print(f"   • {stage:8s} {_format_stage(summary)} | n={summary['count']:,}{skew}")
+
+    if len(stats["shards"]) > 1:
+        for shard, stages in stats["shards"].items():
+            print(f"   • Shard {shard}: " + " || ".join(
+                f"{stage} {_format_stage(stages[stage])}" for stage in STAGES if stages[stage]["count"]
+            ))
+
+    ranked = sorted(
+        stats["seconds"],
+        key=lambda item: (item[1]["feed"]["p99"] or 0, item[1]["queue"]["p99"] or 0),
+        reverse=True
+    )[:worst_seconds]
+    if ranked:
+        print(f"   • Worst {len(ranked)} seconds:")
+        for second, stages in sorted(ranked):
+            label = datetime.fromtimestamp(second).strftime('%H:%M:%S')
+            print(f"     {label} | {stages['queue']['count']:6,} ticks | feed p99 {_format_us(stages['feed']['p99'])} | "
+                  f"queue p99 {_format_us(stages['queue']['p99'])} | process p99 {_format_us(stages['process']['p99'])}")
@@ -0,0 +1,172 @@
+"""
+NSE Trading Calendar
+Exchange holidays, special sessions and a precomputed previous-session lookup.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+
+# NSE equity segment trading holidays (from the exchange's annual holiday circulars).
+# Update this list when NSE publishes the next year's calendar.
+NSE_HOLIDAYS = {
+    # 2025
+    date(2025, 2, 26),   # Mahashivratri
+    date(2025, 3, 14),   # Holi
+    date(2025, 3, 31),   # Id-Ul-Fitr (Ramadan Eid)
+    date(2025, 4, 10),   # Shri Mahavir Jayanti
+    date(2025, 4, 14),   # Dr. Baba Saheb Ambedkar Jayanti
+    date(2025, 4, 18),   # Good Friday
+    date(2025, 5, 1),    # Maharashtra Day
+    date(2025, 8, 15),   # Independence Day
+    date(2025, 8, 27),   # Ganesh Chaturthi
+    date(2025, 10, 2),   # Mahatma Gandhi Jayanti / Dussehra
+    date(2025, 10, 21),  # Diwali Laxmi Pujan (Muhurat session only)
+    date(2025, 10, 22),  # Diwali Balipratipada
+    date(2025, 11, 5),   # Prakash Gurpurb Sri Guru Nanak Dev
+    date(2025, 12, 25),  # Christmas
+    # 2026
+    date(2026, 1, 15),   # Maharashtra municipal elections
+    date(2026, 1, 26),   # Republic Day
+    date(2026, 3, 3),    # Holi
+    date(2026, 3, 26),   # Shri Ram Navami
+    date(2026, 3, 31),   # Shri Mahavir Jayanti
+    date(2026, 4, 3),    # Good Friday
+    date(2026, 4, 14),   # Dr. Baba Saheb Ambedkar Jayanti
+    date(2026, 5, 1),    # Maharashtra Day
+    date(2026, 5, 28),   # Bakri Id
+    date(2026, 6, 26),   # Muharram
+    date(2026, 9, 14),   # Ganesh Chaturthi
+    date(2026, 10, 2),   # Mahatma Gandhi Jayanti
+    date(2026, 10, 20),  # Dussehra
+    date(2026, 11, 10),  # Diwali Balipratipada
+    date(2026, 11, 24),  # Prakash Gurpurb Sri Guru Nanak Dev
+    date(2026, 12, 25),  # Christmas
+}
+
+# Sessions held on a weekend or holiday (Budget day, Muhurat trading).
+# These produce a daily candle and become the previous session for the next day.
+NSE_SPECIAL_SESSIONS = {
+    date(2025, 2, 1),    # Union Budget (Saturday)
+    date(2025, 10, 21),  # Diwali Muhurat trading
+    date(2026, 2, 1),    # Union Budget (Sunday)
+    date(2026, 11, 8),   # Diwali Muhurat trading (Sunday)
+}
+
+# Range covered by the precomputed session index
+CALENDAR_START = date(2025, 1, 1)
+CALENDAR_END = date(2026, 12, 31)
+
+_outside_warned = False
+
+
+def _warn_outside_calendar(day):
+    """Warn (once per process) that holidays are unknown for a date outside the table."""
+    global _outside_warned
+    if _outside_warned:
+        return
+    _outside_warned = True
+    print(f"⚠️ NSE calendar covers {CALENDAR_START} to {CALENDAR_END}; {day} is outside it, "
+          f"so exchange holidays are NOT applied (weekends only). Update NSE_HOLIDAYS in nse_calendar.py.")
+
+
+def is_trading_day(day):
+    """
+    Check whether NSE holds a session on a date.
+
+    Args:
+        day (date/datetime): Date to check
+
+    Returns:
+        bool: True for regular weekdays that are not holidays, and for special sessions
+    """
+    if isinstance(day, datetime):
+        day = day.date()
+    if not CALENDAR_START <= day <= CALENDAR_END:
+        _warn_outside_calendar(day)
+    if day in NSE_SPECIAL_SESSIONS:
+        return True
+    return day.weekday() < 5 and day not in NSE_HOLIDAYS
+
+
+def _build_sessions():
+    sessions = []
+    day = CALENDAR_START
+    while day <= CALENDAR_END:
+        if is_trading_day(day):
+            sessions.append(day)
+        day += timedelta(days=1)
+    return sessions
+
+
+# Sorted list of every session in [CALENDAR_START, CALENDAR_END]
+SESSIONS = _build_sessions()
+
+
+def previous_session(day=None):
+    """
+    Get the last session strictly before a date.
+
+    Args:
+        day (date/datetime): Reference date (default: today)
+
+    Returns:
+        date: The previous trading session
+    """
+    if day is None:
+        day = datetime.now()
+    if isinstance(day, datetime):
+        day = day.date()
+
+    if SESSIONS[0] < day <= CALENDAR_END + timedelta(days=1):
+        return SESSIONS[bisect_left(SESSIONS, day) - 1]
+
+    # Outside the precomputed range: walk back using weekends + known holidays
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def sessions_between(start, end):
+    """
+    List sessions in [start, end] (inclusive).
+
+    Args:
+        start (date/datetime): First date
+        end (date/datetime): Last date
+
+    Returns:
+        list: Session dates in order
+    """
+    if isinstance(start, datetime):
+        start = start.date()
+    if isinstance(end, datetime):
+        end = end.date()
+
+    if CALENDAR_START <= start and end <= CALENDAR_END:
+        return SESSIONS[bisect_left(SESSIONS, start):bisect_right(SESSIONS, end)]
+
+    sessions = []
+    day = start
+    while day <= end:
+        if is_trading_day(day):
+            sessions.append(day)
+        day += timedelta(days=1)
+    return sessions
+
+
+def has_session_between(range_from, range_to):
+    """
+    Check whether any session falls inside an epoch-timestamp range.
+
+    Args:
+        range_from (int): Start timestamp (Unix epoch)
+        range_to (int): End timestamp (Unix epoch)
+
+    Returns:
+        bool: True if at least one session date lies in the range
+    """
+    start = datetime.fromtimestamp(range_from).date()
+    end = datetime.fromtimestamp(range_to).date()
+    return len(sessions_between(start, end)) > 0
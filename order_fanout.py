@@ -0,0 +1,103 @@
+"""
+Order Fan-Out
+Fire several orders at the same instant over a pool of pre-warmed HTTP connections.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Parallel order connections (requests keeps at most 10 idle connections per host by default)
+MAX_ORDER_CONNECTIONS = 10
+
+# Seconds to wait for every pool thread to join a warm-up round
+WARM_TIMEOUT_SECONDS = 5
+
+
+class OrderFanout:
+    """
+    Parallel order dispatcher for a FyersModel client.
+
+    warm() makes one lightweight call (get_profile) from every pool thread at
+    the same time. That starts the threads and leaves one keep-alive
+    connection per thread, with TCP and TLS already done, in the client's
+    requests.Session pool. fire() gives each thread one order, releases them
+    all on a single event and collects the acknowledgements, so N orders
+    take about one broker round trip instead of N.
+    """
+
+    def __init__(self, fyers, connections):
+        """
+        Args:
+            fyers (fyersModel.FyersModel): Authenticated client (its session pool is shared)
+            connections (int): Orders in flight at once (capped at MAX_ORDER_CONNECTIONS)
+        """
+        self.fyers = fyers
+        self.connections = max(1, min(connections, MAX_ORDER_CONNECTIONS))
+        self._executor = ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="order")
+
+    def warm(self):
+        """
+        Open (or refresh) one connection per pool thread.
+
+        Returns:
+            int: Threads whose warm-up call succeeded
+        """
+        # All threads must be inside the call together, or they would reuse one connection
+        barrier = threading.Barrier(self.connections)
+
+        def ping(_):
+            try:
+                barrier.wait(WARM_TIMEOUT_SECONDS)
+                self.fyers.get_profile()
+                return True
+            except Exception:
+                return False
+
+        return sum(self._executor.map(ping, range(self.connections)))
+
+    def fire(self, orders, place_fn):
+        """
+        Send every order at once and wait for all responses.
+
+        Args:
+            orders (list): Order request bodies, one request each
+            place_fn (callable): Client method called as place_fn(data=order),
+                e.g. fyers.place_order
+
+        Returns:
+            tuple: (results, elapsed_ms)
+                results (list): One dict per order, same order as `orders`:
+                    order, response, error, sent_ns, ack_ns, rtt_ms
+                elapsed_ms (float): Release of the first order to the last acknowledgement
+        """
+        go = threading.Event()
+
+        def send(order):
+            go.wait()
+            sent_ns = time.monotonic_ns()
+            try:
+                response, error = place_fn(data=order), None
+            except Exception as e:
+                response, error = None, str(e)
+            ack_ns = time.monotonic_ns()
+            return {
+                "order": order,
+                "response": response,
+                "error": error,
+                "sent_ns": sent_ns,
+                "ack_ns": ack_ns,
+                "rtt_ms": (ack_ns - sent_ns) / 1e6
+            }
+
+        futures = [self._executor.submit(send, order) for order in orders]
+        fired_ns = time.monotonic_ns()
+        go.set()
+        results = [future.result() for future in futures]
+
+        last_ack_ns = max((result["ack_ns"] for result in results), default=fired_ns)
+        return results, (last_ack_ns - fired_ns) / 1e6
+
+    def close(self):
+        self._executor.shutdown(wait=False)
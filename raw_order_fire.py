@@ -0,0 +1,137 @@
+"""
+Raw Order Fire
+Render the complete basket-order HTTP request ahead of time and write it onto an
+open keep-alive connection at the fire instant.
+
+At fire time the SDK builds headers, JSON-encodes the orders, goes through
+requests' adapters and logs the response. Here all of that happens during the
+wait phase; fire() is one sendall() of pre-built bytes followed by reading the
+response. The connection comes from a BrokerConnectionManager, which keeps it
+handshaked and probed in the background.
+"""
+
+import http.client
+import json
+import time
+
+from fyers_apiv3.fyersModel import Config
+
+from broker_connection import BrokerConnectionManager
+
+
+class RawOrderFire:
+    """
+    Pre-serialized basket-order request fired on the broker connection pool.
+
+    Usage:
+        fire = RawOrderFire(fyers, orders_data, manager=broker)
+        fire.connect()          # starts the pool if it is not running yet
+        fire.ensure_open()      # just before the spin phase
+        response = fire.fire()  # at the target instant
+
+    Attributes:
+        send_ns (int): monotonic_ns just before the request bytes were written
+        sent_ns (int): monotonic_ns once sendall() returned
+        ack_ns (int): monotonic_ns when the response was read
+        connection (BrokerConnection): Connection the order went out on
+        reconnects (int): Connections re-opened at fire time after the server closed one
+    """
+
+    def __init__(self, fyers, orders_data, manager=None, api_url=None, path=None, timeout=10):
+        """
+        Args:
+            fyers (fyersModel.FyersModel): Client supplying the auth header ("client_id:token")
+            orders_data (list): Basket orders, as passed to place_basket_orders
+            manager (BrokerConnectionManager): Shared pool (default: a private one-connection pool)
+            api_url (str): API base URL for a private pool (default: the SDK's order API)
+            path (str): Order endpoint below api_url (default: basket orders)
+            timeout (float): Socket timeout in seconds for a private pool
+        """
+        self._owns_manager = manager is None
+        self.manager = manager or BrokerConnectionManager.for_client(fyers, api_url=api_url, size=1, timeout=timeout)
+        self.connection = None
+        self.reconnects = 0
+        self.send_ns = self.sent_ns = self.ack_ns = 0
+
+        body = json.dumps(orders_data).encode()
+        self.request_bytes = self.manager.render("POST", path or Config.multi_orders, body)
+
+    def connect(self):
+        """Start the pool (DNS, TCP, TLS and a first probe on every connection) if it is not running."""
+        if not self.manager.is_alive():
+            self.manager.start()
+
+    def close(self):
+        """Close the pool if this object created it (a shared pool belongs to its owner)."""
+        if self._owns_manager:
+            self.manager.close()
+
+    def pause_probes(self, timeout=0.0):
+        """Stop the pool's background probes (see BrokerConnectionManager.pause_probes)."""
+        self.manager.pause_probes(timeout)
+
+    def ensure_open(self):
+        """Stop background probes (without waiting) and re-open any idle connection the server dropped."""
+        self.manager.pause_probes()
+        self.manager.ensure_ready()
+
+    def ping(self):
+        """
+        Returns:
+            float: Best RTT of the pool in ms (kept fresh by its background probes), or None
+        """
+        return self.manager.best_rtt_ms()
+
+    def fire(self):
+        """
+        Write the pre-built order request on the best connection and wait for the response.
+
+        The request is re-sent on a fresh connection only if writing it failed
+        (nothing reached the server). A failure while reading the response is
+        never retried, so an order cannot be placed twice. Like the SDK, fire()
+        does not raise for network errors: it returns an error dict instead.
+
+        Returns:
+            dict: Broker response JSON, or {"s": "error", "code": -1, "message": ...}
+        """
+        try:
+            connection = self.connection = self.manager.acquire()
+        except (OSError, http.client.HTTPException) as e:
+            self.send_ns = self.sent_ns = self.ack_ns = time.monotonic_ns()
+            return {"s": "error", "code": -1, "message": f"order not sent ({e!r})"}
+
+        try:
+            connection.send_ns = self.send_ns = time.monotonic_ns()
+            try:
+                try:
+                    connection.conn.sock.sendall(self.request_bytes)
+                except OSError:
+                    self.reconnects += 1
+                    connection.open()
+                    connection.send_ns = self.send_ns = time.monotonic_ns()
+                    connection.conn.sock.sendall(self.request_bytes)
+            except (OSError, http.client.HTTPException) as e:
+                connection.failures += 1
+                connection.close()
+                self.sent_ns = self.ack_ns = time.monotonic_ns()
+                return {"s": "error", "code": -1, "message": f"order not sent ({e!r})"}
+            connection.sent_ns = self.sent_ns = time.monotonic_ns()
+
+            try:
+                response = connection.read_response("POST")
+            except (OSError, http.client.HTTPException) as e:
+                # The request left: the order may or may not have been placed
+                connection.failures += 1
+                connection.close()
+                self.ack_ns = time.monotonic_ns()
+                return {"s": "error", "code": -1,
+                        "message": f"response not received ({e!r}); order status unknown, check order book"}
+            self.ack_ns = connection.ack_ns
+            return response
+        finally:
+            self.manager.release(connection)
+
+    def send_overhead_us(self):
+        """Microseconds spent in sendall() for the last request (the fire path's local cost)."""
+        return (self.sent_ns - self.send_ns) / 1000
+
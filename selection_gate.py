@@ -0,0 +1,136 @@
+"""
+Selection Gate
+Bounds the selection window in time while the socket is already streaming:
+gap evaluation starts at the open instant and is forced to finish by the deadline.
+"""
+
+import threading
+import time
+
+
+# Types of the markers the gate timers put on the tick queue
+GATE_MESSAGE_TYPE = "selection_gate"
+DEADLINE_MESSAGE_TYPE = "selection_deadline"
+
+
+class SelectionGate:
+    """
+    Clock gate for the selection window.
+
+    The tick worker calls check(recv_ns) / check_deadline(recv_ns) for each
+    tick; the first stamp at or after gate_ns opens the gate and the first at
+    or after deadline_ns expires it. With a tick queue, arm() and
+    set_deadline() also schedule a marker message for their instant, so both
+    fire on time even if no tick happens to arrive then. An unarmed gate is
+    open; without a deadline the window never expires.
+
+    finish() marks the selection final; other threads can wait() for it.
+    """
+
+    def __init__(self):
+        self._timers = []
+        self._finished = threading.Event()
+        self.reset()
+
+    def reset(self):
+        """Cancel pending markers and start a new session: open, no deadline, not finished."""
+        for timer in self._timers:
+            timer.cancel()
+        self._timers = []
+        self.gate_ns = None
+        self.opened_ns = None
+        self.deadline_ns = None
+        self.expired_ns = None
+        self.finished_ns = None
+        self._finished.clear()
+
+    def arm(self, gate_ns, tick_queue=None):
+        """
+        Close the gate until gate_ns.
+
+        Args:
+            gate_ns (int): time.monotonic_ns() value at which evaluation starts
+            tick_queue (TickQueue): Queue to put the gate marker on at gate_ns
+        """
+        self.gate_ns = gate_ns
+        self.opened_ns = None
+        if tick_queue is not None:
+            self._schedule(gate_ns, GATE_MESSAGE_TYPE, tick_queue)
+
+    def set_deadline(self, deadline_ns, tick_queue=None):
+        """
+        Force the selection to finish at deadline_ns.
+
+        Args:
+            deadline_ns (int): time.monotonic_ns() value of the deadline
+            tick_queue (TickQueue): Queue to put the deadline marker on at deadline_ns
+        """
+        self.deadline_ns = deadline_ns
+        self.expired_ns = None
+        if tick_queue is not None:
+            self._schedule(deadline_ns, DEADLINE_MESSAGE_TYPE, tick_queue)
+
+    def _schedule(self, at_ns, message_type, tick_queue):
+        delay = max((at_ns - time.monotonic_ns()) / 1e9, 0.0)
+        timer = threading.Timer(delay, self._put_marker, args=(at_ns, message_type, tick_queue))
+        timer.daemon = True
+        timer.start()
+        self._timers.append(timer)
+
+    @staticmethod
+    def _put_marker(at_ns, message_type, tick_queue):
+        # Fire at (not before) the instant - Timer can wake a little early
+        while time.monotonic_ns() < at_ns:
+            pass
+        tick_queue.put({'type': message_type, 'recv_ns': time.monotonic_ns()})
+
+    def is_open(self):
+        return self.gate_ns is None or self.opened_ns is not None
+
+    def check(self, recv_ns):
+        """
+        Returns:
+            bool: True exactly once - for the first stamp at or after the gate instant
+        """
+        if self.opened_ns is None and self.gate_ns is not None and recv_ns >= self.gate_ns:
+            self.opened_ns = recv_ns
+            return True
+        return False
+
+    def check_deadline(self, recv_ns):
+        """
+        Returns:
+            bool: True exactly once - for the first stamp at or after the deadline
+                (never once the selection has finished)
+        """
+        if (self.expired_ns is None and self.deadline_ns is not None and recv_ns >= self.deadline_ns
+                and not self._finished.is_set()):
+            self.expired_ns = recv_ns
+            return True
+        return False
+
+    def seconds_until_open(self):
+        """Seconds until the gate instant (0 once open or when unarmed)."""
+        if self.is_open():
+            return 0.0
+        return max((self.gate_ns - time.monotonic_ns()) / 1e9, 0.0)
+
+    def finish(self, recv_ns=None):
+        """
+        Mark the selection final.
+
+        Returns:
+            bool: True for the first call only
+        """
+        if self._finished.is_set():
+            return False
+        self.finished_ns = recv_ns if recv_ns is not None else time.monotonic_ns()
+        self._finished.set()
+        return True
+
+    def is_finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """Block until finish() is called. Returns True if it was, False on timeout."""
+        return self._finished.wait(timeout)
@@ -0,0 +1,197 @@
+"""
+Sharded Data Socket
+Spread a symbol universe over several Fyers data WebSockets behind the FyersDataSocket interface.
+"""
+
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fyers_apiv3.FyersWebsocket import data_ws
+
+
+# Symbols per connection - the load a single socket handles comfortably today
+SYMBOLS_PER_SHARD = 200
+
+# Hard per-connection limit enforced by the Fyers SDK
+MAX_SYMBOLS_PER_SOCKET = 5000
+
+
+def shards_needed(symbol_count, shard_size=SYMBOLS_PER_SHARD):
+    """
+    Number of sockets for a universe.
+
+    Args:
+        symbol_count (int): Symbols to subscribe
+        shard_size (int): Target symbols per socket (capped at MAX_SYMBOLS_PER_SOCKET)
+
+    Returns:
+        int: At least 1
+    """
+    shard_size = min(shard_size, MAX_SYMBOLS_PER_SOCKET)
+    return max(1, math.ceil(symbol_count / shard_size))
+
+
+class _ShardSocket(data_ws.FyersDataSocket):
+    """FyersDataSocket without the SDK's process-wide singleton, so each shard gets its own connection."""
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+
+class _Shard:
+    def __init__(self, index):
+        self.index = index
+        self.socket = None
+        self.symbols = []
+        self.data_type = "SymbolUpdate"
+        self.connects = 0
+        self.messages = 0
+        self.closed = False
+        self.running = False
+
+
+class ShardedDataSocket:
+    """
+    Drop-in replacement for FyersDataSocket that fans a subscription out
+    over `shards` independent connections.
+
+    Each shard has its own socket and callback thread; every callback calls
+    the same on_message (tagging the message with 'shard'), so with an
+    enqueue-only on_message the shards merge into one tick queue in arrival
+    order. subscribe() spreads symbols evenly over the shards. When the SDK
+    reconnects a shard, only that shard's symbols are subscribed again.
+    on_connect fires once after every shard is up; on_close fires once after
+    every shard has closed.
+    """
+
+    def __init__(self, access_token, shards=1, log_path="", litemode=False, write_to_file=False,
+                 reconnect=True, on_connect=None, on_close=None, on_error=None, on_message=None,
+                 reconnect_retry=5):
+        self.on_connect = on_connect
+        self.on_close = on_close
+        self.on_error = on_error
+        self.on_message = on_message
+        self._lock = threading.Lock()
+        self.shards = [_Shard(i) for i in range(max(1, shards))]
+
+        for shard in self.shards:
+            shard.socket = _ShardSocket(
+                access_token=access_token,
+                log_path=log_path,
+                litemode=litemode,
+                write_to_file=write_to_file,
+                reconnect=reconnect,
+                reconnect_retry=reconnect_retry,
+                on_connect=self._make_on_connect(shard),
+                on_close=self._make_on_close(shard),
+                on_error=on_error,
+                on_message=self._make_on_message(shard)
+            )
+
+    # ---- per-shard callbacks ----
+
+    def _make_on_message(self, shard):
+        on_message = self.on_message
+
+        def handle(message):
+            shard.messages += 1
+            message['shard'] = shard.index
+            on_message(message)
+        return handle
+
+    def _make_on_connect(self, shard):
+        def handle():
+            shard.connects += 1
+            shard.closed = False
+            # Reconnect: the SDK forgets subscriptions, so restore this shard's symbols
+            if shard.connects > 1 and shard.symbols:
+                shard.socket.subscribe(symbols=list(shard.symbols), data_type=shard.data_type)
+        return handle
+
+    def _make_on_close(self, shard):
+        def handle(message):
+            with self._lock:
+                shard.closed = True
+                all_closed = all(s.closed for s in self.shards)
+            if all_closed and self.on_close:
+                self.on_close(message)
+        return handle
+
+    # ---- FyersDataSocket interface ----
+
+    def connect(self):
+        """Connect every shard in parallel (each SDK connect waits ~2s), then call on_connect once."""
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as executor:
+            list(executor.map(lambda shard: shard.socket.connect(), self.shards))
+        if self.on_connect:
+            self.on_connect()
+
+    def subscribe(self, symbols, data_type="SymbolUpdate"):
+        """
+        Subscribe symbols, each new symbol going to the shard with the fewest.
+
+        Args:
+            symbols (list): Symbols in Fyers format
+            data_type (str): Data type (default: "SymbolUpdate")
+        """
+        assigned = {shard.index: [] for shard in self.shards}
+        with self._lock:
+            known = {symbol for shard in self.shards for symbol in shard.symbols}
+            for symbol in symbols:
+                if symbol in known:
+                    continue
+                shard = min(self.shards, key=lambda s: len(s.symbols))
+                if len(shard.symbols) >= MAX_SYMBOLS_PER_SOCKET:
+                    raise Exception(f"All {len(self.shards)} shards are at the {MAX_SYMBOLS_PER_SOCKET}-symbol limit")
+                shard.symbols.append(symbol)
+                shard.data_type = data_type
+                assigned[shard.index].append(symbol)
+                known.add(symbol)
+
+        # Symbol conversion + subscribe messages are per connection - do the shards concurrently
+        work = [(self.shards[index], batch) for index, batch in assigned.items() if batch]
+        if work:
+            with ThreadPoolExecutor(max_workers=len(work)) as executor:
+                list(executor.map(
+                    lambda item: item[0].socket.subscribe(symbols=item[1], data_type=data_type), work
+                ))
+
+    def unsubscribe(self, symbols, data_type="SymbolUpdate"):
+        """Unsubscribe symbols from whichever shards hold them."""
+        wanted = set(symbols)
+        for shard in self.shards:
+            with self._lock:
+                batch = [symbol for symbol in shard.symbols if symbol in wanted]
+                shard.symbols = [symbol for symbol in shard.symbols if symbol not in wanted]
+            if batch:
+                shard.socket.unsubscribe(symbols=batch, data_type=data_type)
+
+    def keep_running(self):
+        for shard in self.shards:
+            if not shard.running:
+                shard.socket.keep_running()
+                shard.running = True
+
+    def close_connection(self):
+        for shard in self.shards:
+            shard.socket.close_connection()
+
+    def is_connected(self):
+        return all(shard.socket.is_connected() for shard in self.shards)
+
+    def stats(self):
+        """
+        Returns:
+            list: One dict per shard: shard, symbols, messages, connects (1 + reconnects), closed
+        """
+        return [
+            {
+                "shard": shard.index,
+                "symbols": len(shard.symbols),
+                "messages": shard.messages,
+                "connects": shard.connects,
+                "closed": shard.closed
+            }
+            for shard in self.shards
+        ]
@@ -0,0 +1,221 @@
+"""
+Symbol Registry
+Dense integer ids for Fyers symbols and array-backed per-symbol selection state.
+"""
+
+import numpy as np
+
+
+class SymbolRegistry:
+    """
+    Map each symbol to a dense integer id (0..n-1) in the order it was added.
+    Ids index the parallel arrays in SymbolState and the tick ring buffer.
+    """
+
+    def __init__(self, symbols=()):
+        self.symbols = []
+        self._ids = {}
+        for symbol in symbols:
+            self.intern(symbol)
+
+    def intern(self, symbol):
+        """Get the id for a symbol, adding it if it is new."""
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbols.append(symbol)
+            self._ids[symbol] = symbol_id
+        return symbol_id
+
+    def id_of(self, symbol):
+        """
+        Returns:
+            int: Id of the symbol, or None if it was never registered
+        """
+        return self._ids.get(symbol)
+
+    def name(self, symbol_id):
+        return self.symbols[symbol_id]
+
+    def names(self, symbol_ids):
+        """Vectorized id -> symbol lookup (object array)."""
+        return np.asarray(self.symbols, dtype=object)[symbol_ids]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._ids
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+
+class SymbolState:
+    """
+    Gap-up state for every registered symbol, held in parallel NumPy arrays:
+    prev_close, open_price, gap_pct and checked, all indexed by registry id.
+    Symbols without a previous close (NaN) are never evaluated.
+
+    Before the selection window opens, observe() keeps only each symbol's
+    latest open/ltp/receive time (pending_open, last_ltp, last_recv_ns) and
+    when that open was seen (pending_open_ns); evaluate_pending() then
+    evaluates all of them in one pass.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        size = len(registry)
+        self.prev_close = np.full(size, np.nan)
+        self.open_price = np.full(size, np.nan)
+        self.gap_pct = np.full(size, np.nan)
+        self.checked = np.zeros(size, dtype=bool)
+        self.pending_open = np.full(size, np.nan)
+        self.pending_open_ns = np.zeros(size, dtype=np.int64)
+        self.last_ltp = np.full(size, np.nan)
+        self.last_recv_ns = np.zeros(size, dtype=np.int64)
+        self.tracked = 0
+        self.checked_count = 0
+
+    def _grow(self):
+        """Extend the arrays when symbols were added to the registry after construction."""
+        extra = len(self.registry) - len(self.prev_close)
+        if extra <= 0:
+            return
+        self.prev_close = np.concatenate((self.prev_close, np.full(extra, np.nan)))
+        self.open_price = np.concatenate((self.open_price, np.full(extra, np.nan)))
+        self.gap_pct = np.concatenate((self.gap_pct, np.full(extra, np.nan)))
+        self.checked = np.concatenate((self.checked, np.zeros(extra, dtype=bool)))
+        self.pending_open = np.concatenate((self.pending_open, np.full(extra, np.nan)))
+        self.pending_open_ns = np.concatenate((self.pending_open_ns, np.zeros(extra, dtype=np.int64)))
+        self.last_ltp = np.concatenate((self.last_ltp, np.full(extra, np.nan)))
+        self.last_recv_ns = np.concatenate((self.last_recv_ns, np.zeros(extra, dtype=np.int64)))
+
+    def load_prev_close(self, closes):
+        """
+        Set previous-session closes and reset the evaluation state.
+
+        Args:
+            closes (dict): {symbol: close}
+        """
+        ids = [self.registry.intern(symbol) for symbol in closes]
+        self._grow()
+        self.prev_close[:] = np.nan
+        if ids:
+            self.prev_close[ids] = np.fromiter(closes.values(), dtype=np.float64, count=len(ids))
+        self.tracked = int(np.count_nonzero(~np.isnan(self.prev_close)))
+        self.reset()
+
+    def reset(self):
+        """Forget opens/gaps and mark every symbol unchecked (prev closes are kept)."""
+        self.open_price[:] = np.nan
+        self.gap_pct[:] = np.nan
+        self.checked[:] = False
+        self.pending_open[:] = np.nan
+        self.pending_open_ns[:] = 0
+        self.last_ltp[:] = np.nan
+        self.last_recv_ns[:] = 0
+        self.checked_count = 0
+
+    def observe(self, symbol_id, open_price, ltp, recv_ns):
+        """Remember a symbol's latest tick without evaluating it (before the selection window)."""
+        if symbol_id >= len(self.pending_open):
+            return
+        if open_price:
+            self.pending_open[symbol_id] = open_price
+            self.pending_open_ns[symbol_id] = recv_ns
+        if ltp:
+            self.last_ltp[symbol_id] = ltp
+        self.last_recv_ns[symbol_id] = recv_ns
+
+    def evaluate_pending(self, since_ns=None):
+        """
+        Evaluate every symbol observed so far in one vectorized pass.
+
+        Args:
+            since_ns (int): Ignore opens received before this monotonic instant
+                (e.g. indicative pre-open prices); those symbols stay unchecked
+
+        Returns:
+            np.ndarray: Ids that were evaluated
+        """
+        self._grow()
+        if since_ns is None:
+            return self.evaluate_all(self.pending_open)
+        return self.evaluate_all(np.where(self.pending_open_ns >= since_ns, self.pending_open, np.nan))
+
+    def check_gap(self, symbol_id, open_price):
+        """
+        Evaluate one symbol's opening gap, once.
+
+        Args:
+            symbol_id (int): Registry id
+            open_price (float): Today's open
+
+        Returns:
+            float: Gap-up % ((open - prev_close) / prev_close * 100),
+                or None if the symbol was already checked or has no previous close
+        """
+        if symbol_id >= len(self.checked) or self.checked[symbol_id]:
+            return None
+        prev_close = self.prev_close[symbol_id]
+        if prev_close != prev_close:  # NaN - no previous close
+            return None
+
+        gap_pct = (open_price - prev_close) / prev_close * 100
+        self.open_price[symbol_id] = open_price
+        self.gap_pct[symbol_id] = gap_pct
+        self.checked[symbol_id] = True
+        self.checked_count += 1
+        return float(gap_pct)
+
+    def evaluate_all(self, open_prices):
+        """
+        Evaluate every unchecked symbol in one vectorized pass.
+
+        Args:
+            open_prices (np.ndarray): Open price per registry id (NaN where unknown)
+
+        Returns:
+            np.ndarray: Ids that were evaluated by this call
+        """
+        self._grow()
+        open_prices = np.asarray(open_prices, dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            mask = ~self.checked & ~np.isnan(self.prev_close) & (open_prices > 0)
+        ids = np.flatnonzero(mask)
+
+        self.open_price[ids] = open_prices[ids]
+        self.gap_pct[ids] = (open_prices[ids] - self.prev_close[ids]) / self.prev_close[ids] * 100
+        self.checked[ids] = True
+        self.checked_count += len(ids)
+        return ids
+
+    def qualifying(self, gap_min, gap_max, min_price, ids=None):
+        """
+        Ids of evaluated symbols with gap_min <= gap% < gap_max and prev_close >= min_price.
+
+        Args:
+            ids (np.ndarray): Only consider these ids (default: all)
+
+        Returns:
+            np.ndarray: Matching registry ids
+        """
+        with np.errstate(invalid="ignore"):
+            mask = (self.checked & (self.gap_pct >= gap_min) & (self.gap_pct < gap_max)
+                    & (self.prev_close >= min_price))
+        if ids is not None:
+            ids = np.asarray(ids, dtype=np.int64)
+            return ids[mask[ids]]
+        return np.flatnonzero(mask)
+
+    def unchecked(self):
+        """
+        Returns:
+            np.ndarray: Ids that have a previous close but have not been evaluated yet
+        """
+        return np.flatnonzero(~self.checked & ~np.isnan(self.prev_close))
+
+    def all_checked(self):
+        """True once every symbol with a previous close has been evaluated."""
+        return self.tracked > 0 and self.checked_count >= self.tracked
@@ -0,0 +1,95 @@
+"""
+Tick Clock
+Monotonic nanosecond receive stamps with one wall-clock anchor.
+Stamps are plain ints on the hot path and only turned into dates/strings for display or export.
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+class TickClock:
+    """
+    Translate time.monotonic_ns() stamps to wall-clock time.
+
+    The anchor pairs one time.time_ns() reading with one monotonic_ns()
+    reading taken back to back; every stamp is converted by adding the same
+    offset, so differences between stamps are exact and unaffected by
+    wall-clock adjustments during the session.
+    """
+
+    def __init__(self):
+        self.reanchor()
+
+    def reanchor(self):
+        """Take a fresh wall-clock/monotonic pair (e.g. after the system clock was corrected)."""
+        mono_before = time.monotonic_ns()
+        wall_ns = time.time_ns()
+        mono_after = time.monotonic_ns()
+
+        self.set_anchor(wall_ns, (mono_before + mono_after) // 2)
+
+    def set_anchor(self, wall_ns, mono_ns):
+        """
+        Use an explicit anchor, e.g. the one stored in a tick recording, so its
+        monotonic stamps convert back to the wall-clock times of that session.
+        """
+        self.anchor_wall_ns = wall_ns
+        self.anchor_mono_ns = mono_ns
+        self.offset_ns = wall_ns - mono_ns
+        # Local UTC offset at the anchor, for naive local datetimes like datetime.now()
+        anchor = datetime.fromtimestamp(wall_ns / 1e9).astimezone()
+        self.utc_offset_ns = int(anchor.utcoffset().total_seconds()) * 1_000_000_000
+
+    @staticmethod
+    def now_ns():
+        return time.monotonic_ns()
+
+    def to_epoch_ns(self, mono_ns):
+        """Monotonic stamp(s) -> Unix epoch nanoseconds (works on ints and NumPy arrays)."""
+        return mono_ns + self.offset_ns
+
+    def to_epoch(self, mono_ns):
+        """Monotonic stamp -> Unix epoch seconds (float)."""
+        return (mono_ns + self.offset_ns) / 1e9
+
+    def to_datetime(self, mono_ns):
+        """Monotonic stamp -> naive local datetime."""
+        return datetime.fromtimestamp(self.to_epoch(mono_ns))
+
+    def mono_ns_at(self, when):
+        """Naive local datetime (e.g. today 09:10) -> the monotonic_ns value at that instant."""
+        return int(when.timestamp() * 1_000_000) * 1000 - self.offset_ns
+
+    def to_datetime64(self, mono_ns):
+        """Array of monotonic stamps -> naive local datetime64[ns] (vectorized)."""
+        return (np.asarray(mono_ns, dtype=np.int64) + (self.offset_ns + self.utc_offset_ns)).astype("datetime64[ns]")
+
+    def format(self, mono_ns, fmt=TIMESTAMP_FORMAT, millis=True):
+        """
+        Format a monotonic stamp for display.
+
+        Args:
+            mono_ns (int): time.monotonic_ns() value
+            fmt (str): strftime format (default: '%Y-%m-%d %H:%M:%S.%f')
+            millis (bool): Trim microseconds to milliseconds (default: True)
+
+        Returns:
+            str: Formatted local time
+        """
+        text = self.to_datetime(mono_ns).strftime(fmt)
+        return text[:-3] if millis and fmt.endswith('%f') else text
+
+    @staticmethod
+    def elapsed_ms(start_ns, end_ns):
+        """Milliseconds between two monotonic stamps."""
+        return (end_ns - start_ns) / 1e6
+
+
+# Process-wide clock shared by the socket callback, recorder and exports
+TICK_CLOCK = TickClock()
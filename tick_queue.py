@@ -0,0 +1,142 @@
+"""
+Tick Ingestion Queue
+Decouples the WebSocket callback from selection logic.
+The socket thread only enqueues; a dedicated worker thread runs the handler.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+DEFAULT_QUEUE_SIZE = 100000
+
+
+class TickQueue:
+    """
+    Bounded FIFO of raw ticks.
+
+    put() is a deque append plus a flag check - no lock is taken on the
+    producer side, so the socket thread never blocks. When the queue is
+    full the new tick is dropped and counted rather than stalling the socket.
+    Several socket threads may put() concurrently (sharded sockets); the
+    deque stays consistent, the counters are then best-effort.
+    """
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._ready = threading.Event()
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item):
+        """
+        Enqueue one tick (called from the socket thread).
+
+        Returns:
+            bool: False if the tick was dropped because the queue is full
+        """
+        depth = len(self._items)
+        if depth >= self.maxsize:
+            self.dropped += 1
+            return False
+
+        self._items.append(item)
+        self.enqueued += 1
+        if depth >= self.max_depth:
+            self.max_depth = depth + 1
+        if not self._ready.is_set():
+            self._ready.set()
+        return True
+
+    def get(self, timeout=None):
+        """
+        Dequeue the oldest tick, waiting up to `timeout` seconds for one.
+
+        Returns:
+            The tick, or None if the queue stayed empty
+        """
+        try:
+            return self._items.popleft()
+        except IndexError:
+            pass
+
+        # Clear, then re-check before sleeping so a put() between the two can't be missed
+        self._ready.clear()
+        try:
+            return self._items.popleft()
+        except IndexError:
+            pass
+
+        self._ready.wait(timeout)
+        try:
+            return self._items.popleft()
+        except IndexError:
+            return None
+
+    def depth(self):
+        return len(self._items)
+
+    def stats(self):
+        """
+        Returns:
+            dict: depth, max_depth, enqueued, dropped
+        """
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped
+        }
+
+
+class TickWorker(threading.Thread):
+    """
+    Thread that drains a TickQueue and passes every tick to `handler`.
+    Handler exceptions are reported and the worker keeps going.
+
+    With a `latency` tracker (see latency_stats.LatencyTracker) the handler
+    call is timed and latency.record(item, start_ns, end_ns) is called for
+    every tick.
+    """
+
+    def __init__(self, tick_queue, handler, name="tick-worker", latency=None):
+        super().__init__(name=name, daemon=True)
+        self.tick_queue = tick_queue
+        self.handler = handler
+        self.latency = latency
+        self.processed = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        queue_get = self.tick_queue.get
+        handler = self.handler
+        latency = self.latency
+        monotonic_ns = time.monotonic_ns
+        while True:
+            item = queue_get(timeout=0.1)
+            if item is None:
+                if self._stop_event.is_set():
+                    return
+                continue
+            start_ns = monotonic_ns() if latency else 0
+            try:
+                handler(item)
+            except Exception as e:
+                print(f"\n❌ Tick handler error: {str(e)}")
+            if latency:
+                latency.record(item, start_ns, monotonic_ns())
+            self.processed += 1
+
+    def stop(self, timeout=5.0):
+        """
+        Ask the worker to exit once the queue is drained and wait for it.
+
+        Args:
+            timeout (float): Seconds to wait for the worker to finish
+        """
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
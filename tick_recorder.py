@@ -0,0 +1,257 @@
+"""
+Tick Recorder
+Append-only binary capture of every SymbolUpdate, written by a background thread.
+
+A recording is three files sharing one base path:
+    <base>.ticks   64-byte header + fixed-size TICK_RECORD_DTYPE records
+    <base>.idx     (record_no, recv_ns) every INDEX_EVERY records, for seeking by time
+    <base>.json    symbol table (record symbol_id -> symbol) and clock anchor
+"""
+
+import json
+import os
+import struct
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from tick_clock import TICK_CLOCK
+
+
+RECORDINGS_DIR = os.getenv("TICK_RECORDINGS_DIR", "recordings")
+
+# Little-endian, packed: 52 bytes per tick
+TICK_RECORD_DTYPE = np.dtype([
+    ("recv_ns", "<i8"),       # time.monotonic_ns() at receive (see TickClock)
+    ("exch_ts", "<i8"),       # exch_feed_time (Unix epoch seconds)
+    ("symbol_id", "<i4"),     # SymbolRegistry id
+    ("ltp", "<f8"),
+    ("open_price", "<f8"),
+    ("prev_close", "<f8"),
+    ("volume", "<i8"),
+])
+
+INDEX_DTYPE = np.dtype([
+    ("record_no", "<i8"),
+    ("recv_ns", "<i8"),
+])
+
+INDEX_EVERY = 1024
+FLUSH_INTERVAL_SECONDS = 0.5
+
+HEADER_SIZE = 64
+_MAGIC = b"TICK"
+_VERSION = 1
+# magic, version, record size, anchor wall ns, anchor monotonic ns
+_HEADER = struct.Struct("<4sHHqq")
+
+
+class TickRecorder(threading.Thread):
+    """
+    Background writer for a tick recording.
+
+    record() only appends a tuple to a deque; the recorder thread packs the
+    pending ticks into one NumPy batch and appends it to disk every
+    FLUSH_INTERVAL_SECONDS, so neither the socket thread nor the tick worker
+    waits on file I/O and memory use is bounded by one flush interval.
+
+    A recording belongs to exactly one process: its header holds that
+    process's clock anchor and its symbol ids are that process's registry
+    ids, so an existing recording is never appended to.
+    """
+
+    def __init__(self, base_path, registry, clock=TICK_CLOCK):
+        super().__init__(name="tick-recorder", daemon=True)
+        self.base_path = base_path
+        self.registry = registry
+        self.clock = clock
+        self.records_written = 0
+        self._pending = deque()
+        self._stop_event = threading.Event()
+        self._symbols_written = 0
+
+        directory = os.path.dirname(base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Claim all three files or none: a partial set would block a retry on the same path
+        created = []
+        try:
+            for suffix in (".ticks", ".idx", ".json"):
+                created.append((suffix, open(base_path + suffix, "xb")))
+        except OSError as e:
+            for suffix, f in created:
+                f.close()
+                os.remove(base_path + suffix)
+            if isinstance(e, FileExistsError):
+                raise Exception(f"Tick recording already exists (recordings are never appended to): {base_path}")
+            raise
+        (_, self._ticks_file), (_, self._index_file), (_, meta_file) = created
+        meta_file.close()
+
+        header = _HEADER.pack(_MAGIC, _VERSION, TICK_RECORD_DTYPE.itemsize,
+                              clock.anchor_wall_ns, clock.anchor_mono_ns)
+        self._ticks_file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self._write_meta()
+
+    @classmethod
+    def for_session(cls, registry, directory=RECORDINGS_DIR):
+        """Create a recorder named after the current time and process, e.g. recordings/ticks_2025-01-02_090500_4242."""
+        name = datetime.now().strftime("ticks_%Y-%m-%d_%H%M%S") + f"_{os.getpid()}"
+        return cls(os.path.join(directory, name), registry)
+
+    def record(self, message, symbol_id):
+        """
+        Queue one SymbolUpdate for writing.
+
+        Args:
+            message (dict): WebSocket message with 'recv_ns' set
+            symbol_id (int): SymbolRegistry id of message['symbol']
+        """
+        self._pending.append((
+            message['recv_ns'],
+            message.get('exch_feed_time') or 0,
+            symbol_id,
+            message.get('ltp') or np.nan,
+            message.get('open_price') or np.nan,
+            message.get('prev_close_price') or np.nan,
+            message.get('vol_traded_today') or 0
+        ))
+
+    def _write_meta(self):
+        meta = {
+            "version": _VERSION,
+            "record_size": TICK_RECORD_DTYPE.itemsize,
+            "anchor_wall_ns": self.clock.anchor_wall_ns,
+            "anchor_mono_ns": self.clock.anchor_mono_ns,
+            "index_every": INDEX_EVERY,
+            "symbols": list(self.registry.symbols)
+        }
+        tmp_path = self.base_path + ".json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.base_path + ".json")
+        self._symbols_written = len(meta["symbols"])
+
+    def _flush(self):
+        count = len(self._pending)
+        if count == 0:
+            return
+
+        pending = self._pending
+        batch = np.array([pending.popleft() for _ in range(count)], dtype=TICK_RECORD_DTYPE)
+        self._ticks_file.write(batch.tobytes())
+
+        # Index the first record of every INDEX_EVERY block that starts in this batch
+        first = self.records_written
+        offsets = np.arange((-first) % INDEX_EVERY, count, INDEX_EVERY)
+        if len(offsets):
+            index = np.empty(len(offsets), dtype=INDEX_DTYPE)
+            index["record_no"] = first + offsets
+            index["recv_ns"] = batch["recv_ns"][offsets]
+            self._index_file.write(index.tobytes())
+
+        self.records_written += count
+        self._ticks_file.flush()
+        self._index_file.flush()
+
+        if len(self.registry) != self._symbols_written:
+            self._write_meta()
+
+    def run(self):
+        while not self._stop_event.wait(FLUSH_INTERVAL_SECONDS):
+            try:
+                self._flush()
+            except Exception as e:
+                print(f"\n❌ Tick recorder error: {str(e)}")
+
+    def close(self):
+        """Write everything still queued and close the files."""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(FLUSH_INTERVAL_SECONDS * 4)
+        self._flush()
+        self._write_meta()
+        self._ticks_file.close()
+        self._index_file.close()
+
+
+class TickRecording:
+    """
+    Read-only view of a recording (records are memory-mapped, not loaded).
+
+    Attributes:
+        records (np.ndarray): TICK_RECORD_DTYPE records in receive order
+        index (np.ndarray): INDEX_DTYPE entries
+        symbols (list): symbol_id -> symbol
+        anchor_wall_ns / anchor_mono_ns (int): Clock anchor of the recording session
+    """
+
+    def __init__(self, base_path):
+        if base_path.endswith((".ticks", ".idx", ".json")):
+            base_path = os.path.splitext(base_path)[0]
+        self.base_path = base_path
+
+        with open(base_path + ".json") as f:
+            meta = json.load(f)
+        self.symbols = meta["symbols"]
+
+        with open(base_path + ".ticks", "rb") as f:
+            magic, version, record_size, anchor_wall_ns, anchor_mono_ns = _HEADER.unpack(
+                f.read(HEADER_SIZE)[:_HEADER.size]
+            )
+        if magic != _MAGIC or record_size != TICK_RECORD_DTYPE.itemsize:
+            raise Exception(f"Not a tick recording (or unsupported version): {base_path}.ticks")
+        self.anchor_wall_ns = anchor_wall_ns
+        self.anchor_mono_ns = anchor_mono_ns
+
+        # A crash can leave a partial last record - ignore it
+        count = (os.path.getsize(base_path + ".ticks") - HEADER_SIZE) // record_size
+        if count > 0:
+            self.records = np.memmap(base_path + ".ticks", dtype=TICK_RECORD_DTYPE, mode="r",
+                                     offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=TICK_RECORD_DTYPE)
+
+        index_count = os.path.getsize(base_path + ".idx") // INDEX_DTYPE.itemsize
+        self.index = np.fromfile(base_path + ".idx", dtype=INDEX_DTYPE, count=index_count)
+
+    def __len__(self):
+        return len(self.records)
+
+    def seek(self, recv_ns):
+        """
+        First record number received at or after `recv_ns`, using the index
+        to narrow the search to one INDEX_EVERY block.
+        """
+        if len(self.index):
+            block = max(int(np.searchsorted(self.index["recv_ns"], recv_ns, side="right")) - 1, 0)
+            start = int(self.index["record_no"][block])
+        else:
+            start = 0
+        end = min(start + INDEX_EVERY + 1, len(self.records)) if len(self.index) else len(self.records)
+        return start + int(np.searchsorted(self.records["recv_ns"][start:end], recv_ns))
+
+    def between(self, start_ns=None, end_ns=None):
+        """Records with start_ns <= recv_ns < end_ns (either bound may be None)."""
+        start = self.seek(start_ns) if start_ns is not None else 0
+        end = self.seek(end_ns) if end_ns is not None else len(self.records)
+        return self.records[start:end]
+
+    def prev_closes(self):
+        """
+        Previous-session close per symbol, taken from the first tick of each symbol that carried one.
+
+        Returns:
+            dict: {symbol: prev_close}
+        """
+        records = self.records[~np.isnan(self.records["prev_close"])]
+        ids, first = np.unique(records["symbol_id"], return_index=True)
+        closes = records["prev_close"][first]
+        return {self.symbols[symbol_id]: float(close) for symbol_id, close in zip(ids.tolist(), closes.tolist())}
+
+    def epoch_ns(self, recv_ns):
+        """Convert recorded monotonic stamps to Unix epoch nanoseconds."""
+        return recv_ns + (self.anchor_wall_ns - self.anchor_mono_ns)
@@ -0,0 +1,196 @@
+"""
+Tick Replay
+Feed a recorded session (see tick_recorder.py) back through the selection callbacks,
+in real time, N× speed or as fast as possible.
+
+Usage:
+    python tick_replay.py recordings/ticks_2025-01-02_090500 [--speed 10 | --fast] [--engine algo_execution]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from tick_clock import TICK_CLOCK
+from tick_recorder import TickRecording
+
+
+# Records converted to Python values per step (keeps memory flat for long sessions)
+REPLAY_CHUNK_SIZE = 65536
+
+
+class VirtualClock:
+    """
+    Session time during a replay, in the recording's monotonic nanoseconds.
+
+    With a speed, virtual time advances `speed` times faster than real time
+    from the first replayed tick. Without one (as fast as possible) it jumps
+    to each tick's receive stamp as the tick is delivered.
+    """
+
+    def __init__(self, start_ns, speed=None):
+        self.start_ns = start_ns
+        self.speed = speed
+        self._real_start_ns = time.monotonic_ns()
+        self._current_ns = start_ns
+
+    def now_ns(self):
+        if self.speed is None:
+            return self._current_ns
+        return self.start_ns + int((time.monotonic_ns() - self._real_start_ns) * self.speed)
+
+    def advance_to(self, recv_ns):
+        """Wait (paced modes) until virtual time reaches recv_ns."""
+        if self.speed is not None:
+            real_target_ns = self._real_start_ns + (recv_ns - self.start_ns) / self.speed
+            delay = (real_target_ns - time.monotonic_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+        self._current_ns = recv_ns
+
+
+class TickReplayer:
+    """
+    Deliver recorded ticks to `on_message` as SymbolUpdate-style dicts.
+
+    Each message carries the recorded 'recv_ns', so latency arithmetic and
+    timestamps in the selection code see the original session timeline.
+    """
+
+    def __init__(self, recording, on_message, speed=None, start_ns=None, end_ns=None):
+        """
+        Args:
+            recording (TickRecording): Recorded session
+            on_message (callable): Called with each message dict
+            speed (float): 1.0 = real time, 10 = 10× faster, None = as fast as possible
+            start_ns / end_ns (int): Optional recv_ns window to replay
+        """
+        if speed is not None and speed <= 0:
+            raise Exception(f"Replay speed must be positive (got {speed})")
+        self.recording = recording
+        self.on_message = on_message
+        self.speed = speed
+        self.records = recording.between(start_ns, end_ns)
+        first_ns = int(self.records["recv_ns"][0]) if len(self.records) else 0
+        self.clock = VirtualClock(first_ns, speed)
+        self.delivered = 0
+
+    def run(self):
+        """
+        Replay every record in the window.
+
+        Returns:
+            dict: ticks, real_seconds, session_seconds, ticks_per_sec
+        """
+        symbols = self.recording.symbols
+        on_message = self.on_message
+        advance_to = self.clock.advance_to
+        started = time.perf_counter()
+
+        for chunk_start in range(0, len(self.records), REPLAY_CHUNK_SIZE):
+            chunk = self.records[chunk_start:chunk_start + REPLAY_CHUNK_SIZE]
+            columns = zip(
+                chunk["recv_ns"].tolist(),
+                chunk["symbol_id"].tolist(),
+                chunk["ltp"].tolist(),
+                chunk["open_price"].tolist(),
+                chunk["prev_close"].tolist(),
+                chunk["volume"].tolist(),
+                chunk["exch_ts"].tolist()
+            )
+            for recv_ns, symbol_id, ltp, open_price, prev_close, volume, exch_ts in columns:
+                advance_to(recv_ns)
+                on_message({
+                    'symbol': symbols[symbol_id],
+                    'ltp': ltp,
+                    'open_price': open_price,
+                    'prev_close_price': prev_close,
+                    'vol_traded_today': volume,
+                    'exch_feed_time': exch_ts,
+                    'type': 'sf',
+                    'recv_ns': recv_ns
+                })
+                self.delivered += 1
+
+        real_seconds = time.perf_counter() - started
+        session_seconds = 0.0
+        if len(self.records):
+            session_seconds = (int(self.records["recv_ns"][-1]) - int(self.records["recv_ns"][0])) / 1e9
+        return {
+            "ticks": self.delivered,
+            "real_seconds": real_seconds,
+            "session_seconds": session_seconds,
+            "ticks_per_sec": self.delivered / real_seconds if real_seconds > 0 else 0.0
+        }
+
+
+def replay_selection(recording, engine, speed=None):
+    """
+    Run a selection script's tick handler and close handler over a recording.
+
+    The engine's selection state is reset, previous closes are taken from the
+    recording, and TICK_CLOCK is anchored to the recorded session so
+    timestamps print as they happened. The engine's selection gate is armed
+    at its selection start on the recording's date (and its deadline after
+    that), so ticks recorded before the window are buffered exactly as they
+    were live.
+
+    Args:
+        recording (TickRecording): Recorded session
+        engine (module): Selection script exposing symbol_state, filtered_stocks,
+            selection_gate, process_message and onclose (algo.py / algo_execution.py)
+        speed (float): Replay speed, None = as fast as possible
+
+    Returns:
+        dict: Replay stats from TickReplayer.run()
+    """
+    TICK_CLOCK.set_anchor(recording.anchor_wall_ns, recording.anchor_mono_ns)
+
+    engine.filtered_stocks.clear()
+    engine.symbol_state.load_prev_close(recording.prev_closes())
+    engine.message_count = 0
+
+    session_day = datetime.fromtimestamp(recording.anchor_wall_ns / 1e9)
+    selection_start = session_day.replace(hour=engine.SELECTION_START_HOUR, minute=engine.SELECTION_START_MINUTE,
+                                          second=0, microsecond=0)
+    gate_ns = TICK_CLOCK.mono_ns_at(selection_start)
+    engine.selection_gate.reset()
+    engine.selection_gate.arm(gate_ns)
+    engine.selection_gate.set_deadline(gate_ns + engine.SELECTION_DEADLINE_SECONDS * 1_000_000_000)
+
+    replayer = TickReplayer(recording, engine.process_message, speed=speed)
+    stats = replayer.run()
+    engine.onclose({"code": 200, "message": "Replay finished", "s": "ok"})
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded tick session through the selection logic")
+    parser.add_argument("recording", help="Recording base path (or its .ticks file)")
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (default: 1 = real time)")
+    pace.add_argument("--fast", action="store_true", help="Replay as fast as possible")
+    parser.add_argument("--engine", choices=["algo_execution", "algo"], default="algo_execution",
+                        help="Selection script whose callbacks are replayed (default: algo_execution)")
+    args = parser.parse_args()
+
+    engine = __import__(args.engine)
+    recording = TickRecording(args.recording)
+    speed = None if args.fast else args.speed
+
+    print("\n" + "=" * 80)
+    print("TICK REPLAY")
+    print("=" * 80)
+    print(f"📂 Recording: {recording.base_path} ({len(recording):,} ticks, {len(recording.symbols)} symbols)")
+    print(f"⏩ Speed: {'as fast as possible' if speed is None else f'{speed:g}×'}")
+    print(f"🧠 Engine: {args.engine}")
+    print("=" * 80 + "\n")
+
+    stats = replay_selection(recording, engine, speed=speed)
+
+    print(f"\n📊 Replayed {stats['ticks']:,} ticks ({stats['session_seconds']:.2f}s of session) "
+          f"in {stats['real_seconds']:.3f}s | {stats['ticks_per_sec']:,.0f} ticks/sec")
+
+
+if __name__ == "__main__":
+    main()
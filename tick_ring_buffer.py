@@ -0,0 +1,105 @@
+"""
+Tick Ring Buffer
+Fixed-capacity, preallocated store of the most recent ticks (NumPy structured array).
+"""
+
+import numpy as np
+import pandas as pd
+
+from symbol_registry import SymbolRegistry
+from tick_clock import TICK_CLOCK
+
+
+DEFAULT_BUFFER_CAPACITY = 1000
+
+# One record per tick; numeric columns only, symbols are stored as ids
+TICK_DTYPE = np.dtype([
+    ("symbol_id", np.int32),
+    ("ltp", np.float64),
+    ("open_price", np.float64),
+    ("volume", np.int64),
+    ("exch_ts", np.int64),     # exch_feed_time (Unix epoch seconds)
+    ("recv_ns", np.int64),     # receive time (time.monotonic_ns(), see TickClock)
+])
+
+
+class TickRingBuffer:
+    """
+    Keep the last `capacity` ticks without per-tick allocation.
+
+    append() overwrites the oldest slot once the buffer is full, so cost per
+    tick is constant and memory never grows. Symbols are stored as
+    SymbolRegistry ids; names are only resolved again in to_dataframe().
+
+    Single writer: append() is meant to be called from the tick worker only.
+    """
+
+    def __init__(self, capacity=DEFAULT_BUFFER_CAPACITY, registry=None, clock=TICK_CLOCK):
+        self.capacity = capacity
+        self.registry = registry if registry is not None else SymbolRegistry()
+        self.clock = clock
+        self._arr = np.zeros(capacity, dtype=TICK_DTYPE)
+        self._count = 0
+
+    def append(self, symbol_id, ltp, open_price, volume, exch_ts, recv_ns):
+        """Store one tick, overwriting the oldest when full."""
+        self._arr[self._count % self.capacity] = (symbol_id, ltp, open_price, volume, exch_ts, recv_ns)
+        self._count += 1
+
+    def append_message(self, message, symbol_id=None):
+        """
+        Store a SymbolUpdate message.
+
+        Args:
+            message (dict): WebSocket message with 'symbol' and 'recv_ns' set
+            symbol_id (int): Registry id if the caller already looked it up
+        """
+        if symbol_id is None:
+            symbol_id = self.registry.intern(message['symbol'])
+        self.append(
+            symbol_id,
+            message.get('ltp') or np.nan,
+            message.get('open_price') or np.nan,
+            message.get('vol_traded_today') or 0,
+            message.get('exch_feed_time') or 0,
+            message['recv_ns']
+        )
+
+    def snapshot(self):
+        """
+        Copy out the buffered ticks, oldest first.
+
+        Returns:
+            np.ndarray: Array of TICK_DTYPE records
+        """
+        if self._count <= self.capacity:
+            return self._arr[:self._count].copy()
+        start = self._count % self.capacity
+        return np.concatenate((self._arr[start:], self._arr[:start]))
+
+    def to_dataframe(self):
+        """
+        Export the buffered ticks with symbol names and readable receive times.
+
+        Returns:
+            pd.DataFrame: Columns symbol, ltp, open_price, vol_traded_today, exch_feed_time, received_at
+        """
+        arr = self.snapshot()
+        return pd.DataFrame({
+            "symbol": self.registry.names(arr["symbol_id"]) if len(arr) else np.empty(0, dtype=object),
+            "ltp": arr["ltp"],
+            "open_price": arr["open_price"],
+            "vol_traded_today": arr["volume"],
+            "exch_feed_time": arr["exch_ts"],
+            "received_at": self.clock.to_datetime64(arr["recv_ns"])
+        })
+
+    def clear(self):
+        self._count = 0
+
+    @property
+    def total_appended(self):
+        return self._count
+
+    def __len__(self):
+        return min(self._count, self.capacity)
@@ -0,0 +1,104 @@
+"""
+Top-K Selector
+Bounded min-heap that keeps the K highest-scoring candidates seen so far.
+"""
+
+import heapq
+import itertools
+
+
+class TopKSelector:
+    """
+    Keep the best `k` entries by score.
+
+    offer() is O(log k): a candidate is compared with the weakest entry
+    (heap root) and only replaces it when it scores higher, so per-tick cost
+    does not depend on how many symbols are streamed. On equal scores the
+    entry that arrived first is kept.
+
+    Entries are (key, data) pairs; data is whatever the caller wants back in
+    snapshot() (e.g. the gap-up dict for a symbol). One thread offers;
+    snapshot() may be called from other threads (e.g. the dashboard).
+    """
+
+    def __init__(self, k):
+        if k < 1:
+            raise Exception(f"Top-K size must be at least 1 (got {k})")
+        self.k = k
+        self._heap = []  # [score, -arrival, key, data]
+        self._data = {}
+        self._arrival = itertools.count()
+        self._version = 0
+        self._snapshot = (-1, [])
+
+    def offer(self, key, score, data=None):
+        """
+        Offer a candidate.
+
+        Args:
+            key: Unique identifier (e.g. symbol)
+            score (float): Ranking score, higher is better
+            data: Payload returned with the key by snapshot()
+
+        Returns:
+            bool: True if the candidate is now in the top K
+        """
+        if key in self._data:
+            # Re-scoring an existing entry is rare - rebuild the (small) heap
+            heap = [entry for entry in self._heap if entry[2] != key]
+            heapq.heapify(heap)
+            self._heap = heap
+            del self._data[key]
+
+        entry = [score, -next(self._arrival), key, data]
+
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif score > self._heap[0][0]:
+            evicted = heapq.heapreplace(self._heap, entry)
+            del self._data[evicted[2]]
+        else:
+            return False
+
+        self._data[key] = data
+        self._version += 1
+        return True
+
+    def threshold(self):
+        """
+        Returns:
+            float: Score a new candidate has to beat once the selector is full, else None
+        """
+        if len(self._heap) < self.k:
+            return None
+        return self._heap[0][0]
+
+    def snapshot(self):
+        """
+        Current top K, best first.
+
+        Returns:
+            list: [(key, data), ...] sorted by score descending (cached until the next change)
+        """
+        version, ranked = self._snapshot
+        if version != self._version:
+            # Read the version first: if offer() runs meanwhile the cache is already stale
+            version = self._version
+            ranked = [(key, data) for _, _, key, data in sorted(list(self._heap), reverse=True)]
+            self._snapshot = (version, ranked)
+        return list(ranked)
+
+    def items(self):
+        """Alias of snapshot() so the selector can stand in for a dict of results."""
+        return self.snapshot()
+
+    def clear(self):
+        self._heap = []
+        self._data.clear()
+        self._version += 1
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, key):
+        return key in self._data
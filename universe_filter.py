@@ -0,0 +1,97 @@
+"""
+Universe Prefilter
+Apply the static selection criteria to the prev-close table before subscribing,
+so symbols that can never qualify are not streamed at all.
+"""
+
+import math
+import os
+
+
+# One symbol per line ("#" starts a comment); EXCLUDED_SYMBOLS (comma-separated) adds more
+EXCLUSIONS_FILE = os.getenv("EXCLUSIONS_FILE", "excluded_symbols.txt")
+
+
+def load_exclusions(path=EXCLUSIONS_FILE):
+    """
+    Read the user exclusion list.
+
+    Args:
+        path (str): Exclusions file (missing file = no exclusions)
+
+    Returns:
+        set: Symbols in Fyers format
+    """
+    excluded = set()
+
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                symbol = line.split("#", 1)[0].strip()
+                if symbol:
+                    excluded.add(symbol)
+
+    for symbol in os.getenv("EXCLUDED_SYMBOLS", "").split(","):
+        if symbol.strip():
+            excluded.add(symbol.strip())
+
+    return excluded
+
+
+def prefilter_universe(symbols, prev_closes, min_price, excluded=None):
+    """
+    Keep only symbols that can still pass selection once the market opens.
+
+    Static criteria (known before the open):
+        • no usable previous close (missing, NaN or <= 0) - gap-up cannot be computed
+        • previous close below min_price
+        • on the user exclusion list
+
+    Args:
+        symbols (list): Universe in Fyers format, in subscription order
+        prev_closes (dict): {symbol: previous close}
+        min_price (float): Minimum previous close
+        excluded (set): Symbols to drop (default: load_exclusions())
+
+    Returns:
+        tuple: (kept, rejected)
+            kept (list): Surviving symbols, original order
+            rejected (dict): {reason: [symbols]}
+    """
+    if excluded is None:
+        excluded = load_exclusions()
+
+    kept = []
+    rejected = {"excluded": [], "no_history": [], "below_min_price": []}
+
+    for symbol in symbols:
+        if symbol in excluded:
+            rejected["excluded"].append(symbol)
+            continue
+
+        close = prev_closes.get(symbol)
+        if close is None or (isinstance(close, float) and math.isnan(close)) or close <= 0:
+            rejected["no_history"].append(symbol)
+            continue
+
+        if close < min_price:
+            rejected["below_min_price"].append(symbol)
+            continue
+
+        kept.append(symbol)
+
+    return kept, rejected
+
+
+def print_prefilter_summary(symbols, kept, rejected):
+    """Print how many symbols the prefilter removed and why."""
+    print(f"\n🧹 Prefilter: subscribing {len(kept)} of {len(symbols)} symbols")
+    labels = {
+        "excluded": "On exclusion list",
+        "no_history": "No previous close",
+        "below_min_price": "Below minimum price"
+    }
+    for reason, dropped in rejected.items():
+        if dropped:
+            preview = ", ".join(dropped[:5]) + (" ..." if len(dropped) > 5 else "")
+            print(f"   • {labels[reason]}: {len(dropped)} ({preview})")